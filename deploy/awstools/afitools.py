@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import boto3
 from awstools.awstools import depaginated_boto_query
 
 rootLogger = logging.getLogger()
@@ -23,6 +22,8 @@ def get_fpga_regions():
 
 
 def get_current_region():
+    import boto3
+
     boto_session = boto3.session.Session()
     return boto_session.region_name
 
@@ -36,6 +37,8 @@ def get_afi_for_agfi(agfi_id, region=None):
     rootLogger.debug(region)
     region = region if region is not None else get_current_region()
 
+    import boto3
+
     client = boto3.client("ec2", region_name=region)
     operation_params = {
         "Filters": [
@@ -67,6 +70,8 @@ def copy_afi_to_all_regions(afi_id, starting_region=None):
     rootLogger.info("""Regions to copy to: {}""".format(copy_to_regions))
     rootLogger.info("""Copying AFI: {}""".format(afi_id))
 
+    import boto3
+
     for region in copy_to_regions:
         client = boto3.client("ec2", region_name=region)
         result = client.copy_fpga_image(
@@ -78,6 +83,8 @@ def copy_afi_to_all_regions(afi_id, starting_region=None):
 
 def share_afi_with_users(afi_id, region, useridlist):
     """share the AFI in Region region with users in userlist."""
+    import boto3
+
     client = boto3.client("ec2", region_name=region)
     if "public" in useridlist:
         rootLogger.info("Sharing AGFI publicly.")
@@ -140,6 +147,8 @@ def firesim_description_to_tags(description):
 
 def get_firesim_tagval_for_afi(afi_id, tagkey):
     """Given an afi_id, and tag key, return the FireSim tag value of the afi."""
+    import boto3
+
     client = boto3.client("ec2")
     operation_params = {"FpgaImageIds": [afi_id]}
     result = depaginated_boto_query(
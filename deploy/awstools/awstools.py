@@ -13,16 +13,17 @@ import sys
 import json
 import re
 
-import boto3
-import botocore
-from botocore import exceptions
 from fabric.api import local, hide, settings  # type: ignore
 
 # imports needed for python type checking
-from typing import Any, Dict, Optional, List, Sequence, cast
-from mypy_boto3_ec2.service_resource import Instance as EC2InstanceResource
-from mypy_boto3_ec2.type_defs import FilterTypeDef
-from mypy_boto3_s3.literals import BucketLocationConstraintType
+from typing import Any, Dict, Optional, List, Sequence, cast, TYPE_CHECKING
+
+# boto3 is slow to import and only needed by tasks that talk to AWS, so it is
+# imported by the functions that use it
+if TYPE_CHECKING:
+    from mypy_boto3_ec2.service_resource import Instance as EC2InstanceResource
+    from mypy_boto3_ec2.type_defs import FilterTypeDef
+    from mypy_boto3_s3.literals import BucketLocationConstraintType
 
 
 if __name__ == "__main__":
@@ -170,6 +171,8 @@ def get_localhost_instance_tags() -> Dict[str, Any]:
 
     if instanceid:
         # Look up this instance's ID, if we do not have permission to describe tags, use the default dictionary
+        import boto3
+
         client = boto3.client("ec2")
         try:
             operation_params = {
@@ -257,6 +260,8 @@ def farm_security_group_setup() -> None:
     securitygroupname = aws_resource_names_dict["securitygroupname"]
     vpcname = aws_resource_names_dict["vpcname"]
 
+    import boto3
+
     ec2 = boto3.resource("ec2")
     client = boto3.client("ec2")
 
@@ -392,6 +397,8 @@ def awsinit() -> None:
 # AMIs are region specific
 def get_f2_ami_id() -> str:
     """Get the AWS F2 Developer AMI by looking up the image name -- should be region independent."""
+    import boto3
+
     client = boto3.client("ec2")
     # Try up to MAX_ATTEMPTS additional hotfix versions of an AMI if the
     # initial one fails.
@@ -529,6 +536,8 @@ def launch_instances(
         securitygroupname = aws_resource_names_dict["securitygroupname-manager"]
     vpcname = aws_resource_names_dict["vpcname"]
 
+    import boto3
+
     ec2 = boto3.resource("ec2")
     client = boto3.client("ec2")
 
@@ -738,6 +747,8 @@ def get_instances_with_filter(
     ],
 ) -> List[EC2InstanceResource]:
     """Produces a list of instances based on a set of provided filters"""
+    import boto3
+
     ec2_client = boto3.client("ec2")
     operation_params = {
         "Filters": filters + [{"Name": "instance-state-name", "Values": allowed_states}]
@@ -768,6 +779,8 @@ def get_instances_by_tag_type(
     tags: Dict[str, Any], instancetype: str
 ) -> List[EC2InstanceResource]:
     """return list of instances that match all tags and instance type"""
+    import boto3
+
     res = boto3.resource("ec2")
 
     # see note above. collections automatically handle pagination
@@ -845,6 +858,8 @@ def wait_on_instance_launches(
 def terminate_instances(instanceids: List[str], dryrun: bool = True) -> None:
     """Terminate instances when given a list of instance ids.  for safety,
     this supplies dryrun=True by default."""
+    import boto3
+
     client = boto3.client("ec2")
     response = client.describe_instances(
         InstanceIds=instanceids,
@@ -870,6 +885,8 @@ def auto_create_bucket(userbucketname: str) -> None:
     If we get no exception, assume the bucket exists and the user has already
     set it up correctly.
     """
+    import boto3
+
     s3cli = boto3.client("s3")
     try:
         s3cli.head_bucket(Bucket=userbucketname)
@@ -922,6 +939,8 @@ def auto_create_bucket(userbucketname: str) -> None:
 
 def get_snsname_arn() -> Optional[str]:
     """If the Topic doesn't exist create it, send catch exceptions while creating. Or if it exists get arn"""
+    import boto3
+
     client = boto3.client("sns")
 
     aws_resource_names_dict = aws_resource_names()
@@ -948,6 +967,8 @@ def get_snsname_arn() -> Optional[str]:
 def subscribe_to_firesim_topic(email: str) -> None:
     """Subscribe a user to their FireSim SNS topic for notifications."""
 
+    import boto3
+
     client = boto3.client("sns")
     arn = get_snsname_arn()
     if not arn:
@@ -975,6 +996,8 @@ receive any notifications until you click the confirmation link.""".format(
 
 def send_firesim_notification(subject: str, body: str) -> None:
 
+    import boto3
+
     client = boto3.client("sns")
     arn = get_snsname_arn()
 
@@ -0,0 +1,219 @@
+""" Background copy-back of job results for runworkload.
+
+Copying back a finished job's results (extracting its outputs from its
+rootfs, rsyncing them) can take minutes for large outputs. Instead of doing
+this inline while monitoring, which stalls status updates for every host,
+runworkload hands finished jobs to a CopyBackPipeline. The pipeline copies
+back up to a fixed number of jobs at once in the background, while the
+manager keeps monitoring the remaining simulations.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from fabric.api import settings  # type: ignore
+
+from runtools.utils import human_readable_size, run_in_forked_process
+
+from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from runtools.firesim_topology_elements import FireSimServerNode
+
+rootLogger = logging.getLogger()
+
+
+def local_dir_size(path: str) -> int:
+    """Total size in bytes of the files under path (0 if it does not exist)."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _copy_back_job(
+    host: str, node: FireSimServerNode, slotno: int, compress: bool
+) -> None:
+    """Copy back a single job's results. Runs in its own process (see
+    run_in_forked_process)."""
+    with settings(host_string=host):
+        node.copy_back_job_results_from_run(slotno, compress)
+
+
+class CopyBackPipeline:
+    """Copies back the results of finished jobs in the background, with at
+    most max_workers copy-backs in flight at once."""
+
+    max_workers: int
+    compress: bool
+    executor: ThreadPoolExecutor
+    lock: threading.Lock
+    futures: Dict[str, Future]
+    job_hosts: Dict[str, str]
+    running: Set[str]
+    copied: Set[str]
+    failed: List[str]
+    finished_hosts: Set[str]
+    bytes_copied: int
+    first_start: Optional[float]
+    last_end: Optional[float]
+
+    def __init__(self, max_workers: int, compress: bool) -> None:
+        assert max_workers > 0
+        self.max_workers = max_workers
+        self.compress = compress
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="copy-back"
+        )
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.job_hosts = {}
+        self.running = set()
+        self.copied = set()
+        self.failed = []
+        self.finished_hosts = set()
+        self.bytes_copied = 0
+        self.first_start = None
+        self.last_end = None
+
+    def submit(self, host: str, node: FireSimServerNode, slotno: int) -> None:
+        """Queue the results of the job running in slotno on host to be
+        copied back. Jobs that were already submitted are ignored."""
+        jobname = node.get_job_name()
+        with self.lock:
+            if jobname in self.futures:
+                return
+            self.job_hosts[jobname] = host
+            self.futures[jobname] = self.executor.submit(
+                self._copy_back, host, node, slotno
+            )
+        rootLogger.debug(f"[{host}] Queued copy-back of job {jobname}.")
+
+    def _copy_back(self, host: str, node: FireSimServerNode, slotno: int) -> None:
+        jobname = node.get_job_name()
+        job_dir = node.get_local_job_results_dir_path()
+        start = time.monotonic()
+        with self.lock:
+            self.running.add(jobname)
+            if self.first_start is None:
+                self.first_start = start
+        size_before = local_dir_size(job_dir)
+
+        exitcode = None
+        try:
+            exitcode = run_in_forked_process(
+                f"[{host}] Copying back results of job {jobname}",
+                _copy_back_job,
+                host,
+                node,
+                slotno,
+                self.compress,
+            )
+        finally:
+            job_bytes = max(local_dir_size(job_dir) - size_before, 0)
+            end = time.monotonic()
+            with self.lock:
+                self.running.discard(jobname)
+                self.bytes_copied += job_bytes
+                self.last_end = end
+                self.finished_hosts.add(host)
+                if exitcode == 0:
+                    self.copied.add(jobname)
+                else:
+                    self.failed.append(jobname)
+            rootLogger.debug(
+                f"[{host}] Copied back {human_readable_size(job_bytes)} for job {jobname} in {end - start:.1f}s (exit code {exitcode})."
+            )
+
+    def pending(self) -> int:
+        """Number of submitted jobs that are not copied back yet."""
+        with self.lock:
+            return len(self.futures) - len(self.copied) - len(self.failed)
+
+    def take_finished_hosts(self) -> List[str]:
+        """Hosts on which a copy-back finished since the last call."""
+        with self.lock:
+            hosts = list(self.finished_hosts)
+            self.finished_hosts.clear()
+        return hosts
+
+    def throughput(self) -> float:
+        """Average bytes copied back per second while copy-backs were running."""
+        with self.lock:
+            if self.first_start is None:
+                return 0.0
+            end = time.monotonic() if self.running else self.last_end
+            assert end is not None
+            return self.bytes_copied / max(end - self.first_start, 1e-3)
+
+    def job_states(self) -> Dict[str, str]:
+        """The copy-back state of each submitted job: queued, copying,
+        copied or failed."""
+        with self.lock:
+            states = {}
+            for jobname in self.futures:
+                if jobname in self.copied:
+                    states[jobname] = "copied"
+                elif jobname in self.failed:
+                    states[jobname] = "failed"
+                elif jobname in self.running:
+                    states[jobname] = "copying"
+                else:
+                    states[jobname] = "queued"
+        return states
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall progress of the pipeline."""
+        throughput = self.throughput()
+        with self.lock:
+            total = len(self.futures)
+            return {
+                "total": total,
+                "copied": len(self.copied),
+                "copying": len(self.running),
+                "queued": total
+                - len(self.running)
+                - len(self.copied)
+                - len(self.failed),
+                "failed": len(self.failed),
+                "bytes": self.bytes_copied,
+                "throughput": throughput,
+            }
+
+    def status(self) -> List[str]:
+        """Lines summarizing the progress of the pipeline, for the status display."""
+        summary = self.summary()
+        with self.lock:
+            lines = [
+                f"{summary['copied']}/{summary['total']} jobs copied back | {summary['copying']} copying | {summary['queued']} queued | {summary['failed']} failed",
+                f"{human_readable_size(summary['bytes'])} copied back at {human_readable_size(summary['throughput'])}/s",
+            ]
+            for jobname in sorted(self.running):
+                lines.append(
+                    f"Hostname/IP: {self.job_hosts[jobname]} | Job: {jobname} | Copying back"
+                )
+            for jobname in self.failed:
+                lines.append(
+                    f"Hostname/IP: {self.job_hosts[jobname]} | Job: {jobname} | Copy-back failed"
+                )
+        return lines
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to timeout seconds for all submitted copy-backs to finish.
+        Returns True if they have."""
+        with self.lock:
+            futures = list(self.futures.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return len(not_done) == 0
+
+    def shutdown(self) -> None:
+        """Stop the pipeline, dropping copy-backs that have not started yet."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
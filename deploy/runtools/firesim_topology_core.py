@@ -6,15 +6,14 @@ from __future__ import annotations
 
 from runtools.user_topology import UserTopologies
 from runtools.firesim_topology_elements import (
+    FireSimLink,
+    FireSimNode,
     FireSimSwitchNode,
     FireSimServerNode,
     FireSimPipeNode,
 )
 
-from typing import List, Callable, Optional, Union, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from runtools.firesim_topology_elements import FireSimNode
+from typing import Dict, List, Callable, Optional, Tuple, Union, cast
 
 
 class FireSimTopology(UserTopologies):
@@ -23,6 +22,10 @@ class FireSimTopology(UserTopologies):
 
     This is designed to model tree-like topologies."""
 
+    # memoized dfs traversal, see _get_dfs_index
+    _dfs_index: Optional[Dict[type, List[FireSimNode]]] = None
+    _dfs_index_key: Optional[Tuple[int, Tuple[FireSimNode, ...]]] = None
+
     def __init__(self, user_topology_name: str, no_net_num_nodes: int) -> None:
         # This just constructs the user topology. an upper level pass manager
         # will apply passes to it.
@@ -34,36 +37,63 @@ class FireSimTopology(UserTopologies):
         config_func = getattr(self, user_topology_name)
         config_func()
 
-    def get_dfs_order(self) -> List[FireSimNode]:
-        """Return all nodes in the topology in dfs order, as a list."""
-        stack = list(self.roots)
+    def _get_dfs_index(self) -> Dict[type, List[FireSimNode]]:
+        """Return the memoized dfs traversal of the topology, keyed by node
+        type (FireSimNode for all nodes). This is rebuilt only when links have
+        been added or the roots have changed since it was last built."""
+        index_key = (FireSimLink.next_unique_link_identifier, tuple(self.roots))
+        if self._dfs_index is not None and self._dfs_index_key == index_key:
+            return self._dfs_index
+
+        # iterative post-order dfs (nodes come after their downlinks), visiting
+        # each node and link once.
         retlist: List[FireSimNode] = []
-        visitedonce = set()
-        while stack:
-            nextup = stack[0]
-            if nextup in visitedonce:
-                if nextup not in retlist:
-                    retlist.append(stack.pop(0))
+        visited = set()
+        for root in self.roots:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(root.downlinks))]
+            while stack:
+                node, downlinks = stack[-1]
+                for link in downlinks:
+                    nextup = link.get_downlink_side()
+                    if nextup not in visited:
+                        visited.add(nextup)
+                        stack.append((nextup, iter(nextup.downlinks)))
+                        break
                 else:
-                    stack.pop(0)
-            else:
-                visitedonce.add(nextup)
-                stack = (
-                    list(map(lambda x: x.get_downlink_side(), nextup.downlinks)) + stack
-                )
-        return retlist
+                    stack.pop()
+                    retlist.append(node)
+
+        self._dfs_index = {
+            FireSimNode: retlist,
+            FireSimSwitchNode: [x for x in retlist if isinstance(x, FireSimSwitchNode)],
+            FireSimServerNode: [x for x in retlist if isinstance(x, FireSimServerNode)],
+            FireSimPipeNode: [x for x in retlist if isinstance(x, FireSimPipeNode)],
+        }
+        self._dfs_index_key = index_key
+        return self._dfs_index
+
+    def get_dfs_order(self) -> List[FireSimNode]:
+        """Return all nodes in the topology in dfs order, as a list."""
+        return list(self._get_dfs_index()[FireSimNode])
 
     def get_dfs_order_switches(self) -> List[FireSimSwitchNode]:
         """Utility function that returns only switches, in dfs order."""
-        return [x for x in self.get_dfs_order() if isinstance(x, FireSimSwitchNode)]
+        return cast(
+            List[FireSimSwitchNode], list(self._get_dfs_index()[FireSimSwitchNode])
+        )
 
     def get_dfs_order_servers(self) -> List[FireSimServerNode]:
         """Utility function that returns only servers, in dfs order."""
-        return [x for x in self.get_dfs_order() if isinstance(x, FireSimServerNode)]
+        return cast(
+            List[FireSimServerNode], list(self._get_dfs_index()[FireSimServerNode])
+        )
 
     def get_dfs_order_pipes(self) -> List[FireSimPipeNode]:
         """Utility function that returns only partition hubs, in dfs order."""
-        return [x for x in self.get_dfs_order() if isinstance(x, FireSimPipeNode)]
+        return cast(List[FireSimPipeNode], list(self._get_dfs_index()[FireSimPipeNode]))
 
     def get_bfs_order(self) -> None:
         """return the nodes in the topology in bfs order"""
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import io
 import logging
 import abc
 import sys
+from array import array
+from tempfile import NamedTemporaryFile
 from fabric.contrib.project import rsync_project  # type: ignore
 from fabric.api import run, local, warn_only, get, put, cd, hide  # type: ignore
 from fabric.exceptions import CommandTimeout  # type: ignore
@@ -27,6 +30,14 @@ from runtools.simulation_data_classes import (
 )
 
 from runtools.run_farm_deploy_managers import InstanceDeployManager
+from runtools.ssh_pool import ssh_connection_pool
+from runtools.sim_boot_batch import shm_path
+from runtools.rootfs_extract import (
+    EXTRACT_UNSUPPORTED,
+    archive_name,
+    build_extract_script,
+    can_extract_outputs,
+)
 from typing import Optional, List, Dict, Tuple, Sequence, Union, Any, TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -207,6 +218,9 @@ class FireSimServerNode(FireSimNode):
     server_id_internal: int
     mac_address: Optional[MacAddress]
     plusarg_passthrough: Optional[str]
+    # whether the slot gets a qcow2 overlay backed by the job's rootfs instead
+    # of its own copy of it, see pass_use_rootfs_overlays
+    rootfs_overlay: bool
 
     def __init__(
         self,
@@ -235,6 +249,7 @@ class FireSimServerNode(FireSimNode):
         self.server_id_internal = FireSimServerNode.SERVERS_CREATED
         self.mac_address = None
         self.plusarg_passthrough = plusarg_passthrough
+        self.rootfs_overlay = False
         FireSimServerNode.SERVERS_CREATED += 1
 
     def mac_address_assignable(self) -> bool:
@@ -398,6 +413,34 @@ class FireSimServerNode(FireSimNode):
 
         return runcommand
 
+    def get_uplink_shm_files(self) -> List[str]:
+        """Return the paths (on the host) of the shared memory regions that
+        the switch and pipes this simulation connects to create on startup.
+        The simulation can only be started once they are set up."""
+        shm_files = []
+        for i, ul in enumerate(self.uplinks):
+            uplink_node = ul.get_uplink_side()
+            if isinstance(uplink_node, FireSimPipeNode):
+                uplink_node.pipe_builder.collect_partition_boundary_params()
+                cutbridge_idx = uplink_node.get_cutbridge_global_idx(self)
+                for direction in ["t2h", "h2t"]:
+                    for j in range(2):
+                        shm_files.append(
+                            shm_path(f"pipe_{direction}{cutbridge_idx:03d}_{j}")
+                        )
+            elif (
+                i == 0
+                and isinstance(uplink_node, FireSimSwitchNode)
+                and not ul.link_crosses_hosts()
+            ):
+                # the port named after the first uplink, see get_sim_start_command
+                for direction in ["nts", "stn"]:
+                    for j in range(2):
+                        shm_files.append(
+                            shm_path(f"port_{direction}{ul.get_global_link_id()}_{j}")
+                        )
+        return shm_files
+
     def get_local_job_results_dir_path(self) -> str:
         """Return local job results directory path. e.g.:
         results-workload/workloadname/jobname/
@@ -458,10 +501,19 @@ class FireSimServerNode(FireSimNode):
         sim_start_script_local_path = self.write_script("sim-run.sh", start_cmd)
         return sim_start_script_local_path
 
-    def copy_back_job_results_from_run(self, slotno: int) -> None:
+    def copy_back_job_results_from_run(
+        self, slotno: int, compress: bool = True
+    ) -> None:
         """
-        1) Copy back UART log
-        2) Mount rootfs on the remote node and copy back files
+        1) Copy back files from the rootfs, as a single archive extracted from
+           the image with debugfs where possible (see
+           runtools/rootfs_extract.py), otherwise by mounting the rootfs on the
+           remote node
+        2) Copy back output files generated by the simulator (e.g. the UART
+           log), batched into a single rsync
+        3) Signal to the monitoring flow that the job is complete
+
+        If compress is set, files are compressed in transit.
         """
         assert self.has_assigned_host_instance(), "copy requires assigned host instance"
 
@@ -474,12 +526,11 @@ class FireSimServerNode(FireSimNode):
                 "--no-perms --chmod=ugo=rwX",  # obey local umask
             ]
         )
+        copy_back_default_opts = "-pthrvz" if compress else "-pthrv"
 
         jobinfo = self.get_job()
         job_dir = self.get_local_job_results_dir_path()
 
-        self.write_job_complete_file()
-
         dest_sim_dir = self.get_host_instance().get_sim_dir()
         dest_sim_slot_dir = f"{dest_sim_dir}/sim_slot_{slotno}/"
 
@@ -505,9 +556,99 @@ class FireSimServerNode(FireSimNode):
                 check_script(cmd)
                 run(f"sudo {cmd} {mnt}")
 
-        # mount rootfs, copy files from it back to local system
+        def extract_rootfs_outputs(rfsname: str) -> bool:
+            """Copy back the job's outputs from its rootfs image without
+            mounting it. Return False if the image can't be read that way."""
+            if rfsname.endswith(".qcow2") or not can_extract_outputs(jobinfo.outputs):
+                return False
+            remote_script = dest_sim_slot_dir + "extract-outputs.sh"
+            put(
+                io.StringIO(build_extract_script(rfsname, jobinfo.outputs, compress)),
+                remote_script,
+            )
+            with cd(dest_sim_slot_dir), warn_only():
+                extract_cap = run(f"bash {remote_script}")
+            if extract_cap.return_code == EXTRACT_UNSUPPORTED:
+                rootLogger.debug(
+                    f"Can't extract outputs from {rfsname} without mounting it."
+                )
+                return False
+            if extract_cap.failed:
+                raise Exception(f"Failed to extract outputs from {rfsname}.")
+            if extract_cap.strip():
+                # the script only prints the errors debugfs ran into
+                rootLogger.warning(
+                    f"Some outputs of job {jobinfo.jobname} could not be extracted from {rfsname}:\n{extract_cap}"
+                )
+
+            # the archive is already compressed (if compress is set)
+            archive = archive_name(compress)
+            rsync_cap = rsync_project(
+                remote_dir=dest_sim_slot_dir + archive,
+                local_dir=job_dir,
+                ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
+                extra_opts=copy_back_extra_opts,
+                default_opts="-pthrv",
+                upload=False,
+                capture=True,
+            )
+            rootLogger.debug(rsync_cap)
+            rootLogger.debug(rsync_cap.stderr)
+            local(
+                f"tar -xf {job_dir}{archive} -C {job_dir} --no-same-owner --no-same-permissions && rm -f {job_dir}{archive}"
+            )
+            run(f"rm -f {dest_sim_slot_dir}{archive}")
+            return True
+
+        def copy_back(outputs: List[str]) -> None:
+            """Copy back outputs (paths relative to the sim slot dir) to the
+            local job results dir."""
+            batched = []
+            with warn_only():
+                for output in outputs:
+                    # globs are only expanded by the remote shell and a trailing
+                    # slash changes what rsync copies, so those get their own rsync
+                    if output.endswith("/") or any(c in output for c in "*?["):
+                        rsync_cap = rsync_project(
+                            remote_dir=dest_sim_slot_dir + output,
+                            local_dir=job_dir,
+                            ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
+                            extra_opts=copy_back_extra_opts,
+                            default_opts=copy_back_default_opts,
+                            upload=False,
+                            capture=True,
+                        )
+                        rootLogger.debug(rsync_cap)
+                        rootLogger.debug(rsync_cap.stderr)
+                    else:
+                        batched.append(output)
+
+                if not batched:
+                    return
+                with NamedTemporaryFile("w", prefix="firesim-copy-back-") as files_from:
+                    files_from.write("\n".join(batched) + "\n")
+                    files_from.flush()
+                    rsync_cap = rsync_project(
+                        remote_dir=dest_sim_slot_dir,
+                        local_dir=job_dir,
+                        ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
+                        extra_opts=f"{copy_back_extra_opts} --no-relative --files-from={files_from.name}",
+                        default_opts=copy_back_default_opts,
+                        upload=False,
+                        capture=True,
+                    )
+                    rootLogger.debug(rsync_cap)
+                    rootLogger.debug(rsync_cap.stderr)
+
+        ## output files generated by the simulator that live on the host:
+        ## e.g. uartlog, memory_stats.csv, etc
+        outputs = list(jobinfo.simoutputs)
+
         rfsname = self.get_rootfs_name()
-        if rfsname is not None:
+        if rfsname is not None and extract_rootfs_outputs(rfsname):
+            copy_back(outputs)
+        elif rfsname is not None:
+            # mount rootfs, copy files from it back to local system
             is_qcow2 = rfsname.endswith(".qcow2")
             mountpoint = dest_sim_slot_dir + "mountpoint"
 
@@ -529,19 +670,11 @@ class FireSimServerNode(FireSimNode):
                 # ignore if this errors. not all rootfses have /etc/sysconfig/nfs
                 run(f"""chattr -i {mountpoint}/etc/sysconfig/nfs""")
 
-            ## copy back files from inside the rootfs
-            with warn_only():
-                for outputfile in jobinfo.outputs:
-                    rsync_cap = rsync_project(
-                        remote_dir=mountpoint + outputfile,
-                        local_dir=job_dir,
-                        ssh_opts="-o StrictHostKeyChecking=no",
-                        extra_opts=copy_back_extra_opts,
-                        upload=False,
-                        capture=True,
-                    )
-                    rootLogger.debug(rsync_cap)
-                    rootLogger.debug(rsync_cap.stderr)
+            ## copy back files from inside the rootfs, along with the
+            ## simulator's outputs
+            copy_back(
+                ["mountpoint" + outputfile for outputfile in jobinfo.outputs] + outputs
+            )
 
             ## unmount
             umount(mountpoint, dest_sim_slot_dir)
@@ -549,22 +682,12 @@ class FireSimServerNode(FireSimNode):
             ## if qcow2, detach .qcow2 image from the device, we're done with it
             if is_qcow2:
                 run_only_aws(f"""sudo qemu-nbd -d {rfsname}""")
+        else:
+            copy_back(outputs)
 
-        ## copy output files generated by the simulator that live on the host:
-        ## e.g. uartlog, memory_stats.csv, etc
-        remote_sim_run_dir = dest_sim_slot_dir
-        for simoutputfile in jobinfo.simoutputs:
-            with warn_only():
-                rsync_cap = rsync_project(
-                    remote_dir=remote_sim_run_dir + simoutputfile,
-                    local_dir=job_dir,
-                    ssh_opts="-o StrictHostKeyChecking=no",
-                    extra_opts=copy_back_extra_opts,
-                    upload=False,
-                    capture=True,
-                )
-                rootLogger.debug(rsync_cap)
-                rootLogger.debug(rsync_cap.stderr)
+        # only now that everything is copied back, let the monitoring flow
+        # consider this job complete (which may terminate the host)
+        self.write_job_complete_file()
 
     def get_sim_kill_command(self, slotno: int) -> str:
         """return the command to kill the simulation. assumes it will be
@@ -607,10 +730,8 @@ class FireSimServerNode(FireSimNode):
         if hwcfg.driver_tar is not None:
             return None
 
-        return (
-            str(hwcfg.local_tarball_path(hwcfg.get_driver_tar_filename())),
-            hwcfg.get_driver_tar_filename(),
-        )
+        assert hwcfg.tarball_path is not None, "driver tarball was not built"
+        return (str(hwcfg.tarball_path), hwcfg.get_driver_tar_filename())
 
     def get_required_files_local_paths(self) -> List[Tuple[str, str]]:
         """Return local and remote paths of all stuff needed to run this simulation as
@@ -632,6 +753,30 @@ class FireSimServerNode(FireSimNode):
 
         return all_paths
 
+    def get_job_files_local_paths(self) -> List[Tuple[str, str]]:
+        """Return local paths and remote names of the files specific to the job
+        assigned to this simulation: its rootfs, boot binary and simulation
+        inputs. These are what changes in a sim slot when a queued job
+        replaces the one that ran there (see runtools/job_queue.py)."""
+        all_paths = []
+        job_rootfs_path = self.get_job().rootfs_path()
+        if job_rootfs_path is not None:
+            self_rootfs_name = self.get_rootfs_name()
+            assert self_rootfs_name is not None
+            all_paths.append((job_rootfs_path, self_rootfs_name))
+        all_paths.append((self.get_job().bootbinary_path(), self.get_bootbin_name()))
+        all_paths += self.get_job().get_siminputs()
+        return all_paths
+
+    def get_sim_infrastructure_local_paths(self, uridir: str) -> List[Tuple[str, str]]:
+        """Return local and remote paths of everything that has to be copied
+        into this simulation's slot on its run host, including files
+        downloaded from URIs into uridir."""
+        files_to_copy = self.get_required_files_local_paths()
+        hwcfg = self.get_resolved_server_hardware_config()
+        files_to_copy.extend(hwcfg.get_local_uri_paths(uridir))
+        return files_to_copy
+
     def get_agfi(self) -> str:
         """Return the AGFI that should be flashed."""
         agfi = self.get_resolved_server_hardware_config().agfi
@@ -658,7 +803,21 @@ class FireSimServerNode(FireSimNode):
         else:
             # prefix rootfs name with the job name to disambiguate in supernode
             # cases
-            return self.get_job_name() + "-" + rootfs_path.split("/")[-1]
+            rootfs_name = self.get_job_name() + "-" + rootfs_path.split("/")[-1]
+            if self.uses_rootfs_overlay():
+                # the overlay is attached like any other qcow2 rootfs
+                rootfs_name += ".qcow2"
+            return rootfs_name
+
+    def uses_rootfs_overlay(self) -> bool:
+        """Return True iff the slot's rootfs is a qcow2 overlay backed by the
+        (raw) rootfs of the job, rather than a copy of it."""
+        rootfs_path = self.get_job().rootfs_path()
+        return (
+            self.rootfs_overlay
+            and rootfs_path is not None
+            and not rootfs_path.endswith(".qcow2")
+        )
 
     def get_all_rootfs_names(self) -> List[Optional[str]]:
         """Get all rootfs filenames as a list."""
@@ -691,10 +850,12 @@ class FireSimSuperNodeServerNode(FireSimServerNode):
     def __init__(self) -> None:
         super().__init__()
 
-    def copy_back_job_results_from_run(self, slotno: int) -> None:
+    def copy_back_job_results_from_run(
+        self, slotno: int, compress: bool = True
+    ) -> None:
         """This override is to call copy back job results for all the dummy nodes too."""
         # first call the original
-        super().copy_back_job_results_from_run(slotno)
+        super().copy_back_job_results_from_run(slotno, compress)
 
         # call on all siblings
         num_siblings = self.supernode_get_num_siblings_plus_one()
@@ -706,7 +867,7 @@ class FireSimSuperNodeServerNode(FireSimServerNode):
         for sibindex in range(1, num_siblings):
             sib = self.supernode_get_sibling(sibindex)
             sib.assign_host_instance(super_server_host)
-            sib.copy_back_job_results_from_run(slotno)
+            sib.copy_back_job_results_from_run(slotno, compress)
 
     def supernode_get_num_siblings_plus_one(self) -> int:
         """This returns the number of siblings the supernodeservernode has,
@@ -904,7 +1065,8 @@ class FireSimSwitchNode(FireSimNode):
     # used to give switches a global ID
     SWITCHES_CREATED: int = 0
     switch_id_internal: int
-    switch_table: List[int]
+    # mac (without prefix) -> port, see pass_compute_switching_tables
+    switch_table: array[int]
     switch_link_latency: Optional[int]
     switch_switching_latency: Optional[int]
     switch_bandwidth: Optional[int]
@@ -919,22 +1081,17 @@ class FireSimSwitchNode(FireSimNode):
         super().__init__()
         self.switch_id_internal = FireSimSwitchNode.SWITCHES_CREATED
         FireSimSwitchNode.SWITCHES_CREATED += 1
-        self.switch_table = []
+        self.switch_table = array("H")
         self.switch_link_latency = link_latency
         self.switch_switching_latency = switching_latency
         self.switch_bandwidth = bandwidth
 
         # switch_builder is a class designed to emit a particular switch model.
         # it should take self and then be able to emit a particular switch model's
-        # binary. this is populated when build_switch_sim_binary is called
-        # self.switch_builder = None
+        # binary. the binary is built (or taken from the build cache) by
+        # FireSimTopologyWithPasses.pass_build_required_switches_and_pipes
         self.switch_builder = AbstractSwitchToSwitchConfig(self)
 
-    def build_switch_sim_binary(self) -> None:
-        """This actually emits a config and builds the switch binary that
-        can be used to do the simulation."""
-        self.switch_builder.buildswitch()
-
     def get_required_files_local_paths(self) -> List[Tuple[str, str]]:
         """Return local paths of all stuff needed to run this simulation as
         array."""
@@ -1006,9 +1163,6 @@ class FireSimPipeNode(FireSimNode):
             self.add_downlink(server)
         self.partition_edge = server_edge
 
-    def build_pipe_sim_binary(self) -> None:
-        self.pipe_builder.buildpipe()
-
     def get_pipe_start_command(self, sudo: bool) -> str:
         assert self.partition_config is not None
         return self.pipe_builder.get_pipe_simulation_command(sudo)
@@ -9,20 +9,49 @@ import logging
 import datetime
 import sys
 import yaml
-from fabric.api import env, parallel, execute, run, local, warn_only  # type: ignore
+from collections import Counter
+from fabric.api import env, parallel, execute, run, local, settings, warn_only  # type: ignore
 from colorama import Fore, Style  # type: ignore
-from functools import reduce
+from array import array
+from itertools import chain
 from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
 
 from runtools.firesim_topology_elements import (
     FireSimNode,
     FireSimPipeNode,
     FireSimServerNode,
     FireSimDummyServerNode,
+    FireSimSuperNodeServerNode,
     FireSimSwitchNode,
 )
 from runtools.firesim_topology_core import FireSimTopology
-from runtools.utils import MacAddress
+from runtools.utils import (
+    MacAddress,
+    get_content_hash,
+    human_readable_size,
+    run_in_forked_process,
+)
+from runtools.job_events import JobEventWatcher
+from runtools.copy_back import CopyBackPipeline
+from runtools.job_queue import JobQueue, JobRuntimeHistory, order_jobs
+from runtools.host_packing import (
+    HostMappingReport,
+    PackedHost,
+    min_hosts_for_sims,
+    pack_groups,
+    simple_mapping_fits,
+)
+from runtools.tracing import traced_methods
+from runtools.uri_cache import URI_DOWNLOAD_WORKERS
+from runtools.run_status import (
+    RunStatusStream,
+    describe_summary,
+    describe_transition,
+)
+from runtools.model_build_cache import build_model_binaries
+from runtools.switch_model_config import SWITCH_SOURCES
+from runtools.pipe_model_config import PIPE_SOURCES
 from runtools.simulation_data_classes import (
     TracerVConfig,
     AutoCounterConfig,
@@ -32,7 +61,18 @@ from runtools.simulation_data_classes import (
 )
 
 from runtools.run_farm_deploy_managers import InstanceDeployManager
-from typing import Dict, Any, cast, List, Set, TYPE_CHECKING, Callable, Optional
+from runtools.run_farm import Inst
+from typing import (
+    Dict,
+    Any,
+    cast,
+    List,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    Callable,
+    Optional,
+)
 
 if TYPE_CHECKING:
     from runtools.run_farm import RunFarm
@@ -45,6 +85,22 @@ if TYPE_CHECKING:
 
 rootLogger = logging.getLogger()
 
+# when monitoring jobs in event mode, re-query all hosts at least this often
+# (in seconds) regardless of whether any exits were reported
+JOB_MONITORING_RECONCILE_INTERVAL = 60
+
+# while job results are being copied back in the background, refresh the
+# status display at least this often (in seconds)
+COPY_BACK_STATUS_INTERVAL = 5
+
+# at most this many simulation drivers (or driver tarballs) are built at once
+DRIVER_BUILD_WORKERS = 4
+
+
+def build_sim_driver_on_localhost(hwcfg: RuntimeHWConfig) -> None:
+    with settings(host_string="localhost"):
+        hwcfg.build_sim_driver()
+
 
 @parallel
 def instance_liveness() -> None:
@@ -92,6 +148,9 @@ def instance_liveness() -> None:
     )
 
 
+@traced_methods(
+    "pass", include=lambda name: name.startswith("pass_") or name.endswith("_passes")
+)
 class FireSimTopologyWithPasses:
     """This class constructs a FireSimTopology, then performs a series of passes
     on the topology to map it all the way to something usable to deploy a simulation.
@@ -116,6 +175,15 @@ class FireSimTopologyWithPasses:
     defaultsynthprintconfig: SynthPrintConfig
     defaultpartitionconfig: PartitionConfig
     terminateoncompletion: bool
+    job_monitoring_mode: str
+    copy_back_workers: int
+    copy_back_compress: bool
+    status_display: str
+    job_queue_order: str
+    job_queue: Optional[JobQueue]
+    rootfs_overlays: bool
+    host_mapping: str
+    host_mapping_report: Optional[HostMappingReport]
 
     def __init__(
         self,
@@ -138,6 +206,13 @@ class FireSimTopologyWithPasses:
         build_recipes: RuntimeBuildRecipes,
         default_metasim_mode: bool,
         default_plusarg_passthrough: str,
+        job_monitoring_mode: str = "event",
+        copy_back_workers: int = 4,
+        copy_back_compress: bool = True,
+        status_display: str = "delta",
+        job_queue_order: str = "none",
+        rootfs_overlays: bool = False,
+        host_mapping: str = "simple",
     ) -> None:
         self.passes_used = []
         self.user_topology_name = user_topology_name
@@ -160,6 +235,15 @@ class FireSimTopologyWithPasses:
         self.defaultpartitionconfig = defaultpartitionconfig
         self.default_metasim_mode = default_metasim_mode
         self.default_plusarg_passthrough = default_plusarg_passthrough
+        self.job_monitoring_mode = job_monitoring_mode
+        self.copy_back_workers = copy_back_workers
+        self.copy_back_compress = copy_back_compress
+        self.status_display = status_display
+        self.job_queue_order = job_queue_order
+        self.job_queue = None
+        self.rootfs_overlays = rootfs_overlays
+        self.host_mapping = host_mapping
+        self.host_mapping_report = None
 
         self.phase_one_passes()
 
@@ -200,20 +284,23 @@ class FireSimTopologyWithPasses:
                 if node.mac_address_assignable():
                     node.downlinkmacs = [node.get_mac_address()]
             else:
-                childdownlinkmacs: List[List[MacAddress]] = []
-                for x in node.downlinks:
-                    childdownlinkmacs.append(x.get_downlink_side().downlinkmacs)
-
-                # flatten
-                node.downlinkmacs = reduce(lambda x, y: x + y, childdownlinkmacs)
+                # flatten, in time linear in the number of macs
+                node.downlinkmacs = list(
+                    chain.from_iterable(
+                        x.get_downlink_side().downlinkmacs for x in node.downlinks
+                    )
+                )
 
         switches_dfs_order = self.firesimtopol.get_dfs_order_switches()
+        num_macs = MacAddress.next_mac_to_allocate()
 
         for switch in switches_dfs_order:
             uplinkportno = len(switch.downlinks)
 
-            # prepopulate the table with the last port, which will be
-            switchtab = [uplinkportno for x in range(MacAddress.next_mac_to_allocate())]
+            # prepopulate the table with the last port, which will be the
+            # uplink. a packed array of port numbers (2 bytes per mac) keeps
+            # this small even with many switches and nodes.
+            switchtab = array("H", [uplinkportno]) * num_macs
             for port_no in range(len(switch.downlinks)):
                 portmacs = switch.downlinks[port_no].get_downlink_side().downlinkmacs
                 for mac in portmacs:
@@ -313,6 +400,221 @@ class FireSimTopologyWithPasses:
             else:
                 assert False, "Mixed downlinks currently not supported." ""
 
+    def pass_packed_host_node_mapping(self) -> None:
+        """Pack a networked topology onto as few run farm hosts as possible,
+        then with as few switch-to-switch links crossing hosts as possible,
+        and report how good the mapping is. See runtools/host_packing.py."""
+        switches = self.firesimtopol.get_dfs_order_switches()
+        servers = [
+            server
+            for server in self.firesimtopol.get_dfs_order_servers()
+            if not isinstance(server, FireSimDummyServerNode)
+        ]
+        max_switches = Inst.MAX_SWITCH_AND_PIPE_SLOTS_ALLOWED
+
+        # every switch with simulations as downlinks forms a group with them,
+        # every simulation without a switch forms a group of its own
+        group_switch: List[Optional[FireSimSwitchNode]] = []
+        group_servers: List[List[FireSimServerNode]] = []
+        group_of_switch: Dict[FireSimSwitchNode, int] = {}
+        group_of_server: Dict[FireSimServerNode, int] = {}
+        for switch in switches:
+            downlink_servers = []
+            for downlink in switch.downlinks:
+                node = downlink.get_downlink_side()
+                if isinstance(node, FireSimDummyServerNode) or not isinstance(
+                    node, FireSimServerNode
+                ):
+                    continue
+                assert group_of_server.get(node, len(group_switch)) == len(
+                    group_switch
+                ), "Simulations can only be connected to a single switch."
+                if node not in group_of_server:
+                    group_of_server[node] = len(group_switch)
+                    downlink_servers.append(node)
+            if downlink_servers:
+                group_of_switch[switch] = len(group_switch)
+                group_switch.append(switch)
+                group_servers.append(downlink_servers)
+        for server in servers:
+            if server not in group_of_server:
+                group_of_server[server] = len(group_switch)
+                group_switch.append(None)
+                group_servers.append([server])
+
+        # switch-to-switch links (one entry per link) and each switch's
+        # neighbors across them
+        links: List[Tuple[FireSimSwitchNode, FireSimSwitchNode]] = []
+        neighbors: Dict[FireSimSwitchNode, List[FireSimSwitchNode]] = {
+            switch: [] for switch in switches
+        }
+        for switch in switches:
+            for downlink in switch.downlinks:
+                node = downlink.get_downlink_side()
+                if isinstance(node, FireSimSwitchNode):
+                    links.append((switch, node))
+                    neighbors[switch].append(node)
+                    neighbors[node].append(switch)
+
+        # groups want to share a host with groups they are linked to and,
+        # less so, with the groups next to them below the same switch
+        related: List[Dict[int, int]] = [{} for _ in group_switch]
+
+        def relate(a: int, b: int, weight: int) -> None:
+            if a != b:
+                related[a][b] = related[a].get(b, 0) + weight
+                related[b][a] = related[b].get(a, 0) + weight
+
+        for upper, lower in links:
+            if upper in group_of_switch and lower in group_of_switch:
+                relate(group_of_switch[upper], group_of_switch[lower], 2)
+        for switch in switches:
+            below = [
+                group_of_switch[node]
+                for node in neighbors[switch]
+                if node in group_of_switch
+                and any(ul.get_uplink_side() is switch for ul in node.uplinks)
+            ]
+            for a, b in zip(below, below[1:]):
+                relate(a, b, 1)
+
+        def place_switches(
+            hosts: List[PackedHost],
+        ) -> Tuple[Dict[FireSimSwitchNode, int], int]:
+            """Place the switches of a packing, including the ones without
+            simulations. Return the host of every switch and the number of
+            hosts, including switch-only hosts for switches that can't go
+            anywhere else."""
+            host_of: Dict[FireSimSwitchNode, int] = {}
+            switch_counts = [host.switches for host in hosts]
+            for index, host in enumerate(hosts):
+                for group in host.groups:
+                    group_sw = group_switch[group]
+                    if group_sw is not None:
+                        host_of[group_sw] = index
+            unplaced = [switch for switch in switches if switch not in host_of]
+
+            def place(switch: FireSimSwitchNode, index: int) -> None:
+                if index == len(switch_counts):
+                    # a new switch-only host
+                    switch_counts.append(0)
+                host_of[switch] = index
+                switch_counts[index] += 1
+
+            # downlinks come before their uplinks in dfs order, so most
+            # switches have a placed neighbor the first time around. the rest
+            # are placed top-down
+            for order in [unplaced, list(reversed(unplaced))]:
+                for switch in order:
+                    if switch in host_of:
+                        continue
+                    votes = Counter(
+                        host_of[node]
+                        for node in neighbors[switch]
+                        if node in host_of
+                        and switch_counts[host_of[node]] < max_switches
+                    )
+                    if votes:
+                        place(switch, max(votes, key=lambda h: (votes[h], -h)))
+            for switch in unplaced:
+                if switch in host_of:
+                    continue
+                with_room = [
+                    index
+                    for index, count in enumerate(switch_counts)
+                    if count < max_switches
+                ]
+                if with_room:
+                    place(switch, min(with_room, key=lambda h: switch_counts[h]))
+                else:
+                    place(switch, len(switch_counts))
+            return host_of, len(switch_counts)
+
+        capacities = self.run_farm.get_available_sim_host_capacities()
+        num_switch_only_hosts = self.run_farm.get_available_switch_only_host_count()
+        best = None
+        for use_affinity in [True, False]:
+            hosts = pack_groups(
+                [len(group) for group in group_servers],
+                [0 if sw is None else 1 for sw in group_switch],
+                related,
+                capacities,
+                max_switches,
+                use_affinity,
+            )
+            if hosts is None:
+                continue
+            host_of_switch, num_hosts = place_switches(hosts)
+            cross_host_links = sum(
+                host_of_switch[upper] != host_of_switch[lower] for upper, lower in links
+            )
+            key = (num_hosts, cross_host_links)
+            if best is None or key < best[0]:
+                best = (key, hosts, host_of_switch)
+        if best is None:
+            rootLogger.critical(
+                f"ERROR: The run farm does not have enough hosts with enough simulation slots for the {len(servers)} simulations of this topology. Add more hosts in your run farm configuration (e.g., config_runtime.yaml)."
+            )
+            raise Exception
+        (num_hosts, cross_host_links), hosts, host_of_switch = best
+
+        # allocate the smallest run farm host that fits each packed host,
+        # fullest first, so that the packing always fits
+        insts: Dict[int, Inst] = {}
+        for index in sorted(range(len(hosts)), key=lambda h: -hosts[h].sims):
+            handle = self.run_farm.get_smallest_sim_host_handle(
+                num_sims=hosts[index].sims
+            )
+            insts[index] = self.run_farm.allocate_sim_host(handle)
+        for index in range(len(hosts), num_hosts):
+            handle = self.run_farm.get_switch_only_host_handle()
+            insts[index] = self.run_farm.allocate_sim_host(handle)
+        hosts_by_slots: Dict[int, int] = {}
+        for inst in insts.values():
+            slots = inst.MAX_SIM_SLOTS_ALLOWED
+            hosts_by_slots[slots] = hosts_by_slots.get(slots, 0) + 1
+
+        for switch in switches:
+            insts[host_of_switch[switch]].add_switch(switch)
+        host_of_group = {
+            group: index for index, host in enumerate(hosts) for group in host.groups
+        }
+        for server in servers:
+            insts[host_of_group[group_of_server[server]]].add_simulation(server)
+
+        # the simple mapping gives every switch its own host. it would only
+        # have mapped the topology if the topology has no mapper of its own,
+        # has no mixed downlinks or simulations without a switch, and the run
+        # farm has the hosts for it
+        simple_maps = (
+            self.firesimtopol.custom_mapper is None
+            and all(sw is not None for sw in group_switch)
+            and not any(
+                isinstance(downlink.get_downlink_side(), FireSimSwitchNode)
+                for switch in group_of_switch
+                for downlink in switch.downlinks
+            )
+            and simple_mapping_fits(
+                [len(group) for group in group_servers],
+                len(switches) - len(group_switch),
+                capacities,
+                num_switch_only_hosts,
+            )
+        )
+        self.host_mapping_report = HostMappingReport(
+            hosts_by_slots,
+            min_hosts_for_sims(len(servers), capacities),
+            len(servers),
+            sum(inst.MAX_SIM_SLOTS_ALLOWED for inst in insts.values()),
+            len(links),
+            cross_host_links,
+            len(switches) if simple_maps else None,
+            len(links) if simple_maps else None,
+        )
+        rootLogger.info("Packed host mapping:")
+        for line in self.host_mapping_report.lines():
+            rootLogger.info("  " + line)
+
     def pass_simple_partitioned_host_node_mapping(self) -> None:
         """A partitioned simulation topo without any networking simulation on top."""
         pipes = self.firesimtopol.get_dfs_order_pipes()
@@ -448,9 +750,26 @@ class FireSimTopologyWithPasses:
 
         This is currently not a smart mapping: If your
         top level elements are switches, it will assume you're simulating a
-        networked config,"""
-
-        if self.firesimtopol.custom_mapper is None:
+        networked config, which is packed onto hosts instead if host_mapping is
+        packed."""
+
+        roots = self.firesimtopol.roots
+        if (
+            self.host_mapping == "packed"
+            and any(isinstance(x, FireSimSwitchNode) for x in roots)
+            and all(
+                isinstance(x, FireSimServerNode) or isinstance(x, FireSimSwitchNode)
+                for x in roots
+            )
+        ):
+            # networked topologies are packed, even if they have a custom
+            # mapper
+            if self.firesimtopol.custom_mapper is not None:
+                rootLogger.info(
+                    "host_mapping is packed, ignoring the custom mapper of the topology."
+                )
+            self.pass_packed_host_node_mapping()
+        elif self.firesimtopol.custom_mapper is None:
             """Use default mapping strategy. The topol has not specified a
             special one."""
             # if your roots are servers, just pack as tightly as possible, since
@@ -559,10 +878,68 @@ class FireSimTopologyWithPasses:
             server.allocate_nbds()
 
     def pass_assign_jobs(self) -> None:
-        """assign jobs to simulations."""
+        """assign jobs to simulations. with a job queue, the simulations get
+        the first jobs in queue order, and the rest are queued up for
+        runworkload (see runtools/job_queue.py)."""
         servers = self.firesimtopol.get_dfs_order_servers()
-        for i in range(len(servers)):
-            servers[i].assign_job(self.workload.get_job(i))
+        if self.job_queue_order == "none":
+            for i in range(len(servers)):
+                servers[i].assign_job(self.workload.get_job(i))
+            return
+
+        if self.workload.uniform_mode:
+            raise Exception(
+                "A job queue needs a workload that lists its jobs (workloads), not a uniform one."
+            )
+        if not all(
+            type(server) is FireSimServerNode
+            and not server.is_partition()
+            and len(server.uplinks) == 0
+            for server in servers
+        ):
+            raise Exception(
+                "A job queue can only be used with non-networked, non-partitioned, non-supernode topologies."
+            )
+        history = JobRuntimeHistory()
+        jobs = order_jobs(self.workload.jobs, self.job_queue_order, history)
+        for server, job in zip(servers, jobs):
+            server.assign_job(job)
+        self.job_queue = JobQueue(jobs[len(servers) :], history)
+        rootLogger.debug(
+            f"Queued {len(self.job_queue)} jobs in {self.job_queue_order} order."
+        )
+
+    def pass_use_rootfs_overlays(self) -> None:
+        """with rootfs_overlays, give each simulation a thin qcow2 overlay
+        backed by its job's rootfs (stored once per host) instead of its own
+        copy of the rootfs. overlays are attached through NBD like any other
+        qcow2 rootfs, so simulations on hosts without NBD support keep their
+        copies."""
+        if not self.rootfs_overlays:
+            return
+        if self.job_queue is not None:
+            raise Exception("rootfs_overlays can not be used with a job queue.")
+
+        hosts_without_nbd = set()
+        for server in self.firesimtopol.get_dfs_order_servers():
+            # supernode siblings are handled with the server that runs them
+            if isinstance(server, FireSimDummyServerNode):
+                continue
+            if not server.has_assigned_host_instance():
+                continue
+            host_inst = server.get_host_instance()
+            if host_inst.instance_deploy_manager.nbd_tracker is None:
+                hosts_without_nbd.add(str(host_inst.host))
+                continue
+            server.rootfs_overlay = True
+            if isinstance(server, FireSimSuperNodeServerNode):
+                for sibling in range(1, server.supernode_get_num_siblings_plus_one()):
+                    server.supernode_get_sibling(sibling).rootfs_overlay = True
+
+        if hosts_without_nbd:
+            rootLogger.warning(
+                f"rootfs_overlays needs NBD support, which these hosts don't have, so their simulations get copies of their rootfses: {', '.join(sorted(hosts_without_nbd))}"
+            )
 
     def phase_one_passes(self) -> None:
         """These are passes that can run without requiring host-node binding.
@@ -574,65 +951,144 @@ class FireSimTopologyWithPasses:
         self.pass_apply_default_hwconfig()
         self.pass_apply_default_params()
         self.pass_assign_jobs()
+        self.pass_use_rootfs_overlays()
         self.pass_allocate_nbd_devices()
 
-        self.pass_create_topology_diagram()
-
     def pass_build_required_drivers(self) -> None:
-        """Build all simulation drivers. The method we're calling here won't actually
-        repeat the build process more than once per run of the manager."""
-
-        def build_drivers_helper(servers: List[FireSimServerNode]) -> None:
-            for server in servers:
-                resolved_cfg = server.get_resolved_server_hardware_config()
-
-                if resolved_cfg.driver_tar is not None:
-                    rootLogger.debug(
-                        f"skipping driver build because we're using {resolved_cfg.driver_tar}"
-                    )
-                    continue  # skip building or tarballing if we have a prebuilt one
-
-                resolved_cfg.build_sim_driver()
-                resolved_cfg.build_sim_tarball(
-                    server.get_tarball_files_paths(),
-                    resolved_cfg.get_driver_tar_filename(),
+        """Build all simulation drivers and their tarballs. Each distinct driver
+        is built once (per run of the manager), with up to
+        DRIVER_BUILD_WORKERS builds running at once."""
+        # hardware configs that need a driver, with the first server using
+        # each (which supplies the rest of the tarball's files)
+        to_build: Dict[int, Tuple[RuntimeHWConfig, FireSimServerNode]] = {}
+        for server in self.firesimtopol.get_dfs_order_servers():
+            resolved_cfg = server.get_resolved_server_hardware_config()
+            if resolved_cfg.driver_tar is not None:
+                rootLogger.debug(
+                    f"skipping driver build because we're using {resolved_cfg.driver_tar}"
+                )
+                continue  # skip building or tarballing if we have a prebuilt one
+            to_build.setdefault(id(resolved_cfg), (resolved_cfg, server))
+
+        # configs with the same quintuplet (and build target) share a driver
+        drivers: Dict[Tuple[str, str], List[RuntimeHWConfig]] = {}
+        for hwcfg, _ in to_build.values():
+            if not hwcfg.driver_built:
+                key = (
+                    hwcfg.get_deployquintuplet_for_config(),
+                    hwcfg.get_driver_build_target(),
                 )
+                drivers.setdefault(key, []).append(hwcfg)
 
-        servers = self.firesimtopol.get_dfs_order_servers()
-        execute(build_drivers_helper, servers, hosts=["localhost"])
+        def build_driver(hwcfgs: List[RuntimeHWConfig]) -> None:
+            description = f"{hwcfgs[0].driver_type_message} driver build for {hwcfgs[0].get_deployquintuplet_for_config()}"
+            if (
+                run_in_forked_process(
+                    description, build_sim_driver_on_localhost, hwcfgs[0]
+                )
+                != 0
+            ):
+                raise Exception(f"{description} failed. See log for details.")
+            for hwcfg in hwcfgs:
+                hwcfg.driver_built = True
 
-    def pass_build_required_switches(self) -> None:
-        """Build all the switches required for this simulation."""
+        if drivers:
+            rootLogger.info(
+                f"Building {len(drivers)} drivers for {len(to_build)} hardware configs."
+            )
+            with ThreadPoolExecutor(
+                max_workers=min(DRIVER_BUILD_WORKERS, len(drivers))
+            ) as executor:
+                for future in [
+                    executor.submit(build_driver, x) for x in drivers.values()
+                ]:
+                    future.result()
+
+        tarballs = [
+            (hwcfg, server.get_tarball_files_paths())
+            for hwcfg, server in to_build.values()
+            if not hwcfg.tarball_built
+        ]
+        if tarballs:
+            with ThreadPoolExecutor(
+                max_workers=min(DRIVER_BUILD_WORKERS, len(tarballs))
+            ) as executor:
+                for future in [
+                    executor.submit(
+                        hwcfg.build_sim_tarball, paths, hwcfg.get_driver_tar_filename()
+                    )
+                    for hwcfg, paths in tarballs
+                ]:
+                    future.result()
+
+    def pass_build_required_switches_and_pipes(self) -> None:
+        """Build all the switch and pipe models required for this simulation.
+        Identical models share one cached build and distinct ones (of either
+        kind) build in parallel, see runtools.model_build_cache."""
         # the way the switch models are designed, this requires hosts to be
         # bound to instances.
-        switches = self.firesimtopol.get_dfs_order_switches()
-        for switch in switches:
-            switch.build_switch_sim_binary()
-
-    # TODO : come up with a better name...
-    def pass_build_required_pipes(self) -> None:
-        pipes = self.firesimtopol.get_dfs_order_pipes()
-        for pipe in pipes:
-            pipe.build_pipe_sim_binary()
+        switch_builders = [
+            switch.switch_builder
+            for switch in self.firesimtopol.get_dfs_order_switches()
+        ]
+        pipe_builders = [
+            pipe.pipe_builder for pipe in self.firesimtopol.get_dfs_order_pipes()
+        ]
+        binaries = build_model_binaries(
+            [(SWITCH_SOURCES, x.emit_switch_configfile()) for x in switch_builders]
+            + [(PIPE_SOURCES, x.emit_pipe_configfile()) for x in pipe_builders]
+        )
+        for switch_builder, binary in zip(switch_builders, binaries):
+            switch_builder.install_switch_binary(binary)
+        for pipe_builder, binary in zip(
+            pipe_builders, binaries[len(switch_builders) :]
+        ):
+            pipe_builder.install_pipe_binary(binary)
 
     def pass_fetch_URI_resolve_runtime_cfg(self, dir: str) -> None:
         """Locally download URIs, and use any URI-contained metadata to resolve runtime config values"""
         servers = self.firesimtopol.get_dfs_order_servers()
-        for server in servers:
-            resolved_cfg = server.get_resolved_server_hardware_config()
-            resolved_cfg.fetch_all_URI(dir)
-            resolved_cfg.resolve_hwcfg_values(dir)
-
-    def infrasetup_passes(self, use_mock_instances_for_testing: bool) -> None:
+        hwcfgs = list(
+            {
+                id(hwcfg): hwcfg
+                for hwcfg in (x.get_resolved_server_hardware_config() for x in servers)
+            }.values()
+        )
+        # download for all configs at once (through the persistent URI cache)
+        if hwcfgs:
+            with ThreadPoolExecutor(
+                max_workers=min(URI_DOWNLOAD_WORKERS, len(hwcfgs))
+            ) as executor:
+                list(executor.map(lambda hwcfg: hwcfg.fetch_all_URI(dir), hwcfgs))
+        for hwcfg in hwcfgs:
+            hwcfg.resolve_hwcfg_values(dir)
+
+    def infrasetup_passes(
+        self,
+        use_mock_instances_for_testing: bool,
+        force_flash: bool = False,
+        incremental: bool = False,
+    ) -> None:
         """extra passes needed to do infrasetup"""
         self.run_farm.post_launch_binding(use_mock_instances_for_testing)
 
+        for host_node in self.run_farm.get_all_bound_host_nodes():
+            assert host_node.instance_deploy_manager is not None
+            host_node.instance_deploy_manager.force_flash = force_flash
+            host_node.instance_deploy_manager.incremental = incremental
+
         @parallel
-        def infrasetup_node_wrapper(run_farm: RunFarm, dir: str) -> None:
+        def infrasetup_node_wrapper(run_farm: RunFarm, dir: str) -> Tuple[int, int]:
             my_node = run_farm.lookup_by_host(env.host_string)
             assert my_node is not None
             assert my_node.instance_deploy_manager is not None
+            my_node.instance_deploy_manager.read_deployed_manifest()
             my_node.instance_deploy_manager.infrasetup_instance(dir)
+            my_node.instance_deploy_manager.write_manifest()
+            return (
+                my_node.instance_deploy_manager.infrastructure_bytes_uploaded,
+                my_node.instance_deploy_manager.infrastructure_bytes_saved,
+            )
 
         all_run_farm_ips = [
             x.get_host() for x in self.run_farm.get_all_bound_host_nodes()
@@ -644,12 +1100,26 @@ class FireSimTopologyWithPasses:
         with TemporaryDirectory() as uridir:
             self.pass_fetch_URI_resolve_runtime_cfg(uridir)
             self.pass_build_required_drivers()
-            self.pass_build_required_pipes()
-            self.pass_build_required_switches()
+            self.pass_build_required_switches_and_pipes()
+
+            # hash everything that will be uploaded once here, rather than in
+            # each of the per-host processes forked by execute
+            for host_node in self.run_farm.get_all_bound_host_nodes():
+                for server in host_node.sim_slots:
+                    for local_path, _ in server.get_sim_infrastructure_local_paths(
+                        uridir
+                    ):
+                        get_content_hash(local_path)
 
-            execute(
+            transfer_stats = execute(
                 infrasetup_node_wrapper, self.run_farm, uridir, hosts=all_run_farm_ips
             )
+            rootLogger.info(
+                "Uploaded {} of simulation infrastructure to the run farm, saved {} by reusing files already on hosts.".format(
+                    human_readable_size(sum(x[0] for x in transfer_stats.values())),
+                    human_readable_size(sum(x[1] for x in transfer_stats.values())),
+                )
+            )
 
     def enumerate_fpgas_passes(self, use_mock_instances_for_testing: bool) -> None:
         """extra passes needed to do enumerate_fpgas"""
@@ -703,11 +1173,16 @@ class FireSimTopologyWithPasses:
             self.run_farm.post_launch_binding(use_mock_instances_for_testing)
 
         @parallel
-        def boot_switch_and_pipe_wrapper(run_farm: RunFarm) -> None:
+        def boot_wrapper(run_farm: RunFarm) -> None:
+            """Start the switches and pipes on a host, then its simulations.
+            Each host boots as soon as its own switches and pipes are up
+            (simulations only connect to those over shared memory), without
+            waiting on the other hosts."""
             my_node = run_farm.lookup_by_host(env.host_string)
             assert my_node is not None
             assert my_node.instance_deploy_manager is not None
             my_node.instance_deploy_manager.start_switches_and_pipes_instance()
+            my_node.instance_deploy_manager.start_simulations_instance()
 
         # Steps occur within the context of a tempdir.
         # This allows URI's to survive until after deploy, and cleanup upon error
@@ -718,15 +1193,7 @@ class FireSimTopologyWithPasses:
             x.get_host() for x in self.run_farm.get_all_bound_host_nodes()
         ]
         execute(instance_liveness, hosts=all_run_farm_ips)
-        execute(boot_switch_and_pipe_wrapper, self.run_farm, hosts=all_run_farm_ips)
-
-        @parallel
-        def boot_simulation_wrapper(run_farm: RunFarm) -> None:
-            my_node = run_farm.lookup_by_host(env.host_string)
-            assert my_node.instance_deploy_manager is not None
-            my_node.instance_deploy_manager.start_simulations_instance()
-
-        execute(boot_simulation_wrapper, self.run_farm, hosts=all_run_farm_ips)
+        execute(boot_wrapper, self.run_farm, hosts=all_run_farm_ips)
 
     def kill_simulation_passes(
         self, use_mock_instances_for_testing: bool, disconnect_all_nbds: bool = True
@@ -767,36 +1234,14 @@ class FireSimTopologyWithPasses:
         execute(kill_pipe_wrapper, self.run_farm, hosts=all_run_farm_ips)
         execute(kill_simulation_wrapper, self.run_farm, hosts=all_run_farm_ips)
 
-        def screens() -> None:
-            """poll on screens to make sure kill succeeded."""
-            with warn_only():
-                rootLogger.info("Confirming exit...")
-                # keep checking screen until it reports that there are no screens left
-                while True:
-                    run("screen -wipe || true")  # wipe any potentially dead screens
-                    screenoutput = run("screen -ls")
-                    rootLogger.info(f"screenoutput {screenoutput}")
-                    # If AutoILA is enabled, use the following condition
-                    if (
-                        "2 Sockets in" in screenoutput
-                        and "hw_server" in screenoutput
-                        and "virtual_jtag" in screenoutput
-                    ):
-                        break
-                    # If AutoILA is disabled, confirm exit when there is no fsim, switch or pipe screen.
-                    # Previously, it only exited successfully when there was no screen at all. However,
-                    # that lead to pathological behaviors when there were other screens running.
-                    elif (
-                        ("fsim" in screenoutput)
-                        or ("switch" in screenoutput)
-                        or ("pipe" in screenoutput)
-                    ):
-                        continue
-                    else:
-                        break
-                    time.sleep(1)
+        @parallel
+        def confirm_exit_wrapper(run_farm: RunFarm) -> None:
+            my_node = run_farm.lookup_by_host(env.host_string)
+            assert my_node.instance_deploy_manager is not None
+            my_node.instance_deploy_manager.wait_for_processes_to_exit()
 
-        execute(screens, hosts=all_run_farm_ips)
+        rootLogger.info("Confirming exit...")
+        execute(confirm_exit_wrapper, self.run_farm, hosts=all_run_farm_ips)
 
     def get_bridge_offset(
         self, hwcfg: RuntimeHWConfig, bridge_idx: int
@@ -899,6 +1344,23 @@ class FireSimTopologyWithPasses:
             self.pass_fetch_URI_resolve_runtime_cfg(uridir)
             self.pass_set_partition_configs()
 
+        job_queue = self.job_queue
+        if job_queue is not None:
+
+            @parallel
+            def stage_jobs_wrapper(run_farm: RunFarm) -> None:
+                """make sure each slot has the files of its first job.
+                infrasetup normally set them up already, but the job order
+                can change between runs (see runtools/job_queue.py)."""
+                my_node = run_farm.lookup_by_host(env.host_string)
+                assert my_node.instance_deploy_manager is not None
+                for slotno in range(len(my_node.sim_slots)):
+                    my_node.instance_deploy_manager.stage_job_in_sim_slot(
+                        slotno, [], fresh=False
+                    )
+
+            execute(stage_jobs_wrapper, self.run_farm, hosts=all_run_farm_ips)
+
         # boot up as usual
         self.boot_simulation_passes(False, skip_instance_binding=True)
 
@@ -906,10 +1368,13 @@ class FireSimTopologyWithPasses:
         def monitor_jobs_wrapper(
             run_farm: RunFarm,
             prior_completed_jobs: List[str],
+            reported_completed_jobs: List[str],
             is_final_loop: bool,
             is_networked: bool,
             terminateoncompletion: bool,
             job_results_dir: str,
+            copy_back_results: bool,
+            copy_back_compress: bool,
         ) -> Dict[str, Dict[str, bool]]:
             """on each instance, check over its switches and simulations
             to copy results off."""
@@ -917,26 +1382,57 @@ class FireSimTopologyWithPasses:
             assert my_node.instance_deploy_manager is not None
             return my_node.instance_deploy_manager.monitor_jobs_instance(
                 prior_completed_jobs,
+                reported_completed_jobs,
                 is_final_loop,
                 is_networked,
                 terminateoncompletion,
                 job_results_dir,
+                copy_back_results,
+                copy_back_compress,
             )
 
-        def loop_logger(
-            instancestates: Dict[str, Any], terminateoncompletion: bool
+        @parallel
+        def start_queued_jobs_wrapper(
+            run_farm: RunFarm, slots_to_start: Dict[str, List[Tuple[int, List[str]]]]
         ) -> None:
-            """Print the simulation status nicely."""
+            """on each instance, stage the newly assigned jobs into their slots
+            (replacing the files of the jobs that ran there before) and start
+            them."""
+            my_node = run_farm.lookup_by_host(env.host_string)
+            assert my_node.instance_deploy_manager is not None
+            slots = slots_to_start[env.host_string]
+            for slotno, retired_files in slots:
+                my_node.instance_deploy_manager.stage_job_in_sim_slot(
+                    slotno, retired_files, fresh=True
+                )
+            my_node.instance_deploy_manager.start_sim_slots(
+                [slotno for slotno, _ in slots]
+            )
 
+        def instances_terminated(instancestates: Dict[str, Any]) -> Dict[str, bool]:
+            """whether each instance has been terminated."""
+            if not self.terminateoncompletion:
+                return {inst: False for inst in instancestates.keys()}
+            copy_back_states = copy_back.job_states() if copy_back is not None else {}
             instancestate_map = dict()
-            if terminateoncompletion:
-                for instip, instdata in instancestates.items():
-                    # if terminateoncompletion and all sims are terminated, the inst must have been terminated
-                    instancestate_map[instip] = all(
-                        [x[1] for x in instdata["sims"].items()]
+            for instip, instdata in instancestates.items():
+                # if terminateoncompletion and all sims are terminated (and their
+                # results copied back), the inst must have been terminated
+                instancestate_map[instip] = all(
+                    [x[1] for x in instdata["sims"].items()]
+                ) and (
+                    copy_back is None
+                    or all(
+                        copy_back_states.get(simname) == "copied"
+                        for simname in instdata["sims"].keys()
                     )
-            else:
-                instancestate_map = {inst: False for inst in instancestates.keys()}
+                )
+            return instancestate_map
+
+        def loop_logger(
+            instancestates: Dict[str, Any], instancestate_map: Dict[str, bool]
+        ) -> None:
+            """Print the simulation status nicely."""
 
             switchstates = []
             for instip, instdata in instancestates.items():
@@ -1009,7 +1505,15 @@ class FireSimTopologyWithPasses:
                     rootLogger.handlers[0].baseFilename
                 )
             )
-            rootLogger.info("""This status will update every 10s.""")
+            rootLogger.info(
+                """This run's status is recorded in:\n{}""".format(status_stream.path)
+            )
+            if self.status_display == "delta":
+                rootLogger.info("""Changes to this status will be printed below.""")
+            elif self.job_monitoring_mode == "event":
+                rootLogger.info("""This status will update as simulations complete.""")
+            else:
+                rootLogger.info("""This status will update every 10s.""")
             rootLogger.info("-" * 80)
             rootLogger.info("Instances")
             rootLogger.info("-" * 80)
@@ -1057,6 +1561,12 @@ class FireSimTopologyWithPasses:
                         inverttruefalsecolor[siminfo["running"]],
                     )
                 )
+            if copy_back is not None:
+                rootLogger.info("-" * 80)
+                rootLogger.info("Result Copy-back")
+                rootLogger.info("-" * 80)
+                for line in copy_back.status():
+                    rootLogger.info(line)
             rootLogger.info("-" * 80)
             rootLogger.info("Summary")
             rootLogger.info("-" * 80)
@@ -1083,80 +1593,345 @@ class FireSimTopologyWithPasses:
             isinstance(self.firesimtopol.roots[0], FireSimSwitchNode) or is_partitioned
         )
 
-        # run polling loop
-        while True:
-            """break out of this loop when either all sims are completed (no
-            network) or when one sim is completed (networked case)"""
-
-            def get_jobs_completed_local_info():
-                # this is a list of jobs completed, since any completed job will have
-                # a directory within this directory.
-                monitored_jobs_completed = os.listdir(self.workload.job_monitoring_dir)
-                rootLogger.debug(
-                    f"Monitoring dir jobs completed: {monitored_jobs_completed}"
+        # with event-driven monitoring, hosts with simulations report exits
+        # over a persistent channel, so we only need to re-query the hosts
+        # that changed (plus a periodic full reconciliation)
+        watcher = None
+        if self.job_monitoring_mode == "event":
+            watcher = JobEventWatcher(
+                {
+                    x.get_host(): x.get_sim_dir()
+                    for x in self.run_farm.get_all_bound_host_nodes()
+                    if len(x.sim_slots) > 0
+                }
+            )
+            watcher.start()
+
+        # copy back the results of finished jobs in the background (instead of
+        # inline on each host while monitoring)
+        copy_back = None
+        if self.copy_back_workers > 0:
+            copy_back = CopyBackPipeline(
+                self.copy_back_workers, self.copy_back_compress
+            )
+        sim_slot_of_job: Dict[str, Tuple[str, FireSimServerNode, int]] = {}
+        for host_node in self.run_farm.get_all_bound_host_nodes():
+            for slotno, sim in enumerate(host_node.sim_slots):
+                sim_slot_of_job[sim.get_job_name()] = (
+                    host_node.get_host(),
+                    sim,
+                    slotno,
                 )
-                return monitored_jobs_completed
 
-            # return all the state about the instance (potentially copy back results and/or terminate)
-            is_final_run = False
-            monitored_jobs_completed = get_jobs_completed_local_info()
-            instancestates = execute(
-                monitor_jobs_wrapper,
-                self.run_farm,
-                monitored_jobs_completed,
-                is_final_run,
-                is_networked,
-                self.terminateoncompletion,
-                self.workload.job_results_dir,
-                hosts=all_run_farm_ips,
-            )
+        # machine-readable record of the run's status, next to its results
+        status_stream = RunStatusStream(
+            self.workload.job_results_dir,
+            {
+                jobname: (host, slotno)
+                for jobname, (host, _, slotno) in sim_slot_of_job.items()
+            },
+        )
 
-            # log sim state, raw
-            rootLogger.debug(pprint.pformat(instancestates))
+        # when each running job was started, to record how long it ran (see
+        # runtools/job_queue.py). networked simulations are torn down as soon
+        # as one of them completes, so their runtimes aren't recorded
+        job_start_times = (
+            {} if is_networked else {job: time.monotonic() for job in sim_slot_of_job}
+        )
+        runtime_history = (
+            job_queue.history if job_queue is not None else JobRuntimeHistory()
+        )
+        # completed jobs whose slots moved on to queued jobs, by host
+        retired_jobs: Dict[str, List[str]] = {}
+
+        def record_completed_jobs() -> None:
+            """record how long newly completed jobs ran, and keep the jobs that
+            slots moved on from in the status of their host."""
+            for host, jobnames in retired_jobs.items():
+                if host in instancestates:
+                    instancestates[host]["sims"].update(
+                        {jobname: True for jobname in jobnames}
+                    )
+            now = time.monotonic()
+            for instdata in instancestates.values():
+                for jobname, completed in instdata["sims"].items():
+                    if completed and jobname in job_start_times:
+                        _, sim, _ = sim_slot_of_job[jobname]
+                        runtime_history.record(
+                            sim.get_job(), now - job_start_times.pop(jobname)
+                        )
 
-            # log sim state, properly
-            loop_logger(instancestates, self.terminateoncompletion)
+        def start_queued_jobs() -> None:
+            """start the next queued jobs in the slots whose jobs completed.
+            with background copy-back, a slot is only reused once its job's
+            results were copied back, since the next job overwrites them."""
+            if not job_queue:
+                return
+            copy_back_states = copy_back.job_states() if copy_back is not None else {}
+            slots_to_start: Dict[str, List[Tuple[int, List[str]]]] = {}
+            started_jobs = []
+            for host, instdata in instancestates.items():
+                for jobname, completed in list(instdata["sims"].items()):
+                    if not completed or not job_queue:
+                        continue
+                    _, sim, slotno = sim_slot_of_job[jobname]
+                    if sim.get_job_name() != jobname:
+                        # the slot already moved on
+                        continue
+                    if copy_back is not None and copy_back_states.get(jobname) not in [
+                        "copied",
+                        "failed",
+                    ]:
+                        continue
+                    job = job_queue.pop()
+                    assert job is not None
+                    retired_files = [
+                        name for _, name in sim.get_job_files_local_paths()
+                    ]
+                    sim.assign_job(job)
+                    retired_jobs.setdefault(host, []).append(jobname)
+                    sim_slot_of_job[job.jobname] = (host, sim, slotno)
+                    status_stream.job_slots[job.jobname] = (host, slotno)
+                    instdata["sims"][job.jobname] = False
+                    slots_to_start.setdefault(host, []).append((slotno, retired_files))
+                    started_jobs.append(job.jobname)
+                    rootLogger.info(
+                        f"[{host}] Starting queued job {job.jobname} in slot {slotno} ({len(job_queue)} jobs left in the queue)."
+                    )
+            if slots_to_start:
+                execute(
+                    start_queued_jobs_wrapper,
+                    self.run_farm,
+                    slots_to_start,
+                    hosts=list(slots_to_start.keys()),
+                )
+                now = time.monotonic()
+                for jobname in started_jobs:
+                    job_start_times[jobname] = now
+
+        def report_status(final: bool = False) -> None:
+            """record the status of the run, and show it (or what changed
+            since the last time) on the console."""
+            instancestate_map = instances_terminated(instancestates)
+            first = not status_stream.state
+            transitions, summary = status_stream.update(
+                instancestates,
+                instancestate_map,
+                copy_back.job_states() if copy_back is not None else None,
+                copy_back.summary() if copy_back is not None else None,
+                final,
+            )
+            if first or (final and self.status_display == "delta"):
+                loop_logger(instancestates, instancestate_map)
+            elif self.status_display == "table":
+                if not final or transitions or summary is not None:
+                    loop_logger(instancestates, instancestate_map)
+            else:
+                for transition in transitions:
+                    rootLogger.info(describe_transition(transition))
+                if summary is not None:
+                    for line in describe_summary(summary):
+                        rootLogger.info(line)
+
+        def copy_back_completed_jobs(
+            instancestates: Dict[str, Any], monitored_jobs_completed: List[str]
+        ) -> None:
+            """queue up copy-backs for jobs that newly completed."""
+            if copy_back is None:
+                return
+            for instdata in instancestates.values():
+                for simname, simcompleted in instdata["sims"].items():
+                    if simcompleted and simname not in monitored_jobs_completed:
+                        host, sim, slotno = sim_slot_of_job[simname]
+                        if sim.get_job_name() != simname:
+                            # its slot moved on to a queued job, so it was
+                            # already copied back (or failed to be)
+                            continue
+                        copy_back.submit(host, sim, slotno)
+
+        def get_jobs_completed_local_info():
+            # this is a list of jobs completed, since any completed job will have
+            # a directory within this directory.
+            monitored_jobs_completed = os.listdir(self.workload.job_monitoring_dir)
+            rootLogger.debug(
+                f"Monitoring dir jobs completed: {monitored_jobs_completed}"
+            )
+            return monitored_jobs_completed
+
+        def get_jobs_reported_completed() -> List[str]:
+            """jobs that an earlier poll already saw completed."""
+            return [
+                jobname
+                for instdata in instancestates.values()
+                for jobname, completed in instdata["sims"].items()
+                if completed
+            ]
 
-            jobs_complete_dict = {}
-            simstates = [x["sims"] for x in instancestates.values()]
-            for x in simstates:
-                jobs_complete_dict.update(x)
-            global_status = jobs_complete_dict.values()
-            rootLogger.debug(f"Jobs complete: {jobs_complete_dict}")
-            rootLogger.debug(f"Global status: {global_status}")
+        # run monitoring loop
+        instancestates: Dict[str, Any] = {}
+        hosts_to_query = all_run_farm_ips
+        last_full_query = time.monotonic()
+        try:
+            while True:
+                """break out of this loop when either all sims are completed (no
+                network) or when one sim is completed (networked case)"""
+
+                # return all the state about the instance (potentially copy back results and/or terminate)
+                is_final_run = False
+                monitored_jobs_completed = get_jobs_completed_local_info()
+                instancestates.update(
+                    execute(
+                        monitor_jobs_wrapper,
+                        self.run_farm,
+                        monitored_jobs_completed,
+                        get_jobs_reported_completed(),
+                        is_final_run,
+                        is_networked,
+                        # hosts stay up while there are queued jobs to run
+                        self.terminateoncompletion and not job_queue,
+                        self.workload.job_results_dir,
+                        copy_back is None,
+                        self.copy_back_compress,
+                        hosts=hosts_to_query,
+                    )
+                )
+                copy_back_completed_jobs(instancestates, monitored_jobs_completed)
+                record_completed_jobs()
+                start_queued_jobs()
+
+                # log sim state, raw
+                rootLogger.debug(pprint.pformat(instancestates))
+
+                # log sim state, properly
+                report_status()
+
+                jobs_complete_dict = {}
+                simstates = [x["sims"] for x in instancestates.values()]
+                for x in simstates:
+                    jobs_complete_dict.update(x)
+                global_status = jobs_complete_dict.values()
+                rootLogger.debug(f"Jobs complete: {jobs_complete_dict}")
+                rootLogger.debug(f"Global status: {global_status}")
+
+                if is_networked and any(global_status):
+                    # at least one simulation has finished
+
+                    # in this case, do the teardown, then call exec again, then exit
+                    rootLogger.info(
+                        "Networked simulation, manually tearing down all instances..."
+                    )
+                    # do not disconnect nbds, because we may need them for copying
+                    # results. the process of copying results will tear them down anyway
+                    self.kill_simulation_passes(
+                        use_mock_instances_for_testing, disconnect_all_nbds=False
+                    )
 
-            if is_networked and any(global_status):
-                # at least one simulation has finished
+                    rootLogger.debug(
+                        "One more loop to fully copy results and terminate."
+                    )
+                    is_final_run = True
+                    monitored_jobs_completed = get_jobs_completed_local_info()
+                    instancestates = execute(
+                        monitor_jobs_wrapper,
+                        self.run_farm,
+                        monitored_jobs_completed,
+                        get_jobs_reported_completed(),
+                        is_final_run,
+                        is_networked,
+                        self.terminateoncompletion,
+                        self.workload.job_results_dir,
+                        copy_back is None,
+                        self.copy_back_compress,
+                        hosts=all_run_farm_ips,
+                    )
+                    copy_back_completed_jobs(instancestates, monitored_jobs_completed)
+                    break
+
+                if not is_networked and all(global_status) and not job_queue:
+                    break
+
+                if watcher is None:
+                    time.sleep(10)
+                    continue
+
+                hosts_to_query = []
+                while not hosts_to_query:
+                    time_to_full_query = (
+                        last_full_query
+                        + JOB_MONITORING_RECONCILE_INTERVAL
+                        - time.monotonic()
+                    )
+                    if time_to_full_query <= 0:
+                        hosts_to_query = all_run_farm_ips
+                        last_full_query = time.monotonic()
+                    elif copy_back is not None and copy_back.pending() > 0:
+                        # keep the copy-back progress up to date, and re-query
+                        # hosts whose copy-backs finished (so they can be
+                        # terminated once all of their results are copied)
+                        hosts_to_query = list(
+                            watcher.wait_for_exits(
+                                min(time_to_full_query, COPY_BACK_STATUS_INTERVAL)
+                            )
+                        )
+                        if self.terminateoncompletion or job_queue:
+                            # re-query hosts whose copy-backs finished, so
+                            # they can be terminated once all of their results
+                            # are copied (or their slots can start queued jobs)
+                            for host in copy_back.take_finished_hosts():
+                                if host not in hosts_to_query:
+                                    hosts_to_query.append(host)
+                        if not hosts_to_query:
+                            report_status()
+                    else:
+                        hosts_to_query = list(
+                            watcher.wait_for_exits(time_to_full_query)
+                        )
 
-                # in this case, do the teardown, then call exec again, then exit
-                rootLogger.info(
-                    "Networked simulation, manually tearing down all instances..."
-                )
-                # do not disconnect nbds, because we may need them for copying
-                # results. the process of copying results will tear them down anyway
-                self.kill_simulation_passes(
-                    use_mock_instances_for_testing, disconnect_all_nbds=False
-                )
+            if copy_back is not None:
+                # wait for the remaining copy-backs to finish
+                while not copy_back.wait(COPY_BACK_STATUS_INTERVAL):
+                    report_status()
 
-                rootLogger.debug("One more loop to fully copy results and terminate.")
-                is_final_run = True
-                monitored_jobs_completed = get_jobs_completed_local_info()
-                instancestates = execute(
-                    monitor_jobs_wrapper,
-                    self.run_farm,
-                    monitored_jobs_completed,
-                    is_final_run,
-                    is_networked,
-                    self.terminateoncompletion,
-                    self.workload.job_results_dir,
-                    hosts=all_run_farm_ips,
+            if self.terminateoncompletion and (
+                copy_back is not None or job_queue is not None
+            ):
+                # terminate the hosts with simulations, now that their
+                # results are copied back
+                sim_hosts = [
+                    x.get_host()
+                    for x in self.run_farm.get_all_bound_host_nodes()
+                    if len(x.sim_slots) > 0
+                ]
+                instancestates.update(
+                    execute(
+                        monitor_jobs_wrapper,
+                        self.run_farm,
+                        get_jobs_completed_local_info(),
+                        get_jobs_reported_completed(),
+                        True,
+                        is_networked,
+                        self.terminateoncompletion,
+                        self.workload.job_results_dir,
+                        False,
+                        self.copy_back_compress,
+                        hosts=sim_hosts,
+                    )
                 )
-                break
+                record_completed_jobs()
 
-            if not is_networked and all(global_status):
-                break
+            report_status(final=True)
 
-            time.sleep(10)
+            if copy_back is not None and copy_back.failed:
+                raise Exception(
+                    "Failed to copy back results of jobs: {}. See the log for details.".format(
+                        ", ".join(copy_back.failed)
+                    )
+                )
+        finally:
+            if watcher is not None:
+                watcher.stop()
+            if copy_back is not None:
+                copy_back.shutdown()
 
         # run post-workload hook, if one exists
         if self.workload.post_run_hook is not None:
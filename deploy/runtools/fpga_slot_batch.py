@@ -0,0 +1,185 @@
+""" Batched FPGA slot clearing/flashing on F2 run farm hosts.
+
+Clearing, loading and checking each FPGA slot of an F2 host one command at a
+time costs several ssh round trips per slot and waits for slots one after
+another. Instead, the manager generates a single script per host that clears
+and loads every slot concurrently (one background job per slot), waits for all
+of them at once and reports a machine-readable result line per slot and
+operation, which is parsed back into FPGASlotResults.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+from dataclasses import dataclass
+
+from typing import Dict, List
+
+rootLogger = logging.getLogger()
+
+# prefix of the lines the remote script reports per-slot results on
+SLOT_RESULT_MARKER = "FIRESIM_FPGA_SLOT_RESULT"
+
+# seconds to wait for a slot to reach the requested state before giving up
+SLOT_OP_TIMEOUT = 600
+
+# each slot's job is "slot_job <slotno> <clear: 0/1> <agfi or -> <skip: 0/1>".
+# results are reported as "<marker> <slotno> <op> <status> <start> <end>",
+# where status is one of ok/skipped/failed/timeout and start/end are epoch
+# timestamps. with skip set, a slot that already has agfi loaded is left alone
+# and only reports a skipped load.
+F2_SLOTS_SCRIPT = """
+kmsg() {{
+    echo "$1" | sudo tee /dev/kmsg >/dev/null 2>&1
+}}
+
+wait_for_state() {{
+    local slot=$1 state=$2 deadline=$(( $(date +%s) + {timeout} ))
+    until sudo fpga-describe-local-image -S $slot -R -H | grep -q "$state"; do
+        [ "$(date +%s)" -lt "$deadline" ] || return 1
+        sleep 1
+    done
+}}
+
+is_loaded_with() {{
+    sudo fpga-describe-local-image -S $1 -R -H | grep -Eq "[[:space:]]$2[[:space:]]+loaded[[:space:]]"
+}}
+
+report() {{
+    echo "{marker} $1 $2 $3 $4 $(date +%s.%N)"
+}}
+
+slot_job() {{
+    local slot=$1 clear=$2 agfi=$3 skip=$4 start status
+    if [ "$skip" = 1 ] && [ "$agfi" != - ]; then
+        start=$(date +%s.%N)
+        if is_loaded_with $slot $agfi; then
+            report $slot load skipped $start
+            return
+        fi
+    fi
+    if [ "$clear" = 1 ]; then
+        start=$(date +%s.%N)
+        kmsg "about_to_clear_fpga$slot"
+        if ! sudo fpga-clear-local-image -S $slot -A >/dev/null; then
+            status=failed
+        elif ! wait_for_state $slot cleared; then
+            status=timeout
+        else
+            status=ok
+        fi
+        kmsg "done_clearing_fpga$slot"
+        report $slot clear $status $start
+        [ "$status" = ok ] || return
+    fi
+    if [ "$agfi" != - ]; then
+        start=$(date +%s.%N)
+        kmsg "about_to_flash_fpga$slot"
+        if ! sudo fpga-load-local-image -S $slot -I $agfi -A >/dev/null; then
+            status=failed
+        elif ! wait_for_state $slot loaded; then
+            status=timeout
+        else
+            status=ok
+        fi
+        kmsg "done_flashing_fpga$slot"
+        report $slot load $status $start
+    fi
+}}
+
+{jobs}
+wait
+"""
+
+
+@dataclass
+class FPGASlotResult:
+    """Outcome of a single operation (clear or load) on a single FPGA slot."""
+
+    slotno: int
+    op: str
+    status: str
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ok", "skipped")
+
+
+def build_f2_slots_command(
+    num_slots: int,
+    clear: bool,
+    slot_to_agfi: Dict[int, str],
+    skip_loaded: bool = False,
+) -> str:
+    """Return a single shell command that clears all num_slots slots (if
+    clear) and loads each slot in slot_to_agfi with its agfi, all concurrently.
+    If skip_loaded, slots that already have their agfi loaded are neither
+    cleared nor loaded.
+    """
+    jobs = []
+    for slotno in range(num_slots):
+        if not clear and slotno not in slot_to_agfi:
+            continue
+        agfi = slot_to_agfi.get(slotno, "-")
+        jobs.append(f"slot_job {slotno} {int(clear)} {agfi} {int(skip_loaded)} &")
+    script = F2_SLOTS_SCRIPT.format(
+        timeout=SLOT_OP_TIMEOUT, marker=SLOT_RESULT_MARKER, jobs="\n".join(jobs)
+    )
+    # ship the script encoded so it survives fabric's shell quoting unchanged
+    encoded = base64.b64encode(script.encode()).decode()
+    return f"echo {encoded} | base64 -d | bash"
+
+
+def parse_slot_results(output: str) -> List[FPGASlotResult]:
+    """Extract the per-slot results from the output of a command built by
+    build_f2_slots_command, ordered by slot then operation."""
+    results = []
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) != 6 or fields[0] != SLOT_RESULT_MARKER:
+            continue
+        _, slotno, op, status, start, end = fields
+        results.append(
+            FPGASlotResult(int(slotno), op, status, float(end) - float(start))
+        )
+    return sorted(results, key=lambda r: (r.slotno, r.op != "clear"))
+
+
+def check_slot_results(
+    host: str,
+    results: List[FPGASlotResult],
+    expected: Dict[int, List[str]],
+) -> None:
+    """Log results and raise if any expected operation (slotno -> list of ops)
+    did not report back or did not succeed."""
+    for result in results:
+        rootLogger.debug(
+            f"[{host}] FPGA slot {result.slotno} {result.op}: {result.status} ({result.seconds:.1f}s)"
+        )
+
+    reported = {(r.slotno, r.op): r for r in results}
+    skipped = {r.slotno for r in results if r.status == "skipped"}
+    problems = []
+    for slotno, ops in sorted(expected.items()):
+        for op in ops:
+            if slotno in skipped and op == "clear":
+                continue
+            reported_result = reported.get((slotno, op))
+            if reported_result is None:
+                problems.append(f"slot {slotno} {op}: no result")
+            elif not reported_result.ok:
+                problems.append(f"slot {slotno} {op}: {reported_result.status}")
+    if problems:
+        raise Exception(f"[{host}] Unable to set up FPGA slots: " + ", ".join(problems))
+
+    if skipped:
+        rootLogger.info(
+            f"[{host}] {len(skipped)} FPGA slot(s) already had the requested image loaded, skipped flashing them."
+        )
+    if results:
+        slowest = max(results, key=lambda r: r.seconds)
+        rootLogger.info(
+            f"[{host}] {len(results)} FPGA slot operations done, slowest: slot {slowest.slotno} {slowest.op} ({slowest.seconds:.1f}s)"
+        )
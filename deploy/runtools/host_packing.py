@@ -0,0 +1,320 @@
+""" Bin-packing of networked topologies onto run farm hosts.
+
+The simple networked mapping gives every switch that has simulations as
+downlinks its own host, and every switch that only has switches as downlinks
+its own switch-only host. With host_mapping: packed (in target_config), the
+packed mapping (FireSimTopologyWithPasses.pass_packed_host_node_mapping)
+instead packs the topology onto as few hosts as possible and, second to that,
+keeps as many switch-to-switch links as possible on a single host (where they
+use shared memory instead of sockets):
+
+- every switch that has simulations as downlinks forms a group with them
+  (simulations always connect to their switch through shared memory, so they
+  have to share a host), as does every simulation without a switch. groups
+  are packed into the sim slots of the available hosts, largest first, each
+  into an already used host if one has room for it, preferring the one it has
+  the most links to (or shares the most parent switches with)
+- switches without simulations are placed on the host they have the most
+  links to
+- each packed host is then allocated as the smallest available run farm host
+  with enough sim slots
+
+This module implements the packing on group indices; the pass builds the
+groups from the topology and allocates the hosts.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from typing import Dict, List, Optional
+
+rootLogger = logging.getLogger()
+
+# values of target_config: host_mapping in the runtime config
+HOST_MAPPINGS = ["simple", "packed"]
+
+
+class PackedHost:
+    """A run farm host in a packing, before it is allocated.
+
+    Attributes:
+        capacity: Sim slots of the host.
+        groups: Indices of the groups packed onto the host.
+        sims: Sim slots used by the groups.
+        switches: Switch slots used by the groups.
+    """
+
+    capacity: int
+    groups: List[int]
+    sims: int
+    switches: int
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.groups = []
+        self.sims = 0
+        self.switches = 0
+
+    def free_sims(self) -> int:
+        return self.capacity - self.sims
+
+
+def pack_groups(
+    sims: List[int],
+    switches: List[int],
+    related: List[Dict[int, int]],
+    capacities: List[int],
+    max_switches: int,
+    use_affinity: bool = True,
+) -> Optional[List[PackedHost]]:
+    """Pack groups (group i needs sims[i] sim slots and switches[i] switch
+    slots) onto hosts with the given sim slot capacities (one per available
+    host), with at most max_switches switches per host. related[i] maps the
+    groups that group i would like to share a host with to how much (the
+    weights must be symmetric). Return
+    the hosts used, or None if the groups don't fit.
+
+    Groups are placed largest first (in their original order when equal), each
+    onto the used host with room for it that it is most related to (if
+    use_affinity), then that it fills the most. If none has room, the largest
+    available host is used next. With use_affinity, groups are then swapped
+    between hosts to bring related groups together (see improve_by_swaps).
+
+    >>> hosts = pack_groups([4, 4, 4, 2], [1, 1, 1, 1], [{}, {}, {}, {}], [8, 8, 8], 1000)
+    >>> [(h.capacity, h.groups) for h in hosts]
+    [(8, [0, 1]), (8, [2, 3])]
+    >>> hosts = pack_groups([2, 2, 2, 2], [1] * 4, [{2: 1}, {3: 1}, {0: 1}, {1: 1}], [4, 4], 1000)
+    >>> sorted(sorted(h.groups) for h in hosts)
+    [[0, 2], [1, 3]]
+    >>> pack_groups([4, 4], [1, 1], [{}, {}], [4], 1000) is None
+    True
+    """
+    available = sorted(capacities, reverse=True)
+    hosts: List[PackedHost] = []
+    host_of: Dict[int, int] = {}
+    order = sorted(range(len(sims)), key=lambda group: -sims[group])
+    for group in order:
+        best = None
+        best_key = None
+        for index, host in enumerate(hosts):
+            if (
+                host.free_sims() < sims[group]
+                or host.switches + switches[group] > max_switches
+            ):
+                continue
+            affinity = 0
+            if use_affinity:
+                affinity = sum(
+                    weight
+                    for other, weight in related[group].items()
+                    if host_of.get(other) == index
+                )
+            key = (affinity, -host.free_sims())
+            if best_key is None or key > best_key:
+                best, best_key = index, key
+        if best is None:
+            if not available or available[0] < sims[group]:
+                return None
+            hosts.append(PackedHost(available.pop(0)))
+            best = len(hosts) - 1
+        hosts[best].groups.append(group)
+        hosts[best].sims += sims[group]
+        hosts[best].switches += switches[group]
+        host_of[group] = best
+    if use_affinity:
+        improve_by_swaps(hosts, sims, switches, related)
+    return hosts
+
+
+def improve_by_swaps(
+    hosts: List[PackedHost],
+    sims: List[int],
+    switches: List[int],
+    related: List[Dict[int, int]],
+    max_rounds: int = 8,
+) -> None:
+    """Swap groups of the same size between hosts while that moves groups to
+    the hosts of the groups they are related to. Groups are placed before the
+    groups they are related to are, so the greedy packing alone can split up
+    e.g. the leaf switches under the same parent.
+
+    >>> hosts = [PackedHost(4), PackedHost(4)]
+    >>> hosts[0].groups, hosts[1].groups = [0, 1], [2, 3]
+    >>> improve_by_swaps(hosts, [2] * 4, [1] * 4, [{2: 1}, {3: 1}, {0: 1}, {1: 1}])
+    >>> sorted(sorted(h.groups) for h in hosts)
+    [[0, 2], [1, 3]]
+    """
+    host_of = {
+        group: index for index, host in enumerate(hosts) for group in host.groups
+    }
+
+    def affinity(group: int, host: int) -> int:
+        return sum(
+            weight
+            for other, weight in related[group].items()
+            if other != group and host_of.get(other) == host
+        )
+
+    for _ in range(max_rounds):
+        improved = False
+        for group in list(host_of):
+            here = host_of[group]
+            # only hosts that related groups are on can be better
+            for there in sorted(
+                set(host_of[other] for other in related[group] if other in host_of)
+            ):
+                if there == here:
+                    continue
+                best = None
+                best_gain = 0
+                for other in hosts[there].groups:
+                    if sims[other] != sims[group] or switches[other] != switches[group]:
+                        continue
+                    gain = (
+                        affinity(group, there)
+                        - affinity(group, here)
+                        + affinity(other, here)
+                        - affinity(other, there)
+                        - 2 * related[group].get(other, 0)
+                    )
+                    if gain > best_gain:
+                        best, best_gain = other, gain
+                if best is not None:
+                    hosts[here].groups.remove(group)
+                    hosts[there].groups.remove(best)
+                    hosts[here].groups.append(best)
+                    hosts[there].groups.append(group)
+                    host_of[group], host_of[best] = there, here
+                    improved = True
+                    break
+        if not improved:
+            return
+
+
+def min_hosts_for_sims(num_sims: int, capacities: List[int]) -> int:
+    """Return a lower bound on the number of hosts (with the given sim slot
+    capacities, one per available host) needed to run num_sims simulations:
+    the number of the largest ones it takes to have enough sim slots.
+
+    >>> min_hosts_for_sims(20, [8, 8, 8, 4])
+    3
+    >>> min_hosts_for_sims(0, [8])
+    0
+    """
+    total = 0
+    for count, capacity in enumerate(sorted(capacities, reverse=True)):
+        if total >= num_sims:
+            return count
+        total += capacity
+    return len(capacities) if total >= num_sims else len(capacities) + 1
+
+
+def simple_mapping_fits(
+    group_sims: List[int],
+    num_switch_only: int,
+    capacities: List[int],
+    num_switch_only_hosts: int,
+) -> bool:
+    """Return True iff the simple mapping can map a topology onto the given
+    hosts: each group (switch with simulations, of group_sims[i] simulations)
+    needs a host of its own with enough sim slots (capacities has one entry
+    per available host), and each of the num_switch_only switches without
+    simulations needs one of the num_switch_only_hosts switch-only hosts.
+
+    >>> simple_mapping_fits([8, 4], 1, [4, 8], 1)
+    True
+    >>> simple_mapping_fits([8, 8], 0, [8, 4], 0)
+    False
+    >>> simple_mapping_fits([4], 1, [8], 0)
+    False
+    """
+    if num_switch_only > num_switch_only_hosts:
+        return False
+    available = sorted(capacities, reverse=True)
+    needed = sorted(group_sims, reverse=True)
+    return len(needed) <= len(available) and all(
+        need <= capacity for need, capacity in zip(needed, available)
+    )
+
+
+class HostMappingReport:
+    """How good a host mapping of a networked topology is.
+
+    Attributes:
+        hosts_by_slots: Number of hosts used, by their number of sim slots.
+        host_lower_bound: Fewest hosts the simulations could fit on.
+        sims: Number of simulations.
+        sim_slots: Sim slots of the hosts used.
+        links: Number of switch-to-switch links.
+        cross_host_links: Number of those that cross hosts.
+        simple_hosts: Hosts the simple mapping would use, if it would map the
+            topology (see simple_mapping_fits).
+        simple_cross_host_links: Cross-host links of the simple mapping.
+    """
+
+    hosts_by_slots: Dict[int, int]
+    host_lower_bound: int
+    sims: int
+    sim_slots: int
+    links: int
+    cross_host_links: int
+    simple_hosts: Optional[int]
+    simple_cross_host_links: Optional[int]
+
+    def __init__(
+        self,
+        hosts_by_slots: Dict[int, int],
+        host_lower_bound: int,
+        sims: int,
+        sim_slots: int,
+        links: int,
+        cross_host_links: int,
+        simple_hosts: Optional[int],
+        simple_cross_host_links: Optional[int],
+    ) -> None:
+        self.hosts_by_slots = hosts_by_slots
+        self.host_lower_bound = host_lower_bound
+        self.sims = sims
+        self.sim_slots = sim_slots
+        self.links = links
+        self.cross_host_links = cross_host_links
+        self.simple_hosts = simple_hosts
+        self.simple_cross_host_links = simple_cross_host_links
+
+    def num_hosts(self) -> int:
+        return sum(self.hosts_by_slots.values())
+
+    def lines(self) -> List[str]:
+        """Return the report as lines of text.
+
+        >>> report = HostMappingReport({8: 2}, 2, 16, 16, 16, 8, 3, 16)
+        >>> print("\\n".join(report.lines()))
+        Hosts: 2 (2 with 8 sim slots), at least 2 needed
+        Sim slots: 16 of 16 used (100%)
+        Switch-to-switch links crossing hosts: 8 of 16
+        Simple mapping: 3 hosts, 16 links crossing hosts
+        """
+        # one entry per kind of host, not per host: in externally provisioned
+        # run farms every host has a handle of its own
+        kinds = ", ".join(
+            f"{count} switch-only" if slots == 0 else f"{count} with {slots} sim slots"
+            for slots, count in sorted(self.hosts_by_slots.items(), reverse=True)
+        )
+        utilization = 100 * self.sims // self.sim_slots if self.sim_slots else 0
+        lines = [
+            f"Hosts: {self.num_hosts()} ({kinds}), at least {self.host_lower_bound} needed",
+            f"Sim slots: {self.sims} of {self.sim_slots} used ({utilization}%)",
+            f"Switch-to-switch links crossing hosts: {self.cross_host_links} of {self.links}",
+        ]
+        if self.simple_hosts is not None:
+            lines.append(
+                f"Simple mapping: {self.simple_hosts} hosts, {self.simple_cross_host_links} links crossing hosts"
+            )
+        return lines
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
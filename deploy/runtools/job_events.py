@@ -0,0 +1,181 @@
+""" Event-driven job monitoring for runworkload.
+
+Every simulation launched by the manager has its driver's exit code recorded
+in the host's process registry when it exits (see
+runtools/process_registry.py). Instead of re-querying every
+run farm host on a fixed interval, the manager keeps one persistent ssh
+channel open to each host running simulations. A small watcher on the far
+end reports status files as they appear, so only the hosts that actually
+changed need to be re-queried.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import subprocess
+import threading
+import time
+
+from runtools.ssh_pool import ssh_connection_pool
+from runtools.process_registry import REGISTRY_DIR
+
+from typing import Dict, List, Optional, Set, Tuple
+
+rootLogger = logging.getLogger()
+
+# when a host's event channel is lost, fall back to polling it this often
+POLL_FALLBACK_INTERVAL = 10.0
+
+# window used to coalesce a burst of exits into a single round of queries
+EVENT_COALESCE_WINDOW = 0.25
+
+# remote side of the event channel. reports each new simulation exit recorded
+# in the registry once as "exit <slotno> <code>" and prints a heartbeat every
+# few seconds, which also makes sure the watcher dies (SIGPIPE) once the
+# manager goes away. uses inotifywait to wake up immediately if the host has
+# it, otherwise checks the registry once a second. a slot's exit file is
+# replaced when the slot runs a queued job, so exits are told apart by the pid
+# of the process they are for.
+REMOTE_WATCHER_SCRIPT = """
+mkdir -p {sim_dir}/{registry_dir} && cd {sim_dir}/{registry_dir} || exit 1
+declare -A seen
+while true; do
+    for f in fsim*.exit; do
+        [ -f "$f" ] || continue
+        id="$(cat "${{f%.exit}}.pid" 2>/dev/null) $(cat "$f" 2>/dev/null)"
+        if [ "${{seen[$f]}}" != "$id" ]; then
+            seen[$f]=$id
+            slot=${{f%.exit}}
+            read code end < "$f"
+            echo "exit ${{slot#fsim}} $code"
+        fi
+    done
+    if command -v inotifywait >/dev/null 2>&1; then
+        inotifywait -qq -t 5 -e close_write -e moved_to . >/dev/null 2>&1
+    else
+        sleep 1
+    fi
+    echo alive || exit 0
+done
+"""
+
+
+class JobEventWatcher:
+    """Keep one ssh channel open to each run farm host with simulations and
+    collect simulation exits as they are reported.
+
+    Attributes:
+        host_to_sim_dir: remote sim dir to watch, for each host.
+        lost_hosts: hosts whose channel went away. These fall back to
+            being polled every POLL_FALLBACK_INTERVAL seconds.
+    """
+
+    host_to_sim_dir: Dict[str, str]
+    lost_hosts: Set[str]
+    events: queue.Queue[Tuple[str, Optional[int], Optional[int]]]
+    procs: Dict[str, subprocess.Popen]
+    threads: List[threading.Thread]
+    stopping: bool
+
+    def __init__(self, host_to_sim_dir: Dict[str, str]) -> None:
+        self.host_to_sim_dir = host_to_sim_dir
+        self.lost_hosts = set()
+        self.events = queue.Queue()
+        self.procs = {}
+        self.threads = []
+        self.stopping = False
+
+    def start(self) -> None:
+        """Open the event channel to every host."""
+        for host, sim_dir in self.host_to_sim_dir.items():
+            script = REMOTE_WATCHER_SCRIPT.format(
+                sim_dir=sim_dir, registry_dir=REGISTRY_DIR
+            )
+            try:
+                proc = subprocess.Popen(
+                    ssh_connection_pool.ssh_command(host) + ["bash", "-s"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                )
+                assert proc.stdin is not None
+                proc.stdin.write(script)
+                proc.stdin.close()
+            except (OSError, BrokenPipeError) as e:
+                rootLogger.debug(f"[{host}] Unable to open job event channel: {e}")
+                self.lost_hosts.add(host)
+                continue
+            self.procs[host] = proc
+            thread = threading.Thread(
+                target=self._read_events, args=(host, proc), daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _read_events(self, host: str, proc: subprocess.Popen) -> None:
+        """Forward lines from a host's channel to the event queue."""
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            fields = line.split()
+            if len(fields) >= 2 and fields[0] == "exit":
+                # an empty/garbled status file is still worth a look
+                code = (
+                    int(fields[2])
+                    if len(fields) == 3 and fields[2].lstrip("-").isdigit()
+                    else None
+                )
+                self.events.put((host, int(fields[1]), code))
+        proc.wait()
+        if not self.stopping:
+            rootLogger.debug(
+                f"[{host}] Job event channel closed (returncode {proc.returncode}), falling back to polling."
+            )
+            self.lost_hosts.add(host)
+            # have this host queried right away in case it went down with
+            # the simulations on it
+            self.events.put((host, None, None))
+
+    def wait_for_exits(self, timeout: float) -> Set[str]:
+        """Block until a host reports a simulation exit or timeout seconds
+        pass. Return the set of hosts that should be re-queried, which always
+        includes lost hosts once their fallback poll interval has passed."""
+        if self.lost_hosts:
+            timeout = min(timeout, POLL_FALLBACK_INTERVAL)
+
+        dirty_hosts: Set[str] = set()
+        deadline = time.monotonic() + timeout
+        block_timeout = timeout
+        while True:
+            try:
+                host, slotno, code = self.events.get(timeout=max(0, block_timeout))
+            except queue.Empty:
+                break
+            dirty_hosts.add(host)
+            if slotno is not None:
+                rootLogger.debug(
+                    f"[{host}] Simulation in slot {slotno} exited with code {code}."
+                )
+            # pick up any other exits that land at around the same time
+            block_timeout = min(
+                EVENT_COALESCE_WINDOW, max(0, deadline - time.monotonic())
+            )
+
+        if not dirty_hosts:
+            dirty_hosts |= self.lost_hosts
+        return dirty_hosts
+
+    def stop(self) -> None:
+        """Tear down all event channels."""
+        self.stopping = True
+        for proc in self.procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs.values():
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        for thread in self.threads:
+            thread.join(timeout=5)
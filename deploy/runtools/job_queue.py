@@ -0,0 +1,111 @@
+""" Queue of workload jobs for runworkload on non-networked topologies.
+
+Normally every simulation runs exactly one job of the workload. With a job
+queue (workload: job_queue in the runtime config), a workload can have more
+jobs than there are simulations: the simulations start with the first jobs
+in queue order, and whenever one of them finishes (and its results are
+copied back), the manager stages the next job's rootfs, boot binary and
+simulation inputs into that sim slot and relaunches the driver. The FPGA is
+not re-flashed and nothing else is set up again.
+
+Jobs are started in one of JOB_QUEUE_ORDERS:
+
+- fifo: the order they are listed in the workload
+- longest-first: the longest jobs first, based on how long they ran the last
+  time they were run (from JOB_RUNTIME_HISTORY_FILE). Jobs that haven't been
+  run before are assumed to be the longest. Starting long jobs first keeps a
+  few long jobs from running alone at the end of the run.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import deque
+from os.path import expanduser
+
+from typing import Deque, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from runtools.workload import JobConfig
+
+rootLogger = logging.getLogger()
+
+# past job runtimes (in seconds), keyed by workload name and job name
+JOB_RUNTIME_HISTORY_FILE = "~/.cache/firesim/job-runtimes.json"
+
+# values of workload: job_queue in the runtime config. "none" disables the
+# queue (one job per simulation)
+JOB_QUEUE_ORDERS = ["none", "fifo", "longest-first"]
+
+
+class JobRuntimeHistory:
+    """How long jobs took the last time they ran, persisted across runs."""
+
+    path: str
+    runtimes: Dict[str, float]
+
+    def __init__(self, path: str = JOB_RUNTIME_HISTORY_FILE) -> None:
+        self.path = expanduser(path)
+        self.runtimes = {}
+        try:
+            with open(self.path) as f:
+                self.runtimes = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(job: JobConfig) -> str:
+        return f"{job.parent_workload.workload_name}/{job.jobname}"
+
+    def get(self, job: JobConfig) -> Optional[float]:
+        return self.runtimes.get(self.key(job))
+
+    def record(self, job: JobConfig, runtime: float) -> None:
+        """Record that job ran for runtime seconds, and persist it."""
+        self.runtimes[self.key(job)] = round(runtime, 1)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self.runtimes, f, indent=2, sort_keys=True)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            rootLogger.debug(f"Could not persist job runtimes: {e}")
+
+
+def order_jobs(
+    jobs: List[JobConfig], order: str, history: JobRuntimeHistory
+) -> List[JobConfig]:
+    """Return jobs in the order they should be started in."""
+    assert order in JOB_QUEUE_ORDERS, f"Unknown job queue order {order}"
+    if order == "longest-first":
+        # sorted is stable, so jobs with the same (or no) past runtime stay
+        # in workload order
+        def past_runtime(job: JobConfig) -> float:
+            runtime = history.get(job)
+            return float("inf") if runtime is None else runtime
+
+        return sorted(jobs, key=lambda job: -past_runtime(job))
+    return list(jobs)
+
+
+class JobQueue:
+    """The jobs of a workload that are waiting for a simulation to run on."""
+
+    pending: Deque[JobConfig]
+    history: JobRuntimeHistory
+
+    def __init__(self, jobs: List[JobConfig], history: JobRuntimeHistory) -> None:
+        """jobs are already in queue order (see order_jobs)."""
+        self.pending = deque(jobs)
+        self.history = history
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def pop(self) -> Optional[JobConfig]:
+        """Take the next job to run, if any are left."""
+        if not self.pending:
+            return None
+        return self.pending.popleft()
@@ -0,0 +1,153 @@
+""" Cache of the switch and pipe model binaries built by the manager.
+
+Switch and pipe models are compiled from the sources in their target-design
+directory plus a generated config header (switchconfig.h, partitionconfig.h).
+Binaries are cached by the hash of everything that goes into them, so models
+with identical configs share one build, and later runs (or topology changes
+that leave a model's config untouched) reuse it. Distinct builds run in
+parallel on a process pool sized to the manager's cores.
+
+Each model is a single translation unit that includes its config header, so
+its binary is the smallest piece of a build that configs can share.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import shutil
+import subprocess
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from runtools.tracing import traced
+
+from typing import Dict, List, Tuple
+
+rootLogger = logging.getLogger()
+
+
+class ModelSources:
+    """The sources of a model: origdir holds its headers, sources and a
+    Makefile whose default target builds binary from them and the generated
+    config header config_name."""
+
+    origdir: str
+    binary: str
+    config_name: str
+
+    def __init__(self, origdir: str, binary: str, config_name: str) -> None:
+        self.origdir = origdir
+        self.binary = binary
+        self.config_name = config_name
+
+    def source_files(self) -> List[str]:
+        return sorted(
+            glob.glob(self.origdir + "*.h")
+            + glob.glob(self.origdir + "*.cc")
+            + [self.origdir + "Makefile"]
+        )
+
+    def cache_dir(self) -> str:
+        """Where binaries are cached. Named so that the Makefile's clean
+        target (which removes <binary>*-build/) removes it too."""
+        return self.origdir + self.binary + "-cache-build/"
+
+    def build_key(self, configfile: str) -> str:
+        """Return the cache key of a binary built from the sources with the
+        given config header contents."""
+        h = hashlib.sha256()
+        h.update(os.environ.get("CXX", "").encode())
+        h.update(configfile.encode())
+        for source in self.source_files():
+            h.update(os.path.basename(source).encode())
+            with open(source, "rb") as f:
+                h.update(f.read())
+        return h.hexdigest()
+
+    def cached_binary_path(self, key: str) -> str:
+        """Return where the binary with cache key key is (or will be)."""
+        return self.cache_dir() + key + "/" + self.binary
+
+    @traced("build")
+    def build_into_cache(self, key: str, configfile: str) -> str:
+        """Build a binary with the given config header contents into the
+        cache and return the build output. This runs in a worker process (see
+        build_model_binaries), so it doesn't go through fabric."""
+        cachedir = os.path.dirname(self.cached_binary_path(key))
+        # build off to the side and move into place once done, so that
+        # concurrent manager runs never see a partially built binary
+        builddir = cachedir + "-" + str(os.getpid()) + ".tmp/"
+        shutil.rmtree(builddir, ignore_errors=True)
+        os.makedirs(builddir)
+        for source in self.source_files():
+            shutil.copy(source, builddir)
+        with open(builddir + self.config_name, "w") as f:
+            f.write(configfile)
+
+        result = subprocess.run(
+            ["make", "-C", builddir], capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            shutil.rmtree(builddir, ignore_errors=True)
+            raise Exception(
+                f"{self.binary} build failed in {builddir}:\n{result.stdout}\n{result.stderr}"
+            )
+        try:
+            os.rename(builddir, cachedir)
+        except OSError:
+            # someone else finished the same build first
+            shutil.rmtree(builddir, ignore_errors=True)
+        return result.stdout + result.stderr
+
+
+@traced("build")
+def build_model_binaries(builds: List[Tuple[ModelSources, str]]) -> List[str]:
+    """Build a binary for each (model sources, config header contents) pair
+    in builds and return the path to each one's cached binary. Pairs that
+    end up with the same binary share a single build, and distinct builds
+    run in parallel."""
+    binary_paths = []
+    # cached binary path -> what to build it from
+    to_build: Dict[str, Tuple[ModelSources, str, str]] = {}
+    for sources, configfile in builds:
+        rootLogger.debug(str(configfile))
+        key = sources.build_key(configfile)
+        binary_path = sources.cached_binary_path(key)
+        binary_paths.append(binary_path)
+        if not os.path.exists(binary_path):
+            to_build.setdefault(binary_path, (sources, key, configfile))
+
+    if not builds:
+        return []
+    rootLogger.info(
+        f"Building {len(to_build)} switch/pipe model binaries for {len(builds)} models ({len(set(binary_paths)) - len(to_build)} already built)."
+    )
+
+    if to_build:
+        with ProcessPoolExecutor(
+            max_workers=min(len(to_build), os.cpu_count() or 1)
+        ) as executor:
+            futures = []
+            for sources, key, configfile in to_build.values():
+                os.makedirs(sources.cache_dir(), exist_ok=True)
+                futures.append(
+                    executor.submit(sources.build_into_cache, key, configfile)
+                )
+            for future in futures:
+                rootLogger.debug(future.result())
+
+    return binary_paths
+
+
+def install_model_binary(binary_path: str, local_path: str) -> None:
+    """Make the cached binary at binary_path available at local_path (a
+    model's per-run build directory)."""
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    if os.path.exists(local_path):
+        os.remove(local_path)
+    try:
+        os.link(binary_path, local_path)
+    except OSError:
+        shutil.copy2(binary_path, local_path)
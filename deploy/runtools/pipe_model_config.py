@@ -9,7 +9,12 @@ import logging
 import os
 
 from numpy import partition
-from fabric.api import local  # type: ignore
+
+from runtools.process_registry import registered_screen_command
+from runtools.model_build_cache import (
+    ModelSources,
+    install_model_binary,
+)
 
 from typing import List, Set, Dict, TYPE_CHECKING
 
@@ -22,6 +27,10 @@ rootLogger = logging.getLogger()
 
 GENERATED_PARTITION_PARAMS_FILE = "FireSim-generated.partition.const.h"
 
+PIPE_SOURCES = ModelSources(
+    "../target-design/partition/", "partitionpipe", "partitionconfig.h"
+)
+
 
 class PartitionBoundaryParams:
     _from_host: int
@@ -231,42 +240,10 @@ class AbstractPipeToPipeConfig:
     def pipe_binary_name(self) -> str:
         return "pipe" + str(self.fsimpipenode.pipe_id_internal)
 
-    def buildpipe(self) -> None:
-        """Generate the config file, build the pipe."""
-
-        configfile = self.emit_pipe_configfile()
-        binaryname = self.pipe_binary_name()
-
-        pipeorigdir = self.pipe_build_local_dir()
-        pipebuilddir = (
-            pipeorigdir + binaryname + "-" + self.build_disambiguate + "-build/"
-        )
-
-        rootLogger.info(
-            "Building pipe model binary for pipe " + str(self.pipe_binary_name())
-        )
-
-        rootLogger.debug(str(configfile))
-
-        def local_logged(command: str) -> None:
-            """Run local command with logging."""
-            localcap = local(command, capture=True)
-            rootLogger.debug(localcap)
-            rootLogger.debug(localcap.stderr)
-
-        # make a build dir for this pipe
-        local_logged("mkdir -p " + pipebuilddir)
-        local_logged("cp " + pipeorigdir + "*.h " + pipebuilddir)
-        local_logged("cp " + pipeorigdir + "*.cc " + pipebuilddir)
-        local_logged("cp " + pipeorigdir + "Makefile " + pipebuilddir)
-
-        text_file = open(pipebuilddir + "partitionconfig.h", "w")
-        text_file.write(configfile)
-        text_file.close()
-        local_logged("cd " + pipebuilddir + " && make")
-        local_logged(
-            "mv " + pipebuilddir + "partitionpipe " + pipebuilddir + binaryname
-        )
+    def install_pipe_binary(self, binary_path: str) -> None:
+        """Make the built pipe binary at binary_path available as this pipe's
+        binary (see pipe_binary_local_path)."""
+        install_model_binary(binary_path, self.pipe_binary_local_path())
 
     def get_pipe_simulation_command(self, sudo: bool) -> str:
         """Return the command to boot the pipe."""
@@ -275,11 +252,11 @@ class AbstractPipeToPipeConfig:
         partition_config = self.fsimpipenode.partition_config
         assert partition_config is not None
         batch_size = partition_config.batch_size
-        return """screen -S {} -d -m bash -c "script -f -c '{} ./{} {}' pipelog"; sleep 1""".format(
-            self.pipe_binary_name(),
-            "sudo" if sudo else "",
+        return registered_screen_command(
             self.pipe_binary_name(),
-            batch_size,
+            """script -f -c '{} ./{} {}' pipelog""".format(
+                "sudo" if sudo else "", self.pipe_binary_name(), batch_size
+            ),
         )
 
     def kill_pipe_simulation_command(self) -> str:
@@ -288,7 +265,7 @@ class AbstractPipeToPipeConfig:
 
     def pipe_build_local_dir(self) -> str:
         """get local build dir of the pipe."""
-        return "../target-design/partition/"
+        return PIPE_SOURCES.origdir
 
     def pipe_binary_local_path(self) -> str:
         """return the full local path where the pipe binary lives."""
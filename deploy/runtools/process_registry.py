@@ -0,0 +1,211 @@
+""" Per-host registry of the simulations, switches and pipes the manager runs.
+
+Everything the manager launches on a run farm host runs in a screen session
+named after it (fsim<slotno>, switch<id>, pipe<id>), inside a small wrapper
+that records, under REGISTRY_DIR in the host's sim dir:
+
+- <name>.pid: the pid of the wrapper and its start time (in clock ticks since
+  boot, from /proc/<pid>/stat), so that another process that reuses the pid
+  isn't mistaken for it
+- <name>.start: when the process was started (seconds since the epoch)
+- <name>.exit: "<exit code> <end time>", written once the process exits
+- <name>.rss: the peak RSS of the process in KiB, if the host has GNU time
+
+A single remote command (see registry_query_command) reports all of them as
+JSON, so the manager can tell which processes are running, which exited (and
+with what exit code) and which disappeared without exiting (e.g. because
+they, or their screen session, were killed), in one round trip per host.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+from runtools.sim_boot_batch import wait_for_screen_command
+
+from typing import Dict, Optional
+
+rootLogger = logging.getLogger()
+
+# registry directory, relative to the sim dir of a host. processes are always
+# started from a slot dir directly below the sim dir (sim_slot_<n>,
+# switch_slot_<n>, pipe_slot_<n>), so they find it at ../REGISTRY_DIR
+REGISTRY_DIR = ".firesim-registry"
+
+# states of registered processes
+RUNNING = "running"
+EXITED = "exited"
+LOST = "lost"
+
+
+def registered_screen_command(name: str, command: str) -> str:
+    """Return the shell command that runs command in a detached screen session
+    called name and records it in the registry as name. Must be run from a
+    slot dir (see REGISTRY_DIR). command should be a single command (the
+    manager wraps everything in script -c '...'), and ends up inside double
+    quotes, so it must escape $ (as \\$) to have it expanded when it runs."""
+    entry = f"../{REGISTRY_DIR}/{name}"
+    # GNU time, if available, reports the peak RSS of the process tree
+    time_prefix = (
+        f"\\$([ -x /usr/bin/time ] && echo /usr/bin/time -o {entry}.rss -f %M)"
+    )
+    wrapped = (
+        f"set -- \\$(cat /proc/\\$\\$/stat); echo \\$\\$ \\${{22}} > {entry}.pid; "
+        f"date +%s > {entry}.start; "
+        f"{time_prefix} {command}; "
+        f"echo \\$? \\$(date +%s) > {entry}.exit.tmp; mv {entry}.exit.tmp {entry}.exit"
+    )
+    return (
+        f"mkdir -p ../{REGISTRY_DIR}; "
+        f"rm -f {entry}.pid {entry}.start {entry}.exit {entry}.rss; "
+        f"""screen -S {name} -d -m bash -c "{wrapped}"; """
+        f"{wait_for_screen_command(name)}"
+    )
+
+
+# reports the registry of the sim dir it's run in as JSON: the host's current
+# time and, for every entry, its pid, state, exit code, start/end times and
+# peak RSS (null where unknown). processes whose wrapper is gone (or whose pid
+# now belongs to a process that started at another time) but didn't record an
+# exit code are reported as lost
+REGISTRY_QUERY_SCRIPT = """
+num() {{ case "$1" in ''|*[!0-9-]*) echo null;; *) echo "$1";; esac; }}
+# start time of a process, field 22 of its stat (field 20 after its name)
+starttime() {{ s=$(cat /proc/$1/stat 2>/dev/null) && s=${{s##*) }} && set -- $s && echo ${{20}}; }}
+printf '{{"now":%s,"processes":{{' "$(date +%s)"
+sep=
+for f in {registry_dir}/*.pid; do
+    [ -f "$f" ] || continue
+    e=${{f%.pid}}
+    pid=; pstart=
+    read pid pstart < "$f"
+    code=; end=; rss=
+    if [ -f "$e.exit" ]; then
+        read code end < "$e.exit"
+        state={exited}
+    elif [ -n "$pid" ] && [ -d "/proc/$pid" ] && \\
+        {{ [ -z "$pstart" ] || [ "$(starttime "$pid")" = "$pstart" ]; }}; then
+        state={running}
+    else
+        state={lost}
+    fi
+    [ -f "$e.rss" ] && rss=$(tail -n 1 "$e.rss")
+    printf '%s"%s":{{"pid":%s,"state":"%s","exit_code":%s,"start":%s,"end":%s,"peak_rss_kb":%s}}' \\
+        "$sep" "${{e##*/}}" "$(num "$pid")" "$state" "$(num "$code")" \\
+        "$(num "$(cat "$e.start" 2>/dev/null)")" "$(num "$end")" "$(num "$rss")"
+    sep=,
+done
+printf '}}}}\\n'
+"""
+
+
+def registry_query_command(sim_dir: str) -> str:
+    """Return the shell command that reports the registry of the host whose
+    sim dir is sim_dir (see parse_registry_query)."""
+    return f"cd {sim_dir} && " + REGISTRY_QUERY_SCRIPT.format(
+        registry_dir=REGISTRY_DIR, running=RUNNING, exited=EXITED, lost=LOST
+    )
+
+
+class RegisteredProcess:
+    """A process in a host's registry.
+
+    Attributes:
+        name: Name of the process (and its screen session).
+        state: RUNNING, EXITED or LOST.
+        exit_code: Exit code of the process, if it exited.
+        runtime: Seconds the process ran (so far, if it is still running).
+        peak_rss_kb: Peak RSS of the process in KiB, if known.
+    """
+
+    name: str
+    state: str
+    exit_code: Optional[int]
+    runtime: Optional[int]
+    peak_rss_kb: Optional[int]
+
+    def __init__(
+        self,
+        name: str,
+        state: str,
+        exit_code: Optional[int],
+        runtime: Optional[int],
+        peak_rss_kb: Optional[int],
+    ) -> None:
+        self.name = name
+        self.state = state
+        self.exit_code = exit_code
+        self.runtime = runtime
+        self.peak_rss_kb = peak_rss_kb
+
+    def is_running(self) -> bool:
+        return self.state == RUNNING
+
+    def summary(self) -> str:
+        """Return a short description of how the process is doing (or how it
+        ended).
+
+        >>> RegisteredProcess("fsim0", EXITED, 0, 75, 2048).summary()
+        'exited with code 0 after 75s, peak RSS 2 MiB'
+        >>> RegisteredProcess("switch0", LOST, None, None, None).summary()
+        'lost (killed without recording an exit code)'
+        """
+        if self.state == EXITED:
+            desc = f"exited with code {self.exit_code}"
+            if self.runtime is not None:
+                desc += f" after {self.runtime}s"
+        elif self.state == LOST:
+            desc = "lost (killed without recording an exit code)"
+        else:
+            desc = "running"
+            if self.runtime is not None:
+                desc += f" for {self.runtime}s"
+        if self.peak_rss_kb is not None:
+            desc += f", peak RSS {self.peak_rss_kb // 1024} MiB"
+        return desc
+
+
+def parse_registry_query(output: str) -> Dict[str, RegisteredProcess]:
+    """Parse the output of the command from registry_query_command into
+    a dict from process name to RegisteredProcess. Lines other than the JSON
+    report (e.g. login banners) are ignored.
+
+    >>> out = 'banner\\n{"now":110,"processes":{"fsim0":{"pid":7,"state":"running","exit_code":null,"start":100,"end":null,"peak_rss_kb":null},"switch0":{"pid":8,"state":"exited","exit_code":1,"start":100,"end":104,"peak_rss_kb":4096}}}'
+    >>> procs = parse_registry_query(out)
+    >>> procs["fsim0"].is_running(), procs["fsim0"].runtime
+    (True, 10)
+    >>> procs["switch0"].summary()
+    'exited with code 1 after 4s, peak RSS 4 MiB'
+    >>> parse_registry_query("")
+    {}
+    """
+    report = None
+    for line in output.splitlines():
+        if line.startswith("{"):
+            report = line
+    if report is None:
+        rootLogger.debug(f"No process registry report in: {output}")
+        return {}
+
+    parsed = json.loads(report)
+    processes = {}
+    for name, entry in parsed["processes"].items():
+        runtime = None
+        if entry["start"] is not None:
+            end = entry["end"] if entry["end"] is not None else parsed["now"]
+            runtime = end - entry["start"]
+        processes[name] = RegisteredProcess(
+            name,
+            entry["state"],
+            entry["exit_code"],
+            runtime,
+            entry["peak_rss_kb"],
+        )
+    return processes
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
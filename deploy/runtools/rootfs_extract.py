@@ -0,0 +1,137 @@
+""" Mount-free extraction of job outputs from rootfs images.
+
+Copying back the outputs of a job from its rootfs used to mean loop-mounting
+the image with sudo, chowning everything in it to the user (which touches
+every inode of a multi-GB image to read a few files) and unmounting it again,
+one slot at a time per host. Instead, for ext2/3/4 images, the outputs are
+read straight out of the image file with debugfs (from e2fsprogs), which
+needs no root and can run for every slot on a host at once. The outputs are
+packed into a single (compressed) archive in the slot dir, which the manager
+copies back and unpacks into the job's results dir.
+
+Images debugfs can't read (qcow2 images, other filesystems, hosts without
+e2fsprogs) and outputs with globs still go through the mount-based copy-back.
+Unlike a mount, debugfs does not replay the journal of an ext3/4 image, so
+this relies on the simulated system shutting down cleanly, as workloads do
+anyway for their outputs to be complete.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from typing import List, Tuple
+
+rootLogger = logging.getLogger()
+
+# scratch dir, relative to the sim slot dir, that outputs are extracted to
+EXTRACT_DIR = ".firesim-extract"
+
+# archive of the extracted outputs, relative to the sim slot dir
+OUTPUTS_ARCHIVE = "rootfs-outputs.tar"
+
+# exit code of the extraction script if debugfs is missing or can't read the
+# image, in which case the outputs have to be copied back from a mount
+EXTRACT_UNSUPPORTED = 3
+
+# terminates the heredoc that the debugfs commands are written with
+DEBUGFS_COMMANDS_EOF = "FIRESIM_DEBUGFS_EOF"
+
+# lines of the debugfs log that are not errors: its banner, the commands it
+# echoes, the notice for -c and outputs that don't exist in the image
+DEBUGFS_LOG_IGNORED = [
+    "^debugfs[ :]",
+    "catastrophic mode",
+    "File not found by ext2_lookup",
+]
+
+
+def can_extract_outputs(outputs: List[str]) -> bool:
+    """Return True iff outputs (paths inside the rootfs) can be extracted with
+    debugfs, which does not expand globs.
+
+    >>> can_extract_outputs(["/root/results/", "/etc/os-release"])
+    True
+    >>> can_extract_outputs(["/root/*.csv"])
+    False
+    """
+    return not any(c in output for output in outputs for c in "*?[")
+
+
+def split_output(output: str) -> Tuple[str, bool]:
+    """Return the path to extract for output, and whether only its contents
+    should be copied back (a trailing slash, as with rsync).
+
+    >>> split_output("/root/results/")
+    ('/root/results', True)
+    >>> split_output("root/uartlog")
+    ('/root/uartlog', False)
+    """
+    contents_only = output.endswith("/")
+    return "/" + output.strip("/"), contents_only
+
+
+def archive_name(compress: bool) -> str:
+    """Name of the outputs archive in the sim slot dir.
+
+    >>> archive_name(True)
+    'rootfs-outputs.tar.gz'
+    """
+    return OUTPUTS_ARCHIVE + (".gz" if compress else "")
+
+
+def build_extract_script(image: str, outputs: List[str], compress: bool) -> str:
+    """The script that extracts outputs (paths inside the rootfs) from the
+    ext2/3/4 image into archive_name(compress). It must be run from the sim
+    slot dir that image is in, and exits with EXTRACT_UNSUPPORTED if the image
+    can't be read with debugfs. Outputs that don't exist in the image are
+    skipped. Any other errors debugfs reports (e.g. for a corrupt inode) are
+    printed to stderr."""
+    lines = [
+        "#!/usr/bin/env bash",
+        "set -e",
+        f"command -v debugfs >/dev/null || exit {EXTRACT_UNSUPPORTED}",
+        # debugfs exits with 0 even if it can't open the image
+        f"""if debugfs -c -R "stat /" "{image}" 2>&1 | grep -q "while trying to open"; then exit {EXTRACT_UNSUPPORTED}; fi""",
+        f"rm -rf {EXTRACT_DIR} {archive_name(compress)}",
+        f"mkdir -p {EXTRACT_DIR}",
+        f"cat > {EXTRACT_DIR}/commands <<'{DEBUGFS_COMMANDS_EOF}'",
+    ]
+    # every output gets its own dir, so outputs with the same name don't
+    # clobber each other before they are archived. tar -C is relative to the
+    # previous -C, so the dirs are passed to it as absolute paths
+    members = []
+    for index, output in enumerate(outputs):
+        path, contents_only = split_output(output)
+        dest = f"{EXTRACT_DIR}/{index}"
+        lines.append(f'rdump "{path}" {dest}')
+        name = path.split("/")[-1]
+        if contents_only:
+            members.append((f"{dest}/{name}", f'-C "$PWD/{dest}/{name}" .'))
+        else:
+            members.append((f"{dest}/{name}", f'-C "$PWD/{dest}" "{name}"'))
+    lines.append(DEBUGFS_COMMANDS_EOF)
+    if outputs:
+        lines.append(
+            f"mkdir -p {' '.join(f'{EXTRACT_DIR}/{i}' for i in range(len(outputs)))}"
+        )
+    lines.append(
+        f'debugfs -c -f {EXTRACT_DIR}/commands "{image}" > {EXTRACT_DIR}/debugfs.log 2>&1'
+    )
+    ignored = " ".join(f"-e '{pattern}'" for pattern in DEBUGFS_LOG_IGNORED)
+    lines.append(f"grep -v {ignored} {EXTRACT_DIR}/debugfs.log >&2 || true")
+    lines.append("members=()")
+    for extracted, member in members:
+        lines.append(f'if [ -e "{extracted}" ]; then members+=({member}); fi')
+    tar_flags = "-czf" if compress else "-cf"
+    lines.append(
+        f'tar {tar_flags} {archive_name(compress)} -T /dev/null "${{members[@]}}"'
+    )
+    lines.append(f"rm -rf {EXTRACT_DIR}")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
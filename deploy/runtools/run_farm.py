@@ -10,7 +10,8 @@ from fabric.api import run, env, prefix, put, cd, warn_only, local, settings, hi
 from fabric.contrib.project import rsync_project  # type: ignore
 from os.path import join as pjoin
 import pprint
-from collections import defaultdict
+from bisect import bisect_left
+from collections import defaultdict, deque
 
 from awstools.awstools import (
     instances_sorted_by_avail_ip,
@@ -26,15 +27,27 @@ from awstools.awstools import (
 from runtools.firesim_topology_elements import FireSimPipeNode
 from util.inheritors import inheritors
 from util.io import firesim_input
+from runtools.ssh_pool import ssh_connection_pool
 from runtools.run_farm_deploy_managers import (
     InstanceDeployManager,
     EC2InstanceDeployManager,
 )
 
-from typing import Any, Dict, Optional, List, Union, Set, Type, Tuple, TYPE_CHECKING
-from mypy_boto3_ec2.service_resource import Instance as EC2InstanceResource
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Optional,
+    List,
+    Union,
+    Set,
+    Type,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 if TYPE_CHECKING:
+    from mypy_boto3_ec2.service_resource import Instance as EC2InstanceResource
     from runtools.firesim_topology_elements import FireSimSwitchNode, FireSimServerNode
 
 rootLogger = logging.getLogger()
@@ -136,6 +149,7 @@ class Inst(metaclass=abc.ABCMeta):
         return self.host
 
     def set_host(self, host: str) -> None:
+        self.run_farm.index_host(self, host)
         self.host = host
 
     def add_switch(self, firesimswitchnode: FireSimSwitchNode) -> None:
@@ -194,7 +208,14 @@ class RunFarm(metaclass=abc.ABCMeta):
         mapper_consumed: dict of allocated instance names to number of allocations of that instance name.
             this mapping API tracks instances allocated not sim slots (it is possible to allocate an instance
             that has some sim slots unassigned)
+        sim_host_free_lists: dict of sim slot counts to the host handles with that many sim slots that
+            may still have unallocated hosts, in the order the mapper hands them out
+        sim_host_slot_counts: sorted keys of 'sim_host_free_lists'
+        switch_only_free_list: host handles that can hold only switches and may still have
+            unallocated hosts, in the order the mapper hands them out
+        host_index: dict of host names to run farm hosts (`Inst`s) that have been bound to a host
         metasimulation_enabled: true if this run farm will be running metasimulations
+        slot_setup_concurrency: max number of sim slots set up at once on a single run farm host
 
     """
 
@@ -209,9 +230,14 @@ class RunFarm(metaclass=abc.ABCMeta):
         str, List[Tuple[Inst, Optional[Union[EC2InstanceResource, MockBoto3Instance]]]]
     ]
     mapper_consumed: Dict[str, int]
+    sim_host_free_lists: Dict[int, Deque[str]]
+    sim_host_slot_counts: List[int]
+    switch_only_free_list: Deque[str]
+    host_index: Dict[str, Inst]
 
     default_simulation_dir: str
     metasimulation_enabled: bool
+    slot_setup_concurrency: int
 
     def __init__(self, args: Dict[str, Any], metasimulation_enabled: bool) -> None:
         self.args = args
@@ -219,9 +245,18 @@ class RunFarm(metaclass=abc.ABCMeta):
         self.default_simulation_dir = self.args.get(
             "default_simulation_dir", f"/home/{os.environ['USER']}"
         )
+        ssh_connection_pool.configure(
+            int(self.args.get("ssh_keepalive_interval", 15)),
+            int(self.args.get("ssh_idle_timeout", 600)),
+        )
+        self.slot_setup_concurrency = int(self.args.get("slot_setup_concurrency", 4))
+        assert (
+            self.slot_setup_concurrency >= 1
+        ), "slot_setup_concurrency must be at least 1"
         self.SIM_HOST_HANDLE_TO_MAX_FPGA_SLOTS = dict()
         self.SIM_HOST_HANDLE_TO_MAX_METASIM_SLOTS = dict()
         self.SIM_HOST_HANDLE_TO_SWITCH_ONLY_OK = dict()
+        self.host_index = dict()
 
     def init_postprocess(self) -> None:
         self.SORTED_SIM_HOST_HANDLE_TO_MAX_FPGA_SLOTS = invert_filter_sort(
@@ -231,59 +266,104 @@ class RunFarm(metaclass=abc.ABCMeta):
             self.SIM_HOST_HANDLE_TO_MAX_METASIM_SLOTS
         )
 
-    def get_smallest_sim_host_handle(self, num_sims: int) -> str:
-        """Return the smallest run host handle (unique string to identify a run host type) that
-        supports greater than or equal to num_sims simulations AND has available run hosts
-        of that type (according to run host counts you've specified in config_run_farm.ini).
-        """
+        # free lists for the mapper. handles are dropped from the front of a
+        # free list once all of their hosts are allocated, which is final, so
+        # finding a host handle is amortized O(1) instead of a scan over all
+        # of them (there is one handle per host in externally provisioned
+        # run farms)
         sorted_slots = None
         if self.metasimulation_enabled:
             sorted_slots = self.SORTED_SIM_HOST_HANDLE_TO_MAX_METASIM_SLOTS
         else:
             sorted_slots = self.SORTED_SIM_HOST_HANDLE_TO_MAX_FPGA_SLOTS
-
+        self.sim_host_free_lists = dict()
         for max_simcount, sim_host_handle in sorted_slots:
-            if max_simcount < num_sims:
-                # instance doesn't support enough sims
-                continue
-            num_consumed = self.mapper_consumed[sim_host_handle]
-            num_allocated = len(self.run_farm_hosts_dict[sim_host_handle])
-            if num_consumed >= num_allocated:
-                # instance supports enough sims but none are available
-                continue
-            return sim_host_handle
+            self.sim_host_free_lists.setdefault(max_simcount, deque()).append(
+                sim_host_handle
+            )
+        self.sim_host_slot_counts = sorted(self.sim_host_free_lists)
+        self.switch_only_free_list = deque(
+            sim_host_handle
+            for sim_host_handle, switch_ok in sorted(
+                self.SIM_HOST_HANDLE_TO_SWITCH_ONLY_OK.items(), key=lambda x: x[0]
+            )
+            if switch_ok
+        )
+
+    def has_unallocated_host(self, sim_host_handle: str) -> bool:
+        """Return True iff not all run hosts of the handle are allocated."""
+        num_consumed = self.mapper_consumed[sim_host_handle]
+        num_allocated = len(self.run_farm_hosts_dict[sim_host_handle])
+        return num_consumed < num_allocated
+
+    def first_unallocated_handle(self, free_list: Deque[str]) -> Optional[str]:
+        """Return the first handle in free_list that has unallocated hosts,
+        dropping the ones in front of it that don't."""
+        while free_list and not self.has_unallocated_host(free_list[0]):
+            free_list.popleft()
+        return free_list[0] if free_list else None
+
+    def get_smallest_sim_host_handle(self, num_sims: int) -> str:
+        """Return the smallest run host handle (unique string to identify a run host type) that
+        supports greater than or equal to num_sims simulations AND has available run hosts
+        of that type (according to run host counts you've specified in config_run_farm.ini).
+        """
+        # skip the slot counts that don't support enough sims
+        first = bisect_left(self.sim_host_slot_counts, num_sims)
+        for max_simcount in self.sim_host_slot_counts[first:]:
+            sim_host_handle = self.first_unallocated_handle(
+                self.sim_host_free_lists[max_simcount]
+            )
+            if sim_host_handle is not None:
+                return sim_host_handle
 
         rootLogger.critical(
             f"ERROR: No hosts are available to satisfy the request for a host with support for {num_sims} simulation slots. Add more hosts in your run farm configuration (e.g., config_runtime.yaml)."
         )
         raise Exception
 
+    def get_available_sim_host_capacities(self) -> List[int]:
+        """Return the number of sim slots of each run host that supports
+        simulations and is not allocated yet."""
+        capacities = []
+        for max_simcount in self.sim_host_slot_counts:
+            for sim_host_handle in self.sim_host_free_lists[max_simcount]:
+                num_unallocated = (
+                    len(self.run_farm_hosts_dict[sim_host_handle])
+                    - self.mapper_consumed[sim_host_handle]
+                )
+                capacities += [max_simcount] * max(num_unallocated, 0)
+        return capacities
+
+    def get_available_switch_only_host_count(self) -> int:
+        """Return the number of run hosts that can hold only switches and are
+        not allocated yet."""
+        return sum(
+            max(
+                len(self.run_farm_hosts_dict[sim_host_handle])
+                - self.mapper_consumed[sim_host_handle],
+                0,
+            )
+            for sim_host_handle in self.switch_only_free_list
+        )
+
     def allocate_sim_host(self, sim_host_handle: str) -> Inst:
         """Let user allocate and use an run host (assign sims, etc.) given it's handle."""
-        rootLogger.info(f"run_farm_hosts_dict {self.run_farm_hosts_dict}")
-        inst_tup = self.run_farm_hosts_dict[sim_host_handle][
-            self.mapper_consumed[sim_host_handle]
-        ]
+        inst_index = self.mapper_consumed[sim_host_handle]
+        inst_tup = self.run_farm_hosts_dict[sim_host_handle][inst_index]
         inst_ret = inst_tup[0]
         self.mapper_consumed[sim_host_handle] += 1
+        rootLogger.debug(
+            f"Allocated {sim_host_handle} run host {inst_index + 1} of {len(self.run_farm_hosts_dict[sim_host_handle])}"
+        )
         return inst_ret
 
     def get_switch_only_host_handle(self) -> str:
         """Get the default run host handle (unique string to identify a run host type) that can
         host switch simulations.
         """
-        for sim_host_handle, switch_ok in sorted(
-            self.SIM_HOST_HANDLE_TO_SWITCH_ONLY_OK.items(), key=lambda x: x[0]
-        ):
-            if not switch_ok:
-                # cannot use this handle for switch-only mapping
-                continue
-
-            num_consumed = self.mapper_consumed[sim_host_handle]
-            num_allocated = len(self.run_farm_hosts_dict[sim_host_handle])
-            if num_consumed >= num_allocated:
-                # instance supports enough sims but none are available
-                continue
+        sim_host_handle = self.first_unallocated_handle(self.switch_only_free_list)
+        if sim_host_handle is not None:
             return sim_host_handle
 
         rootLogger.critical(
@@ -327,10 +407,17 @@ class RunFarm(metaclass=abc.ABCMeta):
         """Return all run host nodes that are ready to use (bound to relevant objects)."""
         raise NotImplementedError
 
-    @abc.abstractmethod
+    def index_host(self, inst: Inst, host: str) -> None:
+        """Record that inst is bound to host (see Inst.set_host)."""
+        if inst.host is not None and self.host_index.get(inst.host) is inst:
+            del self.host_index[inst.host]
+        self.host_index[host] = inst
+
     def lookup_by_host(self, host: str) -> Inst:
         """Return run farm host based on host."""
-        raise NotImplementedError
+        inst = self.host_index.get(host)
+        assert inst is not None, f"Unable to find host node by {host}"
+        return inst
 
     @abc.abstractmethod
     def terminate_by_inst(self, inst: Inst) -> None:
@@ -662,12 +749,6 @@ class AWSEC2F2(RunFarm):
                     all_insts.append(inst)
         return all_insts
 
-    def lookup_by_host(self, host) -> Inst:
-        for host_node in self.get_all_bound_host_nodes():
-            if host_node.get_host() == host:
-                return host_node
-        assert False, f"Unable to find host node by {host}"
-
     def terminate_by_inst(self, inst: Inst) -> None:
         """Terminate run farm host based on host."""
         for sim_host_handle in sorted(self.SIM_HOST_HANDLE_TO_MAX_FPGA_SLOTS):
@@ -793,12 +874,6 @@ class ExternallyProvisioned(RunFarm):
     def get_all_bound_host_nodes(self) -> List[Inst]:
         return self.get_all_host_nodes()
 
-    def lookup_by_host(self, host: str) -> Inst:
-        for host_node in self.get_all_bound_host_nodes():
-            if host_node.get_host() == host:
-                return host_node
-        assert False, f"Unable to find host node by {host} host name"
-
     def terminate_by_inst(self, inst: Inst) -> None:
         rootLogger.info(
             f"WARNING: Skipping terminate_by_inst since run hosts are externally provisioned."
@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
-import re
 import logging
 import abc
+import io
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from fabric.api import prefix, local, run, env, cd, warn_only, put, settings, hide  # type: ignore
 from fabric.contrib.project import rsync_project  # type: ignore
 from os.path import join as pjoin
@@ -14,10 +18,42 @@ from pathlib import Path
 
 from util.streamlogger import StreamLogger
 from awstools.awstools import terminate_instances, get_instance_ids_for_instances
-from runtools.utils import has_sudo, run_only_aws, check_script, is_on_aws, script_path
+from runtools.utils import (
+    has_sudo,
+    run_only_aws,
+    check_script,
+    is_on_aws,
+    script_path,
+    get_content_hash,
+    human_readable_size,
+)
+from runtools.ssh_pool import ssh_connection_pool
+from runtools.tracing import span, traced_methods
+from runtools.sim_boot_batch import build_sim_boot_script
+from runtools.process_registry import (
+    RegisteredProcess,
+    registry_query_command,
+    parse_registry_query,
+)
+from runtools.fpga_slot_batch import (
+    build_f2_slots_command,
+    parse_slot_results,
+    check_slot_results,
+)
 from buildtools.bitbuilder import get_deploy_dir
 
-from typing import List, Dict, Optional, Union, Tuple, TYPE_CHECKING
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Dict,
+    Optional,
+    Set,
+    Union,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 if TYPE_CHECKING:
     from runtools.run_farm import Inst
@@ -56,6 +92,39 @@ class NBDTracker:
         return self.allocated_dict[imagename]
 
 
+# name of the file (relative to a host's sim dir) that records what infrasetup
+# deployed to the host, so that an incremental infrasetup can skip whatever is
+# already up to date
+INFRASETUP_MANIFEST_FILE = ".firesim-manifest.json"
+
+# prefix of the lines that report the size/mtime of rootfs copies in slots
+ROOTFS_STAMP_MARKER = "FIRESIM_ROOTFS_STAMP"
+
+
+# record a trace span (see runtools.tracing) for the methods of every
+# platform's deploy manager, except for trivial helpers
+traced_deploy_methods = traced_methods(
+    "deploy",
+    host_of=lambda self: self.parent_node.get_host(),
+    exclude={
+        "instance_logger",
+        "timed_step",
+        "log_step_timings",
+        "instance_assigned_simulations",
+        "instance_assigned_switches",
+        "instance_assigned_pipes",
+        "get_remote_sim_dir_for_slot",
+        "get_remote_infrastructure_store_dir",
+        "get_remote_manifest_path",
+        "is_deployed",
+        "record_deployed",
+        "slot_to_bdf",
+        "get_sim_slot_extra_plusargs",
+    },
+)
+
+
+@traced_deploy_methods
 class InstanceDeployManager(metaclass=abc.ABCMeta):
     """Class used to represent different "run platforms" and how to start/stop and setup simulations.
 
@@ -65,6 +134,19 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
 
     parent_node: Inst
     nbd_tracker: Optional[NBDTracker]
+    infrastructure_store_used: Set[str]
+    infrastructure_stored_hashes: Optional[Set[str]]
+    infrastructure_store_lock: threading.Lock
+    infrastructure_store_hash_locks: Dict[str, threading.Lock]
+    infrastructure_bytes_uploaded: int
+    infrastructure_bytes_saved: int
+    fpga_program_lock: threading.Lock
+    force_flash: bool
+    incremental: bool
+    deployed_manifest: Dict[str, Any]
+    manifest: Dict[str, Any]
+    infrasetup_rootfs_stamps: Optional[Dict[str, Dict[str, str]]]
+    step_timings: List[Tuple[str, float]]
 
     def __init__(self, parent_node: Inst) -> None:
         """
@@ -78,6 +160,29 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
         # Set this to self.nbd_tracker = NBDTracker() in the __init__ of your
         # subclass if your system supports the NBD kernel module.
         self.nbd_tracker = None
+        # stats/bookkeeping for the remote infrastructure store. slots can be
+        # set up concurrently (see run_for_each_slot), so guard it with locks
+        self.infrastructure_store_used = set()
+        self.infrastructure_stored_hashes = None
+        self.infrastructure_store_lock = threading.Lock()
+        self.infrastructure_store_hash_locks = {}
+        self.infrastructure_bytes_uploaded = 0
+        self.infrastructure_bytes_saved = 0
+        # programming tools may share state on the host (e.g. hw_server), so
+        # only ever program one FPGA on a host at a time
+        self.fpga_program_lock = threading.Lock()
+        # re-flash FPGAs even if they already have the requested image loaded
+        self.force_flash = False
+        # only re-deploy what changed since the last infrasetup (according to
+        # the manifest on the host, see read_deployed_manifest)
+        self.incremental = False
+        self.deployed_manifest = {}
+        self.manifest = {"sim_slots": {}, "switch_slots": {}, "pipe_slots": {}}
+        # rootfs stamps of each sim slot as infrasetup left them (see
+        # stage_job_in_sim_slot)
+        self.infrasetup_rootfs_stamps = None
+        # (step name, seconds) for each timed step of setting up this host
+        self.step_timings = []
 
     @abc.abstractmethod
     def infrasetup_instance(self, uridir: str) -> None:
@@ -115,6 +220,44 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
         else:
             rootLogger.info("""[{}] """.format(env.host_string) + logstr)
 
+    @contextmanager
+    def timed_step(self, step: str) -> Iterator[None]:
+        """Time a step of setting up this host and log how long it took."""
+        start = time.monotonic()
+        try:
+            with span(step, "step", self.parent_node.get_host()):
+                yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.step_timings.append((step, elapsed))
+            self.instance_logger(f"{step} took {elapsed:.1f}s.", debug=True)
+
+    def log_step_timings(self) -> None:
+        """Log all timed steps so far, slowest first."""
+        if self.step_timings:
+            slowest_first = sorted(self.step_timings, key=lambda x: x[1], reverse=True)
+            self.instance_logger(
+                "Step timings: "
+                + ", ".join(f"{step}: {secs:.1f}s" for step, secs in slowest_first)
+            )
+
+    def run_for_each_slot(self, slot_func: Callable[[int], None]) -> None:
+        """Call slot_func(slotno) for every sim slot on this host, for up to
+        the run farm's slot_setup_concurrency slots at a time.
+
+        slot_func runs on a worker thread, so it must not use fabric context
+        managers that modify global state (cd, settings, hide, prefix etc.)."""
+        num_slots = len(self.parent_node.sim_slots)
+        max_workers = min(self.parent_node.run_farm.slot_setup_concurrency, num_slots)
+        if max_workers <= 1:
+            for slotno in range(num_slots):
+                slot_func(slotno)
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consume the results so that exceptions are raised here
+            list(executor.map(slot_func, range(num_slots)))
+
     def sim_node_qcow(self) -> None:
         """If NBD is available and qcow2 support is required, install qemu-img
         management tools and copy NBD infra to remote node. This assumes that
@@ -182,8 +325,102 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
 
         return remote_sim_dir
 
+    def get_remote_infrastructure_store_dir(self) -> str:
+        """Returns the path on the remote of the store that simulation
+        infrastructure is uploaded to before being linked into slots."""
+        return f"{self.parent_node.get_sim_dir()}/.firesim-store/"
+
+    def get_remote_manifest_path(self) -> str:
+        """Returns the path on the remote of the infrasetup manifest."""
+        return pjoin(self.parent_node.get_sim_dir(), INFRASETUP_MANIFEST_FILE)
+
+    def read_deployed_manifest(self) -> None:
+        """Load the manifest left on the host by the last infrasetup, if doing
+        an incremental infrasetup. The manifest is removed from the host until
+        write_manifest is called, so that an interrupted infrasetup never
+        leaves behind a manifest that doesn't match what's on the host."""
+        manifest_path = self.get_remote_manifest_path()
+        with hide("stdout"):
+            contents = run(f"cat {manifest_path} 2>/dev/null; rm -f {manifest_path}")
+        self.deployed_manifest = {}
+        if self.incremental:
+            try:
+                self.deployed_manifest = json.loads(contents)
+            except json.JSONDecodeError:
+                self.instance_logger(
+                    "No usable manifest from a previous infrasetup, deploying everything."
+                )
+
+    def write_manifest(self) -> None:
+        """Record everything deployed by this infrasetup on the host."""
+        run(f"mkdir -p {self.parent_node.get_sim_dir()}")
+        put(
+            io.StringIO(json.dumps(self.manifest, indent=2, sort_keys=True)),
+            self.get_remote_manifest_path(),
+        )
+
+    def is_deployed(self, kind: str, slotno: int, name: str, content_hash: str) -> bool:
+        """Return true if, during an incremental infrasetup, the last
+        infrasetup already deployed name with content_hash to the slot."""
+        deployed_files = (
+            self.deployed_manifest.get(kind, {}).get(str(slotno), {}).get("files", {})
+        )
+        return self.incremental and deployed_files.get(name) == content_hash
+
+    def record_deployed(
+        self, kind: str, slotno: int, files: Dict[str, str], **extra: Any
+    ) -> None:
+        """Record the files (name to content hash) deployed to a slot."""
+        with self.infrastructure_store_lock:
+            self.manifest[kind][str(slotno)] = dict(files=files, **extra)
+
+    def upload_to_infrastructure_store(self, local_path: str) -> Tuple[str, bool]:
+        """Make sure the contents of local_path are in the remote
+        infrastructure store. Return the remote path to the stored copy and
+        whether it had to be uploaded. Concurrent calls for the same contents
+        upload them only once."""
+        content_hash = get_content_hash(local_path)
+        remote_store_dir = self.get_remote_infrastructure_store_dir()
+        stored_path = pjoin(remote_store_dir, content_hash)
+
+        with self.infrastructure_store_lock:
+            if self.infrastructure_stored_hashes is None:
+                self.infrastructure_stored_hashes = set(
+                    run(f"mkdir -p {remote_store_dir} && ls {remote_store_dir}").split()
+                )
+            hash_lock = self.infrastructure_store_hash_locks.setdefault(
+                content_hash, threading.Lock()
+            )
+            self.infrastructure_store_used.add(content_hash)
+
+        with hash_lock:
+            if content_hash in self.infrastructure_stored_hashes:
+                return stored_path, False
+
+            # upload under a temporary name so that an interrupted transfer is
+            # never mistaken for a complete one
+            rsync_cap = rsync_project(
+                local_dir=local_path,
+                remote_dir=stored_path + ".partial",
+                ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
+                extra_opts="-L",
+                capture=True,
+            )
+            rootLogger.debug(rsync_cap)
+            rootLogger.debug(rsync_cap.stderr)
+            run(f"mv -f {stored_path}.partial {stored_path}")
+            self.infrastructure_stored_hashes.add(content_hash)
+            return stored_path, True
+
     def copy_sim_slot_infrastructure(self, slotno: int, uridir: str) -> None:
-        """copy all the simulation infrastructure to the remote node."""
+        """copy all the simulation infrastructure to the remote node.
+
+        Files are uploaded to a per-host store, named by the hash of their
+        contents, so identical files (e.g. the same rootfs used by every slot)
+        only cross the network once per host. The slot then gets hardlinks to
+        the stored files, except for rootfses, which are written to by the
+        simulation and so get their own (reflinked, if supported) copy, or,
+        with rootfs overlays, a qcow2 overlay backed by the stored rootfs."""
         if self.instance_assigned_simulations():
             assert slotno < len(
                 self.parent_node.sim_slots
@@ -195,28 +432,173 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             )
 
             remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
-            remote_sim_rsync_dir = remote_sim_dir + "rsyncdir/"
-            run(f"mkdir -p {remote_sim_rsync_dir}")
+            files_to_copy = serv.get_sim_infrastructure_local_paths(uridir)
+            rootfs_names = [x for x in serv.get_all_rootfs_names() if x is not None]
+            deployed_stamps = (
+                self.deployed_manifest.get("sim_slots", {})
+                .get(str(slotno), {})
+                .get("rootfs_stamps", {})
+            )
 
-            files_to_copy = serv.get_required_files_local_paths()
+            slot_bytes_uploaded = 0
+            slot_bytes_saved = 0
+            slot_files = {}
+            link_commands = []
+            for local_path, remote_path in files_to_copy:
+                # an empty remote path means "use the local filename"
+                name = remote_path or os.path.basename(local_path)
+                content_hash = get_content_hash(local_path)
+                slot_files[name] = content_hash
+                deployed = self.is_deployed("sim_slots", slotno, name, content_hash)
+                if deployed and name not in rootfs_names:
+                    slot_bytes_saved += os.path.getsize(local_path)
+                    continue
+
+                stored_path, uploaded = self.upload_to_infrastructure_store(local_path)
+                if uploaded:
+                    slot_bytes_uploaded += os.path.getsize(local_path)
+                else:
+                    slot_bytes_saved += os.path.getsize(local_path)
+
+                slot_path = pjoin(remote_sim_dir, name)
+                link_commands.append(f"mkdir -p {os.path.dirname(slot_path)}")
+                if name in rootfs_names:
+                    if name.endswith(".qcow2") and not local_path.endswith(".qcow2"):
+                        # rootfs overlay (see FireSimServerNode.uses_rootfs_overlay):
+                        # writes go to the overlay, the stored rootfs is only read
+                        copy_command = f"qemu-img create -q -f qcow2 -F raw -b $(readlink -f {stored_path}) {slot_path}"
+                    else:
+                        copy_command = f"cp -f --reflink=auto {stored_path} {slot_path}"
+                    if deployed and name in deployed_stamps:
+                        # the simulation writes to its rootfs, so only reuse
+                        # the copy if nothing touched it since it was made
+                        copy_command = f"""{{ [ "$(stat -c '%s %y' {slot_path} 2>/dev/null)" = "{deployed_stamps[name]}" ] || {copy_command}; }}"""
+                    link_commands.append(copy_command)
+                else:
+                    link_commands.append(f"ln -f {stored_path} {slot_path}")
 
-            # Append required URI paths to the end of this list
-            hwcfg = serv.get_resolved_server_hardware_config()
-            files_to_copy.extend(hwcfg.get_local_uri_paths(uridir))
+            rootfs_stamps = {}
+            if rootfs_names:
+                rootfs_paths = " ".join(pjoin(remote_sim_dir, x) for x in rootfs_names)
+                link_commands.append(
+                    f"stat -c '{ROOTFS_STAMP_MARKER}|%n|%s %y' {rootfs_paths}"
+                )
+            if link_commands:
+                link_output = run(" && ".join(link_commands))
+                for line in link_output.splitlines():
+                    fields = line.strip().split("|")
+                    if len(fields) == 3 and fields[0] == ROOTFS_STAMP_MARKER:
+                        rootfs_stamps[os.path.basename(fields[1])] = fields[2]
+            self.record_deployed(
+                "sim_slots", slotno, slot_files, rootfs_stamps=rootfs_stamps
+            )
 
-            for local_path, remote_path in files_to_copy:
-                # -z --inplace
-                rsync_cap = rsync_project(
-                    local_dir=local_path,
-                    remote_dir=pjoin(remote_sim_rsync_dir, remote_path),
-                    ssh_opts="-o StrictHostKeyChecking=no",
-                    extra_opts="-L",
-                    capture=True,
+            with self.infrastructure_store_lock:
+                self.infrastructure_bytes_uploaded += slot_bytes_uploaded
+                self.infrastructure_bytes_saved += slot_bytes_saved
+            self.instance_logger(
+                f"Slot {slotno}: uploaded {human_readable_size(slot_bytes_uploaded)}, reused {human_readable_size(slot_bytes_saved)} already on host.",
+                debug=True,
+            )
+
+    def read_infrasetup_rootfs_stamps(self) -> Dict[str, Dict[str, str]]:
+        """Return the rootfs stamps (rootfs name to size and mtime) of each sim
+        slot recorded in the manifest of the last infrasetup, without removing
+        it from the host."""
+        if self.infrasetup_rootfs_stamps is None:
+            with hide("stdout"):
+                contents = run(
+                    f"cat {self.get_remote_manifest_path()} 2>/dev/null || true"
                 )
-                rootLogger.debug(rsync_cap)
-                rootLogger.debug(rsync_cap.stderr)
+            try:
+                sim_slots = json.loads(contents).get("sim_slots", {})
+            except json.JSONDecodeError:
+                sim_slots = {}
+            self.infrasetup_rootfs_stamps = {
+                slotno: slot.get("rootfs_stamps", {})
+                for slotno, slot in sim_slots.items()
+            }
+        return self.infrasetup_rootfs_stamps
+
+    def stage_job_in_sim_slot(
+        self, slotno: int, retired_files: List[str], fresh: bool
+    ) -> None:
+        """copy the files of the job assigned to the simulation in slotno (see
+        FireSimServerNode.get_job_files_local_paths) into its slot, through the
+        infrastructure store, and remove retired_files (those of the job that
+        ran in the slot before). The job gets a fresh copy of its rootfs, since
+        a rootfs of the same name in the slot may have been written to by an
+        earlier run of the job. Unless fresh is set, a rootfs that infrasetup
+        deployed and that nothing touched since is kept."""
+        serv = self.parent_node.sim_slots[slotno]
+        remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+        rootfs_name = serv.get_rootfs_name()
+        assert rootfs_name is None or not rootfs_name.endswith(
+            ".qcow2"
+        ), "queued jobs can not use qcow2 rootfses"
+
+        job_files = serv.get_job_files_local_paths()
+        names = [name for _, name in job_files]
+        commands = [f"cd {remote_sim_dir}"]
+        retired = [name for name in retired_files if name not in names]
+        if retired:
+            commands.append(f"rm -f {' '.join(retired)}")
+        for local_path, name in job_files:
+            stored_path, _ = self.upload_to_infrastructure_store(local_path)
+            if name == rootfs_name:
+                # the simulation writes to its rootfs, so it gets its own copy
+                copy_command = f"cp -f --reflink=auto {stored_path} {name}"
+                stamp = None
+                if not fresh:
+                    stamp = (
+                        self.read_infrasetup_rootfs_stamps()
+                        .get(str(slotno), {})
+                        .get(name)
+                    )
+                if stamp is not None:
+                    copy_command = f"""{{ [ "$(stat -c '%s %y' {name} 2>/dev/null)" = "{stamp}" ] || {copy_command}; }}"""
+                commands.append(copy_command)
+            else:
+                commands.append(f"ln -f {stored_path} {name}")
+        run(" && ".join(commands))
+
+    def prune_infrastructure_store(self) -> None:
+        """Remove files from the remote infrastructure store that are neither
+        linked into a slot nor needed by the current simulations."""
+        keep = " ".join(f"! -name {h}" for h in sorted(self.infrastructure_store_used))
+        run(
+            f"find {self.get_remote_infrastructure_store_dir()} -maxdepth 1 -type f -links 1 {keep} -delete"
+        )
+
+    def copy_sim_infrastructure(self, uridir: str) -> None:
+        """copy and extract the simulation infrastructure for every slot on
+        this host, several slots at a time."""
 
-            run(f"cp -r {remote_sim_rsync_dir}/* {remote_sim_dir}/", shell=True)
+        def setup_slot(slotno: int) -> None:
+            with self.timed_step(f"Copy slot {slotno}"):
+                self.copy_sim_slot_infrastructure(slotno, uridir)
+            serv = self.parent_node.sim_slots[slotno]
+            hwcfg = serv.get_resolved_server_hardware_config()
+            driver_tar = hwcfg.get_driver_tar_filename()
+            driver_tar_hash = self.manifest["sim_slots"][str(slotno)]["files"].get(
+                driver_tar
+            )
+            if driver_tar_hash is not None and self.is_deployed(
+                "sim_slots", slotno, driver_tar, driver_tar_hash
+            ):
+                self.instance_logger(
+                    f"Driver for slot {slotno} is unchanged, not extracting it again.",
+                    debug=True,
+                )
+                return
+            with self.timed_step(f"Extract driver for slot {slotno}"):
+                self.extract_driver_tarball(slotno)
+
+        self.run_for_each_slot(setup_slot)
+        self.prune_infrastructure_store()
+        self.instance_logger(
+            f"Uploaded {human_readable_size(self.infrastructure_bytes_uploaded)} of simulation infrastructure, saved {human_readable_size(self.infrastructure_bytes_saved)} by reusing files already on host."
+        )
 
     def extract_driver_tarball(self, slotno: int) -> None:
         """extract tarball that already exists on the remote node."""
@@ -229,8 +611,10 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
             options = "-xf"
 
-            with cd(remote_sim_dir):
-                run(f"tar {options} {hwcfg.get_driver_tar_filename()}")
+            # no cd() context here, this can run on several threads at once
+            run(
+                f"tar {options} {remote_sim_dir}{hwcfg.get_driver_tar_filename()} -C {remote_sim_dir}"
+            )
 
     def copy_switch_slot_infrastructure(self, switchslot: int) -> None:
         """copy all the switch infrastructure to the remote node."""
@@ -249,12 +633,19 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             assert switchslot < len(self.parent_node.switch_slots)
             switch = self.parent_node.switch_slots[switchslot]
             files_to_copy = switch.get_required_files_local_paths()
+            slot_files = {}
             for local_path, remote_path in files_to_copy:
+                name = pjoin(remote_path, os.path.basename(local_path))
+                content_hash = get_content_hash(local_path)
+                slot_files[name] = content_hash
+                if self.is_deployed("switch_slots", switchslot, name, content_hash):
+                    continue
                 put(
                     local_path,
                     pjoin(remote_switch_dir, remote_path),
                     mirror_local_mode=True,
                 )
+            self.record_deployed("switch_slots", switchslot, slot_files)
 
     def start_switch_slot(self, switchslot: int) -> None:
         """start a switch simulation."""
@@ -286,12 +677,19 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             assert pipeslot < len(self.parent_node.pipe_slots)
             pipe = self.parent_node.pipe_slots[pipeslot]
             files_to_copy = pipe.get_required_files_local_paths()
+            slot_files = {}
             for local_path, remote_path in files_to_copy:
+                name = pjoin(remote_path, os.path.basename(local_path))
+                content_hash = get_content_hash(local_path)
+                slot_files[name] = content_hash
+                if self.is_deployed("pipe_slots", pipeslot, name, content_hash):
+                    continue
                 put(
                     local_path,
                     pjoin(remote_pipe_dir, remote_path),
                     mirror_local_mode=True,
                 )
+            self.record_deployed("pipe_slots", pipeslot, slot_files)
 
     def start_pipe_slot(self, pipeslot: int) -> None:
         """start a pipe simulation."""
@@ -306,32 +704,49 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             with cd(remote_pipe_dir):
                 run(pipe.get_pipe_start_command(has_sudo()))
 
+    def get_sim_slot_extra_plusargs(self, slotno: int) -> Optional[str]:
+        """Return the platform-specific plusargs for the simulation in slot
+        slotno."""
+        return f"+slotid={slotno}"
+
     def start_sim_slot(self, slotno: int) -> None:
         """start a simulation."""
-        if self.instance_assigned_simulations():
+        self.start_sim_slots([slotno])
+
+    def start_sim_slots(self, slotnos: List[int]) -> None:
+        """start the simulations in slotnos. Their sim-run.sh scripts are sent
+        and run as a single batch, once the switches and pipes they connect to
+        on this host are ready (see runtools/sim_boot_batch.py)."""
+        if not self.instance_assigned_simulations():
+            return
+        shm_files = []
+        slot_scripts = []
+        for slotno in slotnos:
             self.instance_logger(
                 f"""Starting {self.sim_type_message} simulation for slot: {slotno}."""
             )
-            remote_home_dir = self.parent_node.sim_dir
-            remote_sim_dir = f"""{remote_home_dir}/sim_slot_{slotno}/"""
             assert slotno < len(
                 self.parent_node.sim_slots
             ), f"{slotno} can not index into sim_slots {len(self.parent_node.sim_slots)} on {self.parent_node.host}"
             server = self.parent_node.sim_slots[slotno]
-            rootLogger.info(
-                f"start_sim_slot slotno: {slotno} server_id {server.server_id_internal} remote_sim_dir {remote_sim_dir} {remote_home_dir}"
+            remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+            rootLogger.debug(
+                f"start_sim_slot slotno: {slotno} server_id {server.server_id_internal} remote_sim_dir {remote_sim_dir}"
             )
 
             # make the local job results dir for this sim slot
             server.mkdir_and_prep_local_job_results_dir()
             sim_start_script_local_path = server.write_sim_start_script(
-                slotno, f"+slotid={slotno}"
+                slotno, self.get_sim_slot_extra_plusargs(slotno)
             )
-            put(sim_start_script_local_path, remote_sim_dir)
+            with open(sim_start_script_local_path) as f:
+                slot_scripts.append((remote_sim_dir, f.read()))
+            shm_files += server.get_uplink_shm_files()
 
-            with cd(remote_sim_dir):
-                run("chmod +x sim-run.sh")
-                run("./sim-run.sh")
+        boot_script = build_sim_boot_script(shm_files, slot_scripts)
+        remote_boot_script = f"{self.parent_node.get_sim_dir()}/sim-boot.sh"
+        put(io.StringIO(boot_script), remote_boot_script)
+        run(f"bash {remote_boot_script}")
 
     def kill_switch_slot(self, switchslot: int) -> None:
         """kill the switch in slot switchslot."""
@@ -416,11 +831,10 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
         """Boot up all the sims on this host in screens."""
         if self.instance_assigned_simulations():
             # only on sim nodes
-            rootLogger.info(
+            rootLogger.debug(
                 f"start_simulations_instance {len(self.parent_node.sim_slots)}"
             )
-            for slotno in range(len(self.parent_node.sim_slots)):
-                self.start_sim_slot(slotno)
+            self.start_sim_slots(list(range(len(self.parent_node.sim_slots))))
 
     def kill_switches_instance(self) -> None:
         """Kill all the switches on this host."""
@@ -445,49 +859,61 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
             # disconnect all NBDs
             self.disconnect_all_nbds_instance()
 
-    def running_simulations(self) -> Dict[str, List[str]]:
-        """collect screen results from this host to see what's running on it."""
-        simdrivers = []
-        switches = []
-        pipes = []
+    def registered_processes(self) -> Dict[str, RegisteredProcess]:
+        """query this host's process registry for the state of everything the
+        manager started on it (see runtools/process_registry.py)."""
         with settings(warn_only=True), hide("everything"):
-            collect = run("screen -ls")
-            for line in collect.splitlines():
-                if "(Detached)" in line or "(Attached)" in line:
-                    line_stripped = line.strip()
-                    if "fsim" in line:
-                        re_search_results = re.search(
-                            "fsim([0-9][0-9]*)", line_stripped
-                        )
-                        assert re_search_results is not None
-                        line_stripped = re_search_results.group(0)
-                        line_stripped = line_stripped.replace("fsim", "")
-                        simdrivers.append(line_stripped)
-                    elif "switch" in line:
-                        re_search_results = re.search(
-                            "switch([0-9][0-9]*)", line_stripped
-                        )
-                        assert re_search_results is not None
-                        line_stripped = re_search_results.group(0)
-                        switches.append(line_stripped)
-                    elif "pipe" in line:
-                        re_search_results = re.search(
-                            "pipe([0-9][0-9]*)", line_stripped
-                        )
-                        assert re_search_results is not None
-                        line_stripped = re_search_results.group(0)
-                        pipes.append(line_stripped)
-        return {"switches": switches, "simdrivers": simdrivers, "pipes": pipes}
+            collect = run(registry_query_command(self.parent_node.get_sim_dir()))
+        return parse_registry_query(collect)
+
+    def running_simulations(
+        self, processes: Optional[Dict[str, RegisteredProcess]] = None
+    ) -> Dict[str, List[str]]:
+        """collect what's running on this host from its process registry (or
+        from processes, if already queried)."""
+        if processes is None:
+            processes = self.registered_processes()
+        running = [name for name, p in processes.items() if p.is_running()]
+        return {
+            "switches": [name for name in running if name.startswith("switch")],
+            "simdrivers": [
+                name[len("fsim") :] for name in running if name.startswith("fsim")
+            ],
+            "pipes": [name for name in running if name.startswith("pipe")],
+        }
+
+    def wait_for_processes_to_exit(self) -> None:
+        """poll this host's process registry until none of the simulations,
+        switches and pipes the manager started on it are running."""
+        while True:
+            running = [
+                name
+                for name, process in self.registered_processes().items()
+                if process.is_running()
+            ]
+            if not running:
+                return
+            self.instance_logger(f"Waiting for {running} to exit.", debug=True)
+            time.sleep(1)
 
     def monitor_jobs_instance(
         self,
         prior_completed_jobs: List[str],
+        reported_completed_jobs: List[str],
         is_final_loop: bool,
         is_networked: bool,
         terminateoncompletion: bool,
         job_results_dir: str,
+        copy_back_results: bool = True,
+        copy_back_compress: bool = True,
     ) -> Dict[str, Dict[str, bool]]:
-        """Job monitoring for this host."""
+        """Job monitoring for this host.
+
+        If copy_back_results is not set, the results of completed jobs are
+        left for the caller to copy back (see runtools.copy_back), and the
+        host is only terminated once they have been. Jobs in
+        reported_completed_jobs were already seen completed by an earlier
+        poll, so they aren't logged as completed again."""
         self.instance_logger(
             f"Final loop?: {is_final_loop} Is networked?: {is_networked} Terminateoncomplete: {terminateoncompletion}",
             debug=True,
@@ -527,17 +953,14 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
                 return {"switches": {}, "sims": {}, "pipes": {}}
             else:
                 # get the status of the switch sims
-                switchescompleteddict = {
-                    k: False for k in self.running_simulations()["switches"]
-                }
+                instance_status = self.running_simulations()
+                switchescompleteddict = {k: False for k in instance_status["switches"]}
                 for switchsim in self.parent_node.switch_slots:
                     swname = switchsim.switch_builder.switch_binary_name()
                     if swname not in switchescompleteddict.keys():
                         switchescompleteddict[swname] = True
 
-                pipescompleteddict = {
-                    k: False for k in self.running_simulations()["pipes"]
-                }
+                pipescompleteddict = {k: False for k in instance_status["pipes"]}
                 for pipesim in self.parent_node.pipe_slots:
                     pipename = pipesim.pipe_builder.pipe_binary_name()
                     if pipename not in pipescompleteddict.keys():
@@ -576,7 +999,8 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
                 return {"sims": jobnames_to_completed, "switches": {}, "pipes": {}}
 
             # at this point, all jobs are NOT completed. so, see how they're doing now:
-            instance_screen_status = self.running_simulations()
+            processes = self.registered_processes()
+            instance_screen_status = self.running_simulations(processes)
 
             switchescompleteddict = {
                 k: False for k in instance_screen_status["switches"]
@@ -612,11 +1036,27 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
                 if (str(slotno) not in slotsrunning) and (
                     jobname not in completed_jobs
                 ):
-                    self.instance_logger(f"Slot {slotno}, Job {jobname} completed!")
+                    # a job that an earlier poll saw completed may still be
+                    # waiting for its results to be copied back
+                    newly_completed = jobname not in reported_completed_jobs
+                    if newly_completed:
+                        self.instance_logger(f"Slot {slotno}, Job {jobname} completed!")
+                    process = processes.get(f"fsim{slotno}")
+                    if newly_completed and process is not None:
+                        self.instance_logger(
+                            f"Slot {slotno}, Job {jobname} {process.summary()}."
+                        )
+                        if process.exit_code != 0:
+                            rootLogger.warning(
+                                f"[{env.host_string}] Slot {slotno}, Job {jobname} did not exit cleanly: {process.summary()}."
+                            )
                     completed_jobs.append(jobname)
 
-                    # this writes the job monitoring file
-                    sim_slots[slotno].copy_back_job_results_from_run(slotno)
+                    if copy_back_results:
+                        # this writes the job monitoring file
+                        sim_slots[slotno].copy_back_job_results_from_run(
+                            slotno, copy_back_compress
+                        )
 
             jobs_complete_dict = {job: job in completed_jobs for job in jobnames}
             now_all_jobs_complete = all(jobs_complete_dict.values())
@@ -651,7 +1091,10 @@ class InstanceDeployManager(metaclass=abc.ABCMeta):
                     for counter, pipe_slot in enumerate(self.parent_node.pipe_slots):
                         pipe_slot.copy_back_pipelog_from_run(job_results_dir, counter)
 
-                do_terminate()
+                # otherwise, the host is terminated by a later call, once all
+                # job results are copied back (i.e. all_jobs_completed above)
+                if copy_back_results:
+                    do_terminate()
 
             return {
                 "switches": switchescompleteddict,
@@ -670,6 +1113,7 @@ def remote_kmsg(message: str) -> None:
     run(commd, shell=True)
 
 
+@traced_deploy_methods
 class EC2InstanceDeployManager(InstanceDeployManager):
     """This class manages actually deploying/running stuff based on the
     definition of an instance and the simulations/switches assigned to it.
@@ -751,85 +1195,67 @@ class EC2InstanceDeployManager(InstanceDeployManager):
             # self.instance_logger("Waiting 10 seconds after removing kernel modules (esp. xocl).")
             # time.sleep(10)
 
+    def get_slot_to_agfi(self) -> Dict[int, str]:
+        """Return the agfi to load into each FPGA slot on this host."""
+        slot_to_agfi = {
+            slotno: firesimservernode.get_agfi()
+            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots)
+        }
+        # We only do this because XDMA hangs if some of the FPGAs on the instance
+        # are left in the cleared state. So, if you're only using some of the
+        # FPGAs on an instance, we flash the rest with one of your images
+        # anyway. Since the only interaction we have with an FPGA right now
+        # is over PCIe where the software component is mastering, this can't
+        # break anything.
+        dummyagfi = slot_to_agfi[len(slot_to_agfi) - 1]
+        for slotno in range(
+            len(self.parent_node.sim_slots), self.parent_node.MAX_SIM_SLOTS_ALLOWED
+        ):
+            slot_to_agfi[slotno] = dummyagfi
+        return slot_to_agfi
+
+    def run_fpga_slot_ops(self, clear: bool, flash: bool) -> None:
+        """Clear and/or flash all FPGA slots on this host with a single remote
+        script that handles every slot concurrently."""
+        num_slots = self.parent_node.MAX_SIM_SLOTS_ALLOWED
+        slot_to_agfi = self.get_slot_to_agfi() if flash else {}
+        for slotno, agfi in slot_to_agfi.items():
+            self.instance_logger(
+                f"Flashing FPGA Slot: {slotno} with agfi: {agfi}.", debug=True
+            )
+
+        expected_ops: Dict[int, List[str]] = {}
+        for slotno in range(num_slots):
+            ops = (["clear"] if clear else []) + (
+                ["load"] if slotno in slot_to_agfi else []
+            )
+            if ops:
+                expected_ops[slotno] = ops
+
+        results = run(
+            build_f2_slots_command(
+                num_slots, clear, slot_to_agfi, skip_loaded=not self.force_flash
+            )
+        )
+        check_slot_results(env.host_string, parse_slot_results(results), expected_ops)
+
     def clear_fpgas(self) -> None:
         if self.instance_assigned_simulations():
             # we always clear ALL fpga slots
-            for slotno in range(self.parent_node.MAX_SIM_SLOTS_ALLOWED):
-                self.instance_logger("""Clearing FPGA Slot {}.""".format(slotno))
-                remote_kmsg("""about_to_clear_fpga{}""".format(slotno))
-                run("""sudo fpga-clear-local-image -S {} -A""".format(slotno))
-                remote_kmsg("""done_clearing_fpga{}""".format(slotno))
-
-            for slotno in range(self.parent_node.MAX_SIM_SLOTS_ALLOWED):
-                self.instance_logger(
-                    """Checking for Cleared FPGA Slot {}.""".format(slotno)
-                )
-                remote_kmsg("""about_to_check_clear_fpga{}""".format(slotno))
-                run(
-                    """until sudo fpga-describe-local-image -S {} -R -H | grep -q "cleared"; do  sleep 1;  done""".format(
-                        slotno
-                    )
-                )
-                remote_kmsg("""done_checking_clear_fpga{}""".format(slotno))
+            self.instance_logger("Clearing all FPGA Slots.")
+            self.run_fpga_slot_ops(clear=True, flash=False)
 
     def flash_fpgas(self) -> None:
         if self.instance_assigned_simulations():
-            dummyagfi = None
-            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots):
-                agfi = firesimservernode.get_agfi()
-                dummyagfi = agfi
-                self.instance_logger(
-                    """Flashing FPGA Slot: {} with agfi: {}.""".format(slotno, agfi)
-                )
-                run(
-                    """sudo fpga-load-local-image -S {} -I {} -A""".format(slotno, agfi)
-                )
+            self.instance_logger("Flashing all FPGA Slots.")
+            self.run_fpga_slot_ops(clear=False, flash=True)
 
-            # We only do this because XDMA hangs if some of the FPGAs on the instance
-            # are left in the cleared state. So, if you're only using some of the
-            # FPGAs on an instance, we flash the rest with one of your images
-            # anyway. Since the only interaction we have with an FPGA right now
-            # is over PCIe where the software component is mastering, this can't
-            # break anything.
-            for slotno in range(
-                len(self.parent_node.sim_slots), self.parent_node.MAX_SIM_SLOTS_ALLOWED
-            ):
-                self.instance_logger(
-                    """Flashing FPGA Slot: {} with dummy agfi: {}.""".format(
-                        slotno, dummyagfi
-                    )
-                )
-                run(
-                    """sudo fpga-load-local-image -S {} -I {} -A""".format(
-                        slotno, dummyagfi
-                    )
-                )
-
-            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots):
-                self.instance_logger(
-                    """Checking for Flashed FPGA Slot: {} with agfi: {}.""".format(
-                        slotno, agfi
-                    )
-                )
-                run(
-                    """until sudo fpga-describe-local-image -S {} -R -H | grep -q "loaded"; do  sleep 1;  done""".format(
-                        slotno
-                    )
-                )
-
-            for slotno in range(
-                len(self.parent_node.sim_slots), self.parent_node.MAX_SIM_SLOTS_ALLOWED
-            ):
-                self.instance_logger(
-                    """Checking for Flashed FPGA Slot: {} with agfi: {}.""".format(
-                        slotno, dummyagfi
-                    )
-                )
-                run(
-                    """until sudo fpga-describe-local-image -S {} -R -H | grep -q "loaded"; do  sleep 1;  done""".format(
-                        slotno
-                    )
-                )
+    def clear_and_flash_fpgas(self) -> None:
+        """Clear and then flash every FPGA slot, with all slots in flight at
+        once."""
+        if self.instance_assigned_simulations():
+            self.instance_logger("Clearing and flashing all FPGA Slots.")
+            self.run_fpga_slot_ops(clear=True, flash=True)
 
     def load_xdma(self) -> None:
         """load the xdma kernel module."""
@@ -873,45 +1299,52 @@ class EC2InstanceDeployManager(InstanceDeployManager):
         if self.instance_assigned_simulations():
             # This is a sim-host node.
 
+            # setup nbd/qcow infra before copying the sim infrastructure,
+            # which makes rootfs overlays with qemu-img
+            with self.timed_step("Setup NBD/qcow2"):
+                self.sim_node_qcow()
+                # load nbd module
+                self.load_nbd_module()
+
             # copy sim infrastructure
-            for slotno in range(len(self.parent_node.sim_slots)):
-                self.copy_sim_slot_infrastructure(slotno, uridir)
-                self.extract_driver_tarball(slotno)
+            with self.timed_step("Copy simulation infrastructure"):
+                self.copy_sim_infrastructure(uridir)
 
             if not metasim_enabled:
-                self.get_and_install_aws_fpga_sdk()
+                with self.timed_step("Install AWS FPGA SDK"):
+                    self.get_and_install_aws_fpga_sdk()
                 # unload any existing edma/xdma/xocl
-                self.unload_xrt_and_xocl()
+                with self.timed_step("Unload XRT/XOCL"):
+                    self.unload_xrt_and_xocl()
                 # # copy xdma driver # rh: commenting out for now to prevent loading of xdma.
                 # self.fpga_node_xdma()
                 # # load xdma
                 # self.load_xdma()
 
-            # setup nbd/qcow infra
-            self.sim_node_qcow()
-            # load nbd module
-            self.load_nbd_module()
-
             if not metasim_enabled:
                 # clear/flash fpgas
-                self.clear_fpgas()
-                self.flash_fpgas()
+                with self.timed_step("Clear/flash FPGAs"):
+                    self.clear_and_flash_fpgas()
 
                 # # re-load XDMA # rh: commenting out for now to prevent loading of xdma.
                 # self.load_xdma()
 
                 # restart (or start form scratch) ila server
-                self.kill_ila_server()
-                self.start_ila_server()
+                with self.timed_step("Restart ILA server"):
+                    self.kill_ila_server()
+                    self.start_ila_server()
 
-        if self.instance_assigned_switches():
-            # all nodes could have a switch
-            for slotno in range(len(self.parent_node.switch_slots)):
-                self.copy_switch_slot_infrastructure(slotno)
+        with self.timed_step("Copy switch/pipe infrastructure"):
+            if self.instance_assigned_switches():
+                # all nodes could have a switch
+                for slotno in range(len(self.parent_node.switch_slots)):
+                    self.copy_switch_slot_infrastructure(slotno)
 
-        if self.instance_assigned_pipes():
-            for slotno in range(len(self.parent_node.pipe_slots)):
-                self.copy_pipe_slot_infrastructure(slotno)
+            if self.instance_assigned_pipes():
+                for slotno in range(len(self.parent_node.pipe_slots)):
+                    self.copy_pipe_slot_infrastructure(slotno)
+
+        self.log_step_timings()
 
     def enumerate_fpgas(self, uridir: str) -> None:
         """FPGAs are enumerated already with F2"""
@@ -922,6 +1355,7 @@ class EC2InstanceDeployManager(InstanceDeployManager):
         self.parent_node.terminate_self()
 
 
+@traced_deploy_methods
 class VitisInstanceDeployManager(InstanceDeployManager):
     """This class manages a Vitis-enabled instance"""
 
@@ -964,19 +1398,20 @@ class VitisInstanceDeployManager(InstanceDeployManager):
     def copy_bitstreams(self) -> None:
         if self.instance_assigned_simulations():
             self.instance_logger("""Copy bitstreams to flash.""")
+            self.run_for_each_slot(self.copy_slot_bitstream)
 
-            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots):
-                serv = firesimservernode
-                hwcfg = serv.get_resolved_server_hardware_config()
+    def copy_slot_bitstream(self, slotno: int) -> None:
+        """unpack the bitstream for a single sim slot."""
+        serv = self.parent_node.sim_slots[slotno]
+        hwcfg = serv.get_resolved_server_hardware_config()
 
-                bitstream_tar = hwcfg.get_bitstream_tar_filename()
-                remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
-                bitstream_tar_unpack_dir = f"{remote_sim_dir}/{self.PLATFORM_NAME}"
-                bit = f"{remote_sim_dir}/{self.PLATFORM_NAME}/firesim.xclbin"
+        bitstream_tar = hwcfg.get_bitstream_tar_filename()
+        remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+        bitstream_tar_unpack_dir = f"{remote_sim_dir}/{self.PLATFORM_NAME}"
 
-                # at this point the tar file is in the sim slot
-                run(f"rm -rf {bitstream_tar_unpack_dir}")
-                run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
+        # at this point the tar file is in the sim slot
+        run(f"rm -rf {bitstream_tar_unpack_dir}")
+        run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
 
     def infrasetup_instance(self, uridir: str) -> None:
         """Handle infrastructure setup for this platform."""
@@ -984,56 +1419,36 @@ class VitisInstanceDeployManager(InstanceDeployManager):
             # This is a sim-host node.
 
             # copy sim infrastructure
-            for slotno in range(len(self.parent_node.sim_slots)):
-                self.copy_sim_slot_infrastructure(slotno, uridir)
-                self.extract_driver_tarball(slotno)
+            with self.timed_step("Copy simulation infrastructure"):
+                self.copy_sim_infrastructure(uridir)
 
             if not self.parent_node.metasimulation_enabled:
                 # clear/flash fpgas
-                self.clear_fpgas()
+                with self.timed_step("Clear FPGAs"):
+                    self.clear_fpgas()
                 # copy bitstreams to use in run
-                self.copy_bitstreams()
+                with self.timed_step("Copy bitstreams"):
+                    self.copy_bitstreams()
 
-        if self.instance_assigned_switches():
-            # all nodes could have a switch
-            for slotno in range(len(self.parent_node.switch_slots)):
-                self.copy_switch_slot_infrastructure(slotno)
-
-        if self.instance_assigned_pipes():
-            for slotno in range(len(self.parent_node.pipe_slots)):
-                self.copy_pipe_slot_infrastructure(slotno)
-
-    def start_sim_slot(self, slotno: int) -> None:
-        """start a simulation. (same as default except that you pass in the bitstream file)"""
-        if self.instance_assigned_simulations():
-            self.instance_logger(
-                f"""Starting {self.sim_type_message} simulation for slot: {slotno}."""
-            )
-            remote_home_dir = self.parent_node.sim_dir
-            remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
-            assert slotno < len(
-                self.parent_node.sim_slots
-            ), f"{slotno} can not index into sim_slots {len(self.parent_node.sim_slots)} on {self.parent_node.host}"
-            server = self.parent_node.sim_slots[slotno]
-            hwcfg = server.get_resolved_server_hardware_config()
-
-            bit = f"{remote_sim_dir}/{self.PLATFORM_NAME}/firesim.xclbin"
+        with self.timed_step("Copy switch/pipe infrastructure"):
+            if self.instance_assigned_switches():
+                # all nodes could have a switch
+                for slotno in range(len(self.parent_node.switch_slots)):
+                    self.copy_switch_slot_infrastructure(slotno)
 
-            if not self.parent_node.metasimulation_enabled:
-                extra_args = f"+slotid={slotno} +binary_file={bit}"
-            else:
-                extra_args = None
+            if self.instance_assigned_pipes():
+                for slotno in range(len(self.parent_node.pipe_slots)):
+                    self.copy_pipe_slot_infrastructure(slotno)
 
-            # make the local job results dir for this sim slot
-            server.mkdir_and_prep_local_job_results_dir()
-            sim_start_script_local_path = server.write_sim_start_script(
-                slotno, extra_args
-            )
-            put(sim_start_script_local_path, remote_sim_dir)
+        self.log_step_timings()
 
-            with cd(remote_sim_dir):
-                run("chmod +x sim-run.sh")
-                run("./sim-run.sh")
+    def get_sim_slot_extra_plusargs(self, slotno: int) -> Optional[str]:
+        """pass in the bitstream file (instead of just the slot id)"""
+        if self.parent_node.metasimulation_enabled:
+            return None
+        remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+        bit = f"{remote_sim_dir}/{self.PLATFORM_NAME}/firesim.xclbin"
+        return f"+slotid={slotno} +binary_file={bit}"
 
     def enumerate_fpgas(self, uridir: str) -> None:
         """FPGAs are enumerated already with Vitis"""
@@ -1044,6 +1459,7 @@ class VitisInstanceDeployManager(InstanceDeployManager):
         return
 
 
+@traced_deploy_methods
 class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
     """This class manages a Xilinx Alveo-enabled instance"""
 
@@ -1094,48 +1510,51 @@ class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
     def flash_fpgas(self) -> None:
         if self.instance_assigned_simulations():
             self.instance_logger("""Flash all FPGA Slots.""")
+            self.run_for_each_slot(self.flash_fpga_slot)
 
-            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots):
-                serv = firesimservernode
-                hwcfg = serv.get_resolved_server_hardware_config()
+    def flash_fpga_slot(self, slotno: int) -> None:
+        """unpack the bitstream for a single sim slot and flash it. everything
+        but the flash itself can overlap with other slots."""
+        serv = self.parent_node.sim_slots[slotno]
+        hwcfg = serv.get_resolved_server_hardware_config()
 
-                bitstream_tar = hwcfg.get_bitstream_tar_filename()
-                remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
-                bitstream_tar_unpack_dir = os.path.join(
-                    remote_sim_dir, str(self.PLATFORM_NAME)
-                )
-                bit = os.path.join(bitstream_tar_unpack_dir, "firesim.bit")
-
-                # at this point the tar file is in the sim slot
-                run(f"rm -rf {bitstream_tar_unpack_dir}")
-                run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
-
-                self.instance_logger(f"""Copying FPGA flashing scripts for {slotno}""")
-                rsync_cap = rsync_project(
-                    local_dir=f"../platforms/{self.PLATFORM_NAME}/scripts",
-                    remote_dir=remote_sim_dir,
-                    ssh_opts="-o StrictHostKeyChecking=no",
-                    extra_opts="-L -p",
-                    capture=True,
-                )
-                rootLogger.debug(rsync_cap)
-                rootLogger.debug(rsync_cap.stderr)
+        bitstream_tar = hwcfg.get_bitstream_tar_filename()
+        remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+        bitstream_tar_unpack_dir = os.path.join(remote_sim_dir, str(self.PLATFORM_NAME))
+        bit = os.path.join(bitstream_tar_unpack_dir, "firesim.bit")
 
-                json_db = self.parent_node.get_fpga_db()
-                bdf = self.slot_to_bdf(slotno, json_db)
+        # at this point the tar file is in the sim slot
+        run(f"rm -rf {bitstream_tar_unpack_dir}")
+        run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
 
-                self.instance_logger(
-                    f"""Flashing FPGA Slot: {slotno} ({bdf}) with bitstream: {bit}"""
-                )
-                # Use a system wide installed firesim-fpga-util.py
-                cmd = f"{script_path}/firesim-fpga-util.py"
-                check_script(
-                    cmd,
-                    Path(
-                        f"{get_deploy_dir()}/../platforms/{self.PLATFORM_NAME}/scripts"
-                    ),
-                )
-                run(f"""{cmd} --bitstream {bit} --bdf {bdf} --fpga-db {json_db}""")
+        self.instance_logger(f"""Copying FPGA flashing scripts for {slotno}""")
+        rsync_cap = rsync_project(
+            local_dir=f"../platforms/{self.PLATFORM_NAME}/scripts",
+            remote_dir=remote_sim_dir,
+            ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
+            extra_opts="-L -p",
+            capture=True,
+        )
+        rootLogger.debug(rsync_cap)
+        rootLogger.debug(rsync_cap.stderr)
+
+        json_db = self.parent_node.get_fpga_db()
+        bdf = self.slot_to_bdf(slotno, json_db)
+
+        # Use a system wide installed firesim-fpga-util.py
+        cmd = f"{script_path}/firesim-fpga-util.py"
+        check_script(
+            cmd,
+            Path(f"{get_deploy_dir()}/../platforms/{self.PLATFORM_NAME}/scripts"),
+        )
+        with self.fpga_program_lock:
+            self.instance_logger(
+                f"""Flashing FPGA Slot: {slotno} ({bdf}) with bitstream: {bit}"""
+            )
+            skip_if_loaded = "" if self.force_flash else " --skip-if-loaded"
+            run(
+                f"""{cmd} --bitstream {bit} --bdf {bdf} --fpga-db {json_db}{skip_if_loaded}"""
+            )
 
     def change_pcie_perms(self) -> None:
         if self.instance_assigned_simulations():
@@ -1179,28 +1598,34 @@ class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
             # This is a sim-host node.
 
             # copy sim infrastructure
-            for slotno in range(len(self.parent_node.sim_slots)):
-                self.copy_sim_slot_infrastructure(slotno, uridir)
-                self.extract_driver_tarball(slotno)
+            with self.timed_step("Copy simulation infrastructure"):
+                self.copy_sim_infrastructure(uridir)
 
             if not metasim_enabled:
                 # unload xdma driver
-                self.unload_xdma()
+                with self.timed_step("Unload XDMA"):
+                    self.unload_xdma()
                 # flash fpgas
-                self.flash_fpgas()
+                with self.timed_step("Flash FPGAs"):
+                    self.flash_fpgas()
                 # load xdma driver
-                self.load_xdma()
+                with self.timed_step("Load XDMA"):
+                    self.load_xdma()
                 # change pcie permissions
-                self.change_pcie_perms()
+                with self.timed_step("Change PCIe permissions"):
+                    self.change_pcie_perms()
 
-        if self.instance_assigned_switches():
-            # all nodes could have a switch
-            for slotno in range(len(self.parent_node.switch_slots)):
-                self.copy_switch_slot_infrastructure(slotno)
+        with self.timed_step("Copy switch/pipe infrastructure"):
+            if self.instance_assigned_switches():
+                # all nodes could have a switch
+                for slotno in range(len(self.parent_node.switch_slots)):
+                    self.copy_switch_slot_infrastructure(slotno)
 
-        if self.instance_assigned_pipes():
-            for slotno in range(len(self.parent_node.pipe_slots)):
-                self.copy_pipe_slot_infrastructure(slotno)
+            if self.instance_assigned_pipes():
+                for slotno in range(len(self.parent_node.pipe_slots)):
+                    self.copy_pipe_slot_infrastructure(slotno)
+
+        self.log_step_timings()
 
     def create_fpga_database(self, uridir: str) -> None:
         self.instance_logger(f"""Creating FPGA database""")
@@ -1225,7 +1650,7 @@ class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
             rsync_cap = rsync_project(
                 local_dir=local_path,
                 remote_dir=pjoin(remote_sim_rsync_dir, remote_path),
-                ssh_opts="-o StrictHostKeyChecking=no",
+                ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
                 extra_opts="-L",
                 capture=True,
             )
@@ -1237,7 +1662,7 @@ class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
         rsync_cap = rsync_project(
             local_dir=f"../platforms/{self.PLATFORM_NAME}/scripts",
             remote_dir=remote_sim_dir + "/",
-            ssh_opts="-o StrictHostKeyChecking=no",
+            ssh_opts=ssh_connection_pool.rsync_ssh_opts(),
             extra_opts="-L -p",
             capture=True,
         )
@@ -1290,65 +1715,47 @@ class XilinxAlveoInstanceDeployManager(InstanceDeployManager):
         """XilinxAlveoInstanceDeployManager machines cannot be terminated."""
         return
 
-    def start_sim_slot(self, slotno: int) -> None:
-        """start a simulation. (same as the default except that you have a mapping from slotno to a specific BDF)"""
-        if self.instance_assigned_simulations():
-            self.instance_logger(
-                f"""Starting {self.sim_type_message} simulation for slot: {slotno}."""
-            )
-            remote_home_dir = self.parent_node.sim_dir
-            remote_sim_dir = f"""{remote_home_dir}/sim_slot_{slotno}/"""
-            assert slotno < len(
-                self.parent_node.sim_slots
-            ), f"{slotno} can not index into sim_slots {len(self.parent_node.sim_slots)} on {self.parent_node.host}"
-            server = self.parent_node.sim_slots[slotno]
-
-            if not self.parent_node.metasimulation_enabled:
-                bdf = (
-                    self.slot_to_bdf(slotno, self.parent_node.get_fpga_db())
-                    .replace(".", ":")
-                    .split(":")
-                )
-                extra_args = f"+domain=0x0000 +bus=0x{bdf[0]} +device=0x{bdf[1]} +function=0x{bdf[2]} +bar=0x0 +pci-vendor=0x10ee +pci-device=0x903f"
-            else:
-                extra_args = None
-
-            # make the local job results dir for this sim slot
-            server.mkdir_and_prep_local_job_results_dir()
-            sim_start_script_local_path = server.write_sim_start_script(
-                slotno, extra_args
-            )
-            put(sim_start_script_local_path, remote_sim_dir)
-
-            with cd(remote_sim_dir):
-                run("chmod +x sim-run.sh")
-                run("./sim-run.sh")
+    def get_sim_slot_extra_plusargs(self, slotno: int) -> Optional[str]:
+        """pass in the BDF the slot maps to (instead of the slot id)"""
+        if self.parent_node.metasimulation_enabled:
+            return None
+        bdf = (
+            self.slot_to_bdf(slotno, self.parent_node.get_fpga_db())
+            .replace(".", ":")
+            .split(":")
+        )
+        return f"+domain=0x0000 +bus=0x{bdf[0]} +device=0x{bdf[1]} +function=0x{bdf[2]} +bar=0x0 +pci-vendor=0x10ee +pci-device=0x903f"
 
 
+@traced_deploy_methods
 class XilinxAlveoU250InstanceDeployManager(XilinxAlveoInstanceDeployManager):
     def __init__(self, parent_node: Inst) -> None:
         super().__init__(parent_node)
         self.PLATFORM_NAME = "xilinx_alveo_u250"
 
 
+@traced_deploy_methods
 class XilinxAlveoU280InstanceDeployManager(XilinxAlveoInstanceDeployManager):
     def __init__(self, parent_node: Inst) -> None:
         super().__init__(parent_node)
         self.PLATFORM_NAME = "xilinx_alveo_u280"
 
 
+@traced_deploy_methods
 class XilinxAlveoU200InstanceDeployManager(XilinxAlveoInstanceDeployManager):
     def __init__(self, parent_node: Inst) -> None:
         super().__init__(parent_node)
         self.PLATFORM_NAME = "xilinx_alveo_u200"
 
 
+@traced_deploy_methods
 class RHSResearchNitefuryIIInstanceDeployManager(XilinxAlveoInstanceDeployManager):
     def __init__(self, parent_node: Inst) -> None:
         super().__init__(parent_node)
         self.PLATFORM_NAME = "rhsresearch_nitefury_ii"
 
 
+@traced_deploy_methods
 class XilinxVCU118InstanceDeployManager(InstanceDeployManager):
     """This class manages a Xilinx VCU118-enabled instance using the
     garnet shell."""
@@ -1390,42 +1797,46 @@ class XilinxVCU118InstanceDeployManager(InstanceDeployManager):
     def flash_fpgas(self) -> None:
         if self.instance_assigned_simulations():
             self.instance_logger("""Flash all FPGA Slots.""")
+            self.run_for_each_slot(self.flash_fpga_slot)
 
-            for slotno, firesimservernode in enumerate(self.parent_node.sim_slots):
-                serv = self.parent_node.sim_slots[slotno]
-                hwcfg = serv.get_resolved_server_hardware_config()
+    def flash_fpga_slot(self, slotno: int) -> None:
+        """unpack the bitstream for a single sim slot and flash it. everything
+        but the flash itself can overlap with other slots."""
+        serv = self.parent_node.sim_slots[slotno]
+        hwcfg = serv.get_resolved_server_hardware_config()
 
-                bitstream_tar = hwcfg.get_bitstream_tar_filename()
-                remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
-                bitstream_tar_unpack_dir = f"{remote_sim_dir}/{self.PLATFORM_NAME}"
-                bit = f"{remote_sim_dir}/{self.PLATFORM_NAME}/firesim.bit"
+        bitstream_tar = hwcfg.get_bitstream_tar_filename()
+        remote_sim_dir = self.get_remote_sim_dir_for_slot(slotno)
+        bitstream_tar_unpack_dir = f"{remote_sim_dir}/{self.PLATFORM_NAME}"
+        bit = f"{remote_sim_dir}/{self.PLATFORM_NAME}/firesim.bit"
 
-                # at this point the tar file is in the sim slot
-                run(f"rm -rf {bitstream_tar_unpack_dir}")
-                run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
+        # at this point the tar file is in the sim slot
+        run(f"rm -rf {bitstream_tar_unpack_dir}")
+        run(f"tar xvf {remote_sim_dir}/{bitstream_tar} -C {remote_sim_dir}")
 
-                self.instance_logger(f"""Determine BDF for {slotno}""")
-                collect = run("lspci | grep -i xilinx")
+        self.instance_logger(f"""Determine BDF for {slotno}""")
+        collect = run("lspci | grep -i xilinx")
 
-                # TODO: is "Partial Reconfig Clear File" useful (see xvsecctl help)?
-                bdfs = [
-                    # capno is hardcoded to 0x1 otherwise xvsecctl program fails
-                    {"busno": "0x" + i[:2], "devno": "0x" + i[3:5], "capno": "0x1"}
-                    for i in collect.splitlines()
-                    if len(i.strip()) >= 0
-                ]
-                bdf = bdfs[slotno]
+        # TODO: is "Partial Reconfig Clear File" useful (see xvsecctl help)?
+        bdfs = [
+            # capno is hardcoded to 0x1 otherwise xvsecctl program fails
+            {"busno": "0x" + i[:2], "devno": "0x" + i[3:5], "capno": "0x1"}
+            for i in collect.splitlines()
+            if len(i.strip()) >= 0
+        ]
+        bdf = bdfs[slotno]
 
-                busno = bdf["busno"]
-                devno = bdf["devno"]
-                capno = bdf["capno"]
+        busno = bdf["busno"]
+        devno = bdf["devno"]
+        capno = bdf["capno"]
 
-                self.instance_logger(
-                    f"""Flashing FPGA Slot: {slotno} (bus:{busno}, dev:{devno}, cap:{capno}) with bit: {bit}"""
-                )
-                cmd = f"{script_path}/firesim-xvsecctl-flash-fpga"
-                check_script(cmd)
-                run(f"""sudo {cmd} {busno} {devno} {capno} {bit}""")
+        cmd = f"{script_path}/firesim-xvsecctl-flash-fpga"
+        check_script(cmd)
+        with self.fpga_program_lock:
+            self.instance_logger(
+                f"""Flashing FPGA Slot: {slotno} (bus:{busno}, dev:{devno}, cap:{capno}) with bit: {bit}"""
+            )
+            run(f"""sudo {cmd} {busno} {devno} {capno} {bit}""")
 
     def change_pcie_perms(self) -> None:
         if self.instance_assigned_simulations():
@@ -1461,28 +1872,33 @@ class XilinxVCU118InstanceDeployManager(InstanceDeployManager):
             # This is a sim-host node.
 
             # copy sim infrastructure
-            for slotno in range(len(self.parent_node.sim_slots)):
-                self.copy_sim_slot_infrastructure(slotno, uridir)
-                self.extract_driver_tarball(slotno)
+            with self.timed_step("Copy simulation infrastructure"):
+                self.copy_sim_infrastructure(uridir)
 
             if not self.parent_node.metasimulation_enabled:
                 # load xdma driver
-                self.load_xdma()
-                self.load_xvsec()
+                with self.timed_step("Load XDMA/XVSEC"):
+                    self.load_xdma()
+                    self.load_xvsec()
                 # flash fpgas
-                self.flash_fpgas()
+                with self.timed_step("Flash FPGAs"):
+                    self.flash_fpgas()
                 # change pcie permissions
-                self.change_pcie_perms()
+                with self.timed_step("Change PCIe permissions"):
+                    self.change_pcie_perms()
 
-        if self.instance_assigned_switches():
-            # all nodes could have a switch
-            for slotno in range(len(self.parent_node.switch_slots)):
-                self.copy_switch_slot_infrastructure(slotno)
+        with self.timed_step("Copy switch/pipe infrastructure"):
+            if self.instance_assigned_switches():
+                # all nodes could have a switch
+                for slotno in range(len(self.parent_node.switch_slots)):
+                    self.copy_switch_slot_infrastructure(slotno)
 
-        if self.instance_assigned_pipes():
-            # all nodes could have a switch
-            for slotno in range(len(self.parent_node.pipe_slots)):
-                self.copy_pipe_slot_infrastructure(slotno)
+            if self.instance_assigned_pipes():
+                # all nodes could have a switch
+                for slotno in range(len(self.parent_node.pipe_slots)):
+                    self.copy_pipe_slot_infrastructure(slotno)
+
+        self.log_step_timings()
 
     def enumerate_fpgas(self, uridir: str) -> None:
         """FPGAs are enumerated already with VCU118's"""
@@ -1492,35 +1908,12 @@ class XilinxVCU118InstanceDeployManager(InstanceDeployManager):
         """XilinxVCU118InstanceDeployManager machines cannot be terminated."""
         return
 
-    def start_sim_slot(self, slotno: int) -> None:
-        """start a simulation. (same as the default except that you have a mapping from slotno to a specific BDF)"""
-        if self.instance_assigned_simulations():
-            self.instance_logger(
-                f"""Starting {self.sim_type_message} simulation for slot: {slotno}."""
-            )
-            remote_home_dir = self.parent_node.sim_dir
-            remote_sim_dir = f"""{remote_home_dir}/sim_slot_{slotno}/"""
-            assert slotno < len(
-                self.parent_node.sim_slots
-            ), f"{slotno} can not index into sim_slots {len(self.parent_node.sim_slots)} on {self.parent_node.host}"
-            server = self.parent_node.sim_slots[slotno]
-
-            if not self.parent_node.metasimulation_enabled:
-                self.instance_logger(f"""Determine BDF for {slotno}""")
-                collect = run("lspci | grep -i xilinx")
-                bdfs = [i[:7] for i in collect.splitlines() if len(i.strip()) >= 0]
-                bdf = bdfs[slotno].replace(".", ":").split(":")
-                extra_args = f"+domain=0x0000 +bus=0x{bdf[0]} +device=0x{bdf[1]} +function=0x0 +bar=0x0 +pci-vendor=0x10ee +pci-device=0x903f"
-            else:
-                extra_args = None
-
-            # make the local job results dir for this sim slot
-            server.mkdir_and_prep_local_job_results_dir()
-            sim_start_script_local_path = server.write_sim_start_script(
-                slotno, extra_args
-            )
-            put(sim_start_script_local_path, remote_sim_dir)
-
-            with cd(remote_sim_dir):
-                run("chmod +x sim-run.sh")
-                run("./sim-run.sh")
+    def get_sim_slot_extra_plusargs(self, slotno: int) -> Optional[str]:
+        """pass in the BDF of the slot's FPGA (instead of the slot id)"""
+        if self.parent_node.metasimulation_enabled:
+            return None
+        self.instance_logger(f"""Determine BDF for {slotno}""")
+        collect = run("lspci | grep -i xilinx")
+        bdfs = [i[:7] for i in collect.splitlines() if len(i.strip()) >= 0]
+        bdf = bdfs[slotno].replace(".", ":").split(":")
+        return f"+domain=0x0000 +bus=0x{bdf[0]} +device=0x{bdf[1]} +function=0x0 +bar=0x0 +pci-vendor=0x10ee +pci-device=0x903f"
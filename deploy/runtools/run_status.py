@@ -0,0 +1,235 @@
+""" Machine-readable status of a runworkload run.
+
+While runworkload monitors a run, it records the state of every run farm
+host, simulation slot, switch and pipe (plus result copy-backs) as a stream of
+JSON lines in the workload's results directory:
+
+- a "snapshot" record with the complete state when monitoring starts and
+  once the run is over
+- a "transition" record for every change in between (e.g. a simulation
+  completing or a host being terminated)
+- a "summary" record whenever the overall counts change
+
+Records are only written for changes, so the stream stays small for large
+runs and can be tailed (e.g. by dashboards) while the run is in progress. The
+same changes drive the manager's delta-only console display.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import time
+
+from runtools.utils import human_readable_size
+
+from typing import Any, Dict, List, Optional, Tuple
+
+rootLogger = logging.getLogger()
+
+# name of the status stream, relative to the workload's results directory
+RUN_STATUS_FILE = "run-status.jsonl"
+
+# (kind, host, name) -> state, for every entity of the run
+FlatState = Dict[Tuple[str, str, str], str]
+
+
+class RunStatusStream:
+    """Records the state of a runworkload run to a JSON lines file, one
+    record per change."""
+
+    path: str
+    job_slots: Dict[str, Tuple[str, int]]
+    start_time: float
+    state: FlatState
+    summary: Optional[Dict[str, Any]]
+
+    def __init__(self, job_results_dir: str, job_slots: Dict[str, Tuple[str, int]]):
+        """job_slots maps each job name to the host and sim slot it runs in."""
+        self.path = os.path.join(job_results_dir, RUN_STATUS_FILE)
+        self.job_slots = job_slots
+        self.start_time = time.monotonic()
+        self.state = {}
+        self.summary = None
+
+    def write(self, event: str, record: Dict[str, Any]) -> None:
+        record = {
+            "event": event,
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed": round(time.monotonic() - self.start_time, 3),
+            **record,
+        }
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def flatten(
+        self,
+        instancestates: Dict[str, Any],
+        terminated: Dict[str, bool],
+        copy_back_states: Optional[Dict[str, str]],
+    ) -> FlatState:
+        """The state of every entity, from the results of monitor_jobs_wrapper."""
+        state: FlatState = {}
+        for host, instdata in instancestates.items():
+            state[("host", host, host)] = (
+                "terminated" if terminated.get(host, False) else "running"
+            )
+            for jobname, completed in instdata["sims"].items():
+                state[("sim", host, jobname)] = "completed" if completed else "running"
+                if copy_back_states is not None and jobname in copy_back_states:
+                    state[("copy_back", host, jobname)] = copy_back_states[jobname]
+            for switchname, completed in instdata["switches"].items():
+                state[("switch", host, switchname)] = (
+                    "completed" if completed else "running"
+                )
+            for pipename, completed in instdata["pipes"].items():
+                state[("pipe", host, pipename)] = (
+                    "completed" if completed else "running"
+                )
+        return state
+
+    def snapshot(self, state: FlatState) -> Dict[str, Any]:
+        """The complete state, nested by host."""
+        hosts: Dict[str, Any] = {}
+        for (kind, host, name), value in sorted(state.items()):
+            hostdata = hosts.setdefault(
+                host, {"state": None, "sims": {}, "switches": {}, "pipes": {}}
+            )
+            if kind == "host":
+                hostdata["state"] = value
+            elif kind == "sim":
+                hostdata["sims"].setdefault(name, {"slot": self.slot(name)})
+                hostdata["sims"][name]["state"] = value
+            elif kind == "copy_back":
+                hostdata["sims"].setdefault(name, {"slot": self.slot(name)})
+                hostdata["sims"][name]["copy_back"] = value
+            else:
+                hostdata[kind + "es" if kind == "switch" else kind + "s"][name] = value
+        return hosts
+
+    def slot(self, jobname: str) -> Optional[int]:
+        return self.job_slots[jobname][1] if jobname in self.job_slots else None
+
+    def update(
+        self,
+        instancestates: Dict[str, Any],
+        terminated: Dict[str, bool],
+        copy_back_states: Optional[Dict[str, str]] = None,
+        copy_back_summary: Optional[Dict[str, Any]] = None,
+        final: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Record the current state of the run. Returns the transitions since
+        the last update, and the new summary if it changed (None otherwise)."""
+        state = self.flatten(instancestates, terminated, copy_back_states)
+
+        transitions = []
+        if self.state:
+            for key, value in state.items():
+                previous = self.state.get(key)
+                if previous != value:
+                    kind, host, name = key
+                    transition: Dict[str, Any] = {
+                        "kind": kind,
+                        "host": host,
+                        "name": name,
+                        "from": previous,
+                        "to": value,
+                    }
+                    if kind in ["sim", "copy_back"]:
+                        transition["slot"] = self.slot(name)
+                    transitions.append(transition)
+                    self.write("transition", transition)
+
+        summary: Dict[str, Any] = {
+            "hosts_running": 0,
+            "hosts_total": 0,
+            "sims_running": 0,
+            "sims_total": 0,
+        }
+        for (kind, _, _), value in state.items():
+            if kind in ["host", "sim"]:
+                summary[kind + "s_total"] += 1
+                summary[kind + "s_running"] += value == "running"
+        if copy_back_summary is not None:
+            summary["copy_back"] = copy_back_summary
+
+        # throughput changes on every update, so only count it as a change
+        # along with the rest of the summary
+        def without_throughput(s: Optional[Dict[str, Any]]) -> Any:
+            if s is None or "copy_back" not in s:
+                return s
+            return {
+                **s,
+                "copy_back": {
+                    k: v for k, v in s["copy_back"].items() if k != "throughput"
+                },
+            }
+
+        new_summary: Optional[Dict[str, Any]] = None
+        if without_throughput(summary) != without_throughput(self.summary):
+            new_summary = summary
+            self.write("summary", summary)
+
+        if not self.state or final:
+            self.write(
+                "snapshot",
+                {"final": final, "hosts": self.snapshot(state), "summary": summary},
+            )
+
+        self.state = state
+        self.summary = summary
+        return transitions, new_summary
+
+
+def describe_transition(transition: Dict[str, Any]) -> str:
+    """A line for the console describing a transition.
+
+    >>> describe_transition({"kind": "sim", "host": "10.0.0.1", "name": "br-base0", "from": "running", "to": "completed", "slot": 0})
+    '[10.0.0.1] Job br-base0 (slot 0): running -> completed'
+    """
+    kind = transition["kind"]
+    change = transition["to"]
+    if transition["from"] is not None:
+        change = f"{transition['from']} -> {change}"
+    if kind == "host":
+        return f"[{transition['host']}] Instance: {change}"
+    if kind in ["sim", "copy_back"]:
+        what = "Job" if kind == "sim" else "Copy-back of job"
+        return f"[{transition['host']}] {what} {transition['name']} (slot {transition['slot']}): {change}"
+    return f"[{transition['host']}] {kind.capitalize()} {transition['name']}: {change}"
+
+
+def describe_summary(summary: Dict[str, Any]) -> List[str]:
+    """Lines for the console describing a summary.
+
+    >>> describe_summary({"hosts_running": 1, "hosts_total": 2, "sims_running": 3, "sims_total": 8})
+    ['3/8 simulations are still running.', '1/2 instances are still running.']
+    """
+    lines = [
+        f"{summary['sims_running']}/{summary['sims_total']} simulations are still running.",
+        f"{summary['hosts_running']}/{summary['hosts_total']} instances are still running.",
+    ]
+    if "copy_back" in summary:
+        lines.append(describe_copy_back_summary(summary["copy_back"]))
+    return lines
+
+
+def describe_copy_back_summary(summary: Dict[str, Any]) -> str:
+    """A line for the console describing the progress of result copy-backs."""
+    return "{}/{} jobs copied back | {} copying | {} queued | {} failed | {} at {}/s".format(
+        summary["copied"],
+        summary["total"],
+        summary["copying"],
+        summary["queued"],
+        summary["failed"],
+        human_readable_size(summary["bytes"]),
+        human_readable_size(summary["throughput"]),
+    )
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
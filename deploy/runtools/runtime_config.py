@@ -11,6 +11,9 @@ import logging
 import yaml
 import os
 import sys
+import shlex
+import shutil
+import subprocess
 from fabric.operations import _stdoutString  # type: ignore
 from fabric.api import prefix, settings, local, run  # type: ignore
 from fabric.contrib.project import rsync_project  # type: ignore
@@ -38,16 +41,29 @@ from runtools.simulation_data_classes import (
     SynthPrintConfig,
     PartitionConfig,
 )
-from runtools.utils import is_on_aws
+from runtools.utils import is_on_aws, get_content_hash
 from util.inheritors import inheritors
 from util.deepmerge import deep_merge
 from util.streamlogger import InfoStreamLogger
 from util.export import create_export_string
 from util.targetprojectutils import extra_target_project_make_args, resolve_path
 from buildtools.bitbuilder import get_deploy_dir
-from util.io import downloadURI
-
-from typing import Optional, Dict, Any, List, Sequence, Tuple, TYPE_CHECKING
+from runtools.uri_cache import uri_cache, link_to_cached
+from runtools.process_registry import registered_screen_command
+from runtools.job_queue import JOB_QUEUE_ORDERS
+from runtools.host_packing import HOST_MAPPINGS
+
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
 import argparse  # this is not within a if TYPE_CHECKING: scope so the `register_task` in FireSim can evaluate it's annotation
 
 if TYPE_CHECKING:
@@ -57,6 +73,41 @@ LOCAL_DRIVERS_BASE = "../sim/output"
 LOCAL_DRIVERS_GENERATED_SRC = "../sim/generated-src"
 CUSTOM_RUNTIMECONFS_BASE = "../sim/custom-runtime-configs"
 
+# driver tarballs are cached in this directory of each quintuplet's output
+# directory, keyed by the hash of their contents. only the most recently used
+# ones are kept
+DRIVER_BUNDLE_CACHE_DIR = "driver-bundles"
+DRIVER_BUNDLE_CACHE_ENTRIES = 8
+
+# tarballs used by this run of the manager, which are never pruned
+_driver_bundles_in_use: Set[str] = set()
+
+
+def tarball_member_files(name: str, local_path: str) -> Iterator[Tuple[str, str]]:
+    """The files that end up in a tarball for the (dereferenced) local_path
+    stored as name, as (name in the tarball, local path) pairs."""
+    if not os.path.isdir(local_path):
+        yield name, local_path
+        return
+    for dirpath, dirnames, filenames in os.walk(local_path, followlinks=True):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = pjoin(dirpath, filename)
+            yield pjoin(name, os.path.relpath(path, local_path)), path
+
+
+def prune_driver_bundles(bundle_dir: Path) -> None:
+    """Remove all but the DRIVER_BUNDLE_CACHE_ENTRIES most recently used
+    tarballs in bundle_dir."""
+    bundles = sorted(
+        bundle_dir.glob("*.tar.gz"), key=lambda x: x.stat().st_mtime, reverse=True
+    )
+    for bundle in bundles[DRIVER_BUNDLE_CACHE_ENTRIES:]:
+        if str(bundle) not in _driver_bundles_in_use:
+            rootLogger.debug(f"Removing old driver tarball {bundle}")
+            bundle.unlink(missing_ok=True)
+
+
 rootLogger = logging.getLogger()
 
 # from  https://github.com/pandas-dev/pandas/blob/96b036cbcf7db5d3ba875aac28c4f6a678214bfb/pandas/io/common.py#L73
@@ -130,7 +181,8 @@ class URIContainer:
         self, local_dir: str, hwcfg: RuntimeHWConfig
     ) -> Optional[Tuple[str, str]]:
         """Cached download of the URI contained in this class to a user-specified
-        destination folder. The destination name is a SHA256 hash of the URI.
+        destination folder. The destination name is a SHA256 hash of the URI,
+        and is a symlink into the persistent URI cache (see runtools.uri_cache).
         If the file exists this will NOT overwrite."""
 
         # resolve the URI and the path '/{dir}/{hash}' we should download to
@@ -148,7 +200,7 @@ class URIContainer:
             return (uri, destination)
 
         try:
-            downloadURI(uri, destination)
+            link_to_cached(uri, destination)
         except FileNotFoundError as e:
             raise Exception(f"{self.hwcfg_prop} path '{uri}' was not found")
 
@@ -194,6 +246,8 @@ class RuntimeHWConfig:
     # note whether we've built a copy of the simulation driver for this hwconf
     driver_built: bool
     tarball_built: bool
+    """Driver tarball built by build_sim_tarball"""
+    tarball_path: Optional[Path]
     additional_required_files: List[Tuple[str, str]]
     driver_name_prefix: str
     local_driver_base_dir: str
@@ -225,6 +279,7 @@ class RuntimeHWConfig:
         self.platform = None
         self.driver_built = False
         self.tarball_built = False
+        self.tarball_path = None
         self.additional_required_files = []
         self.driver_name_prefix = ""
         self.driver_type_message = "FPGA software"
@@ -410,10 +465,6 @@ class RuntimeHWConfig:
             Path(get_deploy_dir()) / "../sim/output" / self.get_platform() / quintuplet
         )
 
-    def local_tarball_path(self, name: str) -> Path:
-        """return the local path of the tarball"""
-        return self.local_quintuplet_path() / name
-
     def get_local_runtimeconf_binaryname(self) -> str:
         """Get the name of the runtimeconf file."""
         if self.customruntimeconfig is None:
@@ -582,14 +633,11 @@ class RuntimeHWConfig:
             permissive_driver_args += command_pcisoffsets
 
         driver_call = f"""{need_sudo} ./{driver} +permissive {" ".join(permissive_driver_args)} {extra_plusargs} +permissive-off {" ".join(command_bootbinaries)} {extra_args} """
-        base_command = (
-            f"""script -f -c 'stty intr ^] && {driver_call} && stty intr ^c' uartlog"""
-        )
-        screen_wrapped = (
-            f"""screen -S {screen_name} -d -m bash -c "{base_command}"; sleep 1"""
-        )
-
-        return screen_wrapped
+        base_command = f"""script -e -f -c 'stty intr ^] && {driver_call} && stty intr ^c' uartlog"""
+        # the process registry records the driver's exit code once it
+        # terminates, which also notifies the manager of completion (see
+        # runtools/process_registry.py and runtools/job_events.py)
+        return registered_screen_command(screen_name, base_command)
 
     def get_kill_simulation_command(self) -> str:
         driver = self.get_local_driver_binaryname()
@@ -644,14 +692,25 @@ class RuntimeHWConfig:
                     (uri, destination) = both
 
                 if uri == self.bitstream_tar and uri is not None:
-                    # unpack destination value
-                    temp_dir = f"{dir}/{URIContainer.hashed_name(uri)}-dir"
-                    local(f"mkdir -p {temp_dir}")
-                    local(f"tar xvf {destination} -C {temp_dir}")
-
-                    # read string from metadata
-                    cap = local(f"cat {temp_dir}/*/metadata", capture=True)
-                    metadata = firesim_description_to_tags(cap)
+                    assert destination is not None
+
+                    def read_metadata() -> Dict[str, str]:
+                        # unpack the metadata from the destination value
+                        temp_dir = f"{dir}/{URIContainer.hashed_name(uri)}-dir"
+                        local(f"mkdir -p {temp_dir}")
+                        local(
+                            f"tar xvf {destination} -C {temp_dir} --wildcards '*/metadata'"
+                        )
+
+                        # read string from metadata
+                        cap = local(f"cat {temp_dir}/*/metadata", capture=True)
+                        return firesim_description_to_tags(cap)
+
+                    # the tarball is unchanged as long as its (cached) download
+                    # is, so only read its metadata once across runs
+                    metadata = uri_cache.memoize(
+                        destination, "bitstream_tar metadata", read_metadata
+                    )
 
                     self.set_platform(
                         metadata["firesim-deployquintuplet"].split("-")[0]
@@ -714,53 +773,78 @@ class RuntimeHWConfig:
     def build_sim_tarball(
         self, paths: List[Tuple[str, str]], tarball_name: str
     ) -> None:
-        """Take the simulation driver and tar it. build_sim_driver()
-        must run before this function.  Rsync is used in a mode where it's copying
-        from local paths to a local folder. This is confusing as rsync traditionally is
-        used for copying from local folders to a remote folder. The variable local_remote_dir is
-        named as a reminder that it's actually pointing at this local machine"""
+        """Bundle the simulation driver and the files it needs (paths, see
+        get_tarball_files_paths) into a tarball. build_sim_driver() must run
+        before this function.
+
+        The tarball is assembled straight from the source paths (through a
+        directory of symlinks to them) and compressed with pigz if it is
+        installed. Tarballs are cached by the hash of their contents, so an
+        unchanged bundle is reused (across runs) instead of rebuilt."""
         if self.tarball_built:
             # we already built it
             return
 
-        # builddir is a temporary directory created by TemporaryDirectory()
-        # the path a folder is under /tmp/ with a random name
-        # After this scope block exists, the entire folder is deleted
-        with TemporaryDirectory() as builddir:
-
-            with InfoStreamLogger("stdout"), prefix(f"cd {get_deploy_dir()}"):
-                for local_path, remote_path in paths:
-                    # The `rsync_project()` function does not allow
-                    # copying between two local directories.
-                    # This uses the same option flags but operates rsync in local->local mode
-                    options = "-pthrvz -L"
-                    local_dir = local_path
-                    local_remote_dir = pjoin(builddir, remote_path)
-                    cmd = f"rsync {options} {local_dir} {local_remote_dir}"
-
-                    results = run(cmd)
-                    self.handle_failure(results, "local rsync", get_deploy_dir(), cmd)
-
-            # This must be taken outside of a cd context
-            cmd = f"mkdir -p {self.local_quintuplet_path()}"
-            results = run(cmd)
-            self.handle_failure(results, "local mkdir", builddir, cmd)
-            absolute_tarball_path = self.local_quintuplet_path() / tarball_name
-
-            with InfoStreamLogger("stdout"), prefix(f"cd {builddir}"):
-                findcmd = 'find . -mindepth 1 -maxdepth 1 -printf "%P\n"'
-                taroptions = "-czvf"
-
-                # Running through find and xargs is the most simple way I've found to meet these requirements:
-                #   * create the tar with no leading ./ or foldername
-                #   * capture all types of hidden files (.a ..a .aa)
-                #   * avoid capturing the parent folder (..) with globs looking for hidden files
-                cmd = f"{findcmd} | xargs tar {taroptions} {absolute_tarball_path}"
-
-                results = run(cmd)
-                self.handle_failure(results, "tarball", builddir, cmd)
-
-            self.tarball_built = True
+        # name in the tarball -> local path. like the rsync this replaces, an
+        # empty remote path means the local file name
+        members: Dict[str, str] = {}
+        for local_path, remote_path in paths:
+            local_path = pjoin(get_deploy_dir(), local_path)
+            if not os.path.exists(local_path):
+                raise Exception(
+                    f"{local_path}, needed in the {self.driver_type_message} driver tarball, does not exist."
+                )
+            members[remote_path or basename(local_path.rstrip("/"))] = local_path
+
+        bundle_hash = hashlib.sha256()
+        for name, local_path in sorted(members.items()):
+            for member_name, member_path in tarball_member_files(name, local_path):
+                bundle_hash.update(
+                    f"{member_name}:{get_content_hash(member_path)}:{os.access(member_path, os.X_OK)}\n".encode(
+                        "utf-8"
+                    )
+                )
+        bundle_dir = self.local_quintuplet_path() / DRIVER_BUNDLE_CACHE_DIR
+        tarball_path = bundle_dir / f"{bundle_hash.hexdigest()[:32]}-{tarball_name}"
+        _driver_bundles_in_use.add(str(tarball_path))
+
+        if tarball_path.exists():
+            rootLogger.debug(f"Reusing unchanged driver tarball {tarball_path}")
+            # mark as recently used, see prune_driver_bundles
+            os.utime(tarball_path)
+        else:
+            os.makedirs(bundle_dir, exist_ok=True)
+            with TemporaryDirectory() as builddir:
+                for name, local_path in members.items():
+                    link = pjoin(builddir, name)
+                    os.makedirs(os.path.dirname(link), exist_ok=True)
+                    os.symlink(os.path.abspath(local_path), link)
+
+                # list the top-level entries to create the tar with no
+                # leading ./ and to capture hidden files
+                compressor = "pigz" if shutil.which("pigz") else "gzip"
+                partial_path = f"{tarball_path}.{uuid1().hex}.partial"
+                cmd = f"tar -chf - {' '.join(shlex.quote(x) for x in sorted(os.listdir(builddir)))} | {compressor} > {shlex.quote(partial_path)}"
+                result = subprocess.run(
+                    ["bash", "-o", "pipefail", "-c", cmd],
+                    cwd=builddir,
+                    capture_output=True,
+                    text=True,
+                )
+                if result.returncode != 0:
+                    rootLogger.info(
+                        f"{self.driver_type_message} tarball failed. Exiting. See log for details."
+                    )
+                    rootLogger.debug(result.stderr)
+                    if os.path.exists(partial_path):
+                        os.remove(partial_path)
+                    sys.exit(1)
+                os.replace(partial_path, tarball_path)
+            rootLogger.debug(f"Built driver tarball {tarball_path}")
+            prune_driver_bundles(bundle_dir)
+
+        self.tarball_path = tarball_path
+        self.tarball_built = True
 
     def __str__(self) -> str:
         return """RuntimeHWConfig: {}\nDeployQuintuplet: {}\nDeployMakefrag: {}\nAGFI: {}\nBitstream tar: {}\nCustomRuntimeConf: {}""".format(
@@ -791,6 +875,7 @@ class RuntimeBuildRecipeConfig(RuntimeHWConfig):
         self.bitstream_tar = None
         self.driver_tar = None
         self.tarball_built = False
+        self.tarball_path = None
 
         self.uri_list = []
 
@@ -911,6 +996,7 @@ class RuntimeHWDB:
     as endpoints on the simulation."""
 
     hwconf_dict: Dict[str, RuntimeHWConfig]
+    hwconfig_entries: Dict[str, Dict[str, Any]]
     config_file_name: str
     simulation_mode_string: str
 
@@ -924,10 +1010,16 @@ class RuntimeHWDB:
 
         agfidb_dict = agfidb_configfile
 
-        self.hwconf_dict = {
-            s: RuntimeHWConfig(s, v, hardwaredbconfigfile)
-            for s, v in agfidb_dict.items()
-        }
+        # entries are only turned into RuntimeHWConfigs when they are first
+        # looked up, since a run usually uses only a few of them.
+        self.hwconfig_entries = agfidb_dict
+        self.hwconf_dict = {}
+
+    def make_runtimehwconfig(
+        self, name: str, hwconfig_dict: Dict[str, Any]
+    ) -> RuntimeHWConfig:
+        """Construct the RuntimeHWConfig for a single entry."""
+        return RuntimeHWConfig(name, hwconfig_dict, self.config_file_name)
 
     def keyerror_message(self, name: str) -> str:
         """Return the error message for lookup errors."""
@@ -935,7 +1027,11 @@ class RuntimeHWDB:
 
     def get_runtimehwconfig_from_name(self, name: str) -> RuntimeHWConfig:
         if name not in self.hwconf_dict:
-            raise KeyError(self.keyerror_message(name))
+            if name not in self.hwconfig_entries:
+                raise KeyError(self.keyerror_message(name))
+            self.hwconf_dict[name] = self.make_runtimehwconfig(
+                name, self.hwconfig_entries[name]
+            )
         return self.hwconf_dict[name]
 
     def __str__(self) -> str:
@@ -946,6 +1042,10 @@ class RuntimeBuildRecipes(RuntimeHWDB):
     """Same as RuntimeHWDB, but use information from build recipes entries
     instead of hwdb for metasimulation."""
 
+    metasim_host_simulator: str
+    metasimulation_only_plusargs: str
+    metasimulation_only_vcs_plusargs: str
+
     def __init__(
         self,
         build_recipes_config_file: str,
@@ -955,6 +1055,9 @@ class RuntimeBuildRecipes(RuntimeHWDB):
     ) -> None:
         self.config_file_name = build_recipes_config_file
         self.simulation_mode_string = "Metasimulation"
+        self.metasim_host_simulator = metasim_host_simulator
+        self.metasimulation_only_plusargs = metasimulation_only_plusargs
+        self.metasimulation_only_vcs_plusargs = metasimulation_only_vcs_plusargs
 
         recipes_configfile = None
         with open(build_recipes_config_file, "r") as yaml_file:
@@ -962,17 +1065,20 @@ class RuntimeBuildRecipes(RuntimeHWDB):
 
         recipes_dict = recipes_configfile
 
-        self.hwconf_dict = {
-            s: RuntimeBuildRecipeConfig(
-                s,
-                v,
-                build_recipes_config_file,
-                metasim_host_simulator,
-                metasimulation_only_plusargs,
-                metasimulation_only_vcs_plusargs,
-            )
-            for s, v in recipes_dict.items()
-        }
+        self.hwconfig_entries = recipes_dict
+        self.hwconf_dict = {}
+
+    def make_runtimehwconfig(
+        self, name: str, hwconfig_dict: Dict[str, Any]
+    ) -> RuntimeHWConfig:
+        return RuntimeBuildRecipeConfig(
+            name,
+            hwconfig_dict,
+            self.config_file_name,
+            self.metasim_host_simulator,
+            self.metasimulation_only_plusargs,
+            self.metasimulation_only_vcs_plusargs,
+        )
 
 
 class InnerRuntimeConfiguration:
@@ -996,6 +1102,13 @@ class InnerRuntimeConfiguration:
     workload_name: str
     suffixtag: str
     terminateoncompletion: bool
+    job_monitoring_mode: str
+    copy_back_workers: int
+    copy_back_compress: bool
+    status_display: str
+    job_queue_order: str
+    rootfs_overlays: bool
+    host_mapping: str
     metasimulation_enabled: bool
     metasimulation_host_simulator: str
     metasimulation_only_plusargs: str
@@ -1074,6 +1187,13 @@ class InnerRuntimeConfiguration:
         self.netbandwidth = int(runtime_dict["target_config"]["net_bandwidth"])
         self.profileinterval = int(runtime_dict["target_config"]["profile_interval"])
         self.defaulthwconfig = runtime_dict["target_config"]["default_hw_config"]
+        # how networked topologies are mapped onto run farm hosts, see
+        # runtools/host_packing.py
+        self.host_mapping = runtime_dict["target_config"].get("host_mapping", "simple")
+        if self.host_mapping not in HOST_MAPPINGS:
+            raise Exception(
+                f"Invalid host_mapping '{self.host_mapping}' in runtime config. Must be one of: {', '.join(HOST_MAPPINGS)}."
+            )
 
         self.tracerv_config = TracerVConfig(runtime_dict.get("tracing", {}))
         self.autocounter_config = AutoCounterConfig(runtime_dict.get("autocounter", {}))
@@ -1096,6 +1216,44 @@ class InnerRuntimeConfiguration:
         self.terminateoncompletion = (
             runtime_dict["workload"]["terminate_on_completion"] == True
         )
+        # how runworkload notices that simulations have finished
+        self.job_monitoring_mode = runtime_dict["workload"].get(
+            "job_monitoring", "event"
+        )
+        if self.job_monitoring_mode not in ["event", "poll"]:
+            raise Exception(
+                f"Invalid job_monitoring mode '{self.job_monitoring_mode}' in runtime config. Must be one of: event, poll."
+            )
+        # how many jobs' results are copied back at once in the background
+        # (0 copies back inline while monitoring), and whether to compress them
+        self.copy_back_workers = int(
+            runtime_dict["workload"].get("copy_back_workers", 4)
+        )
+        if self.copy_back_workers < 0:
+            raise Exception(
+                f"Invalid copy_back_workers '{self.copy_back_workers}' in runtime config. Must be 0 or more."
+            )
+        self.copy_back_compress = (
+            runtime_dict["workload"].get("copy_back_compress", True) == True
+        )
+        # how runworkload shows the run's status on the console
+        self.status_display = runtime_dict["workload"].get("status_display", "delta")
+        if self.status_display not in ["delta", "table"]:
+            raise Exception(
+                f"Invalid status_display '{self.status_display}' in runtime config. Must be one of: delta, table."
+            )
+        # whether (and in which order) to queue up more jobs than there are
+        # simulations, see runtools/job_queue.py
+        self.job_queue_order = runtime_dict["workload"].get("job_queue", "none")
+        if self.job_queue_order not in JOB_QUEUE_ORDERS:
+            raise Exception(
+                f"Invalid job_queue '{self.job_queue_order}' in runtime config. Must be one of: {', '.join(JOB_QUEUE_ORDERS)}."
+            )
+        # whether sim slots get qcow2 overlays of their job's rootfs instead
+        # of copies (on hosts with NBD support)
+        self.rootfs_overlays = (
+            runtime_dict["workload"].get("rootfs_overlays", False) == True
+        )
 
     def __str__(self) -> str:
         return pprint.pformat(vars(self))
@@ -1110,13 +1268,17 @@ class RuntimeConfig:
     runtimehwdb: RuntimeHWDB
     innerconf: InnerRuntimeConfiguration
     run_farm: RunFarm
-    workload: WorkloadConfig
-    firesim_topology_with_passes: FireSimTopologyWithPasses
+    _workload: Optional[WorkloadConfig]
+    _firesim_topology_with_passes: Optional[FireSimTopologyWithPasses]
     runtime_build_recipes: RuntimeBuildRecipes
 
     def __init__(self, args: argparse.Namespace) -> None:
         """This reads runtime configuration files, massages them into formats that
-        the rest of the manager expects, and keeps track of other info."""
+        the rest of the manager expects, and keeps track of other info.
+
+        The workload and the target topology are only constructed when a task
+        first needs them, so tasks that only touch the run farm (e.g.
+        launchrunfarm, terminaterunfarm) skip building them."""
         self.launch_time = strftime("%Y-%m-%d--%H-%M-%S", gmtime())
 
         self.args = args
@@ -1141,39 +1303,67 @@ class RuntimeConfig:
 
         self.run_farm = self.innerconf.run_farm_dispatcher
 
-        # setup workload config obj, aka a list of workloads that can be assigned
-        # to a server
-        if args.task != "enumeratefpgas":
-            self.workload = WorkloadConfig(
-                self.innerconf.workload_name, self.launch_time, self.innerconf.suffixtag
-            )
-        else:
-            self.workload = WorkloadConfig(
-                "null.json", self.launch_time, self.innerconf.suffixtag
+        self._workload = None
+        self._firesim_topology_with_passes = None
+
+    @property
+    def workload(self) -> WorkloadConfig:
+        """The workload config obj, aka a list of workloads that can be
+        assigned to a server."""
+        if self._workload is None:
+            if self.args.task != "enumeratefpgas":
+                self._workload = WorkloadConfig(
+                    self.innerconf.workload_name,
+                    self.launch_time,
+                    self.innerconf.suffixtag,
+                )
+            else:
+                self._workload = WorkloadConfig(
+                    "null.json", self.launch_time, self.innerconf.suffixtag
+                )
+        return self._workload
+
+    @property
+    def firesim_topology_with_passes(self) -> FireSimTopologyWithPasses:
+        """The target configuration tree, with phase one passes applied."""
+        if self._firesim_topology_with_passes is None:
+            self._firesim_topology_with_passes = FireSimTopologyWithPasses(
+                self.innerconf.topology,
+                self.innerconf.no_net_num_nodes,
+                self.run_farm,
+                self.runtimehwdb,
+                self.innerconf.defaulthwconfig,
+                self.workload,
+                self.innerconf.linklatency,
+                self.innerconf.switchinglatency,
+                self.innerconf.netbandwidth,
+                self.innerconf.profileinterval,
+                self.innerconf.tracerv_config,
+                self.innerconf.autocounter_config,
+                self.innerconf.hostdebug_config,
+                self.innerconf.synthprint_config,
+                self.innerconf.partition_config,
+                self.innerconf.terminateoncompletion,
+                self.runtime_build_recipes,
+                self.innerconf.metasimulation_enabled,
+                self.innerconf.default_plusarg_passthrough,
+                self.innerconf.job_monitoring_mode,
+                self.innerconf.copy_back_workers,
+                self.innerconf.copy_back_compress,
+                self.innerconf.status_display,
+                self.innerconf.job_queue_order,
+                self.innerconf.rootfs_overlays,
+                self.innerconf.host_mapping,
             )
+            if self.args.topologydiagram or self.args.task == "runcheck":
+                self._firesim_topology_with_passes.pass_create_topology_diagram()
+        return self._firesim_topology_with_passes
 
-        # start constructing the target configuration tree
-        self.firesim_topology_with_passes = FireSimTopologyWithPasses(
-            self.innerconf.topology,
-            self.innerconf.no_net_num_nodes,
-            self.run_farm,
-            self.runtimehwdb,
-            self.innerconf.defaulthwconfig,
-            self.workload,
-            self.innerconf.linklatency,
-            self.innerconf.switchinglatency,
-            self.innerconf.netbandwidth,
-            self.innerconf.profileinterval,
-            self.innerconf.tracerv_config,
-            self.innerconf.autocounter_config,
-            self.innerconf.hostdebug_config,
-            self.innerconf.synthprint_config,
-            self.innerconf.partition_config,
-            self.innerconf.terminateoncompletion,
-            self.runtime_build_recipes,
-            self.innerconf.metasimulation_enabled,
-            self.innerconf.default_plusarg_passthrough,
-        )
+    def runcheck(self) -> None:
+        """directly called by top-level runcheck command."""
+        # constructing the topology runs the phase one passes and renders the
+        # topology diagram
+        self.firesim_topology_with_passes
 
     def launch_run_farm(self) -> None:
         """directly called by top-level launchrunfarm command."""
@@ -1217,7 +1407,9 @@ class RuntimeConfig:
         # the manager.
         use_mock_instances_for_testing = False
         self.firesim_topology_with_passes.infrasetup_passes(
-            use_mock_instances_for_testing
+            use_mock_instances_for_testing,
+            self.args.forceflash,
+            self.args.incremental,
         )
 
     def build_driver(self) -> None:
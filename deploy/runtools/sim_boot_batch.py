@@ -0,0 +1,96 @@
+""" Batched simulation launch on run farm hosts.
+
+Simulations used to be launched one slot at a time (upload sim-run.sh, chmod
+it, run it), with a fixed sleep after every screen session started, and only
+once every switch and pipe on every host had been started. Instead, each host
+starts its own switches and pipes and then runs a single generated script
+that:
+
+- waits until the switches and pipes on the host have set up the shared
+  memory regions its simulations connect to (they truncate them on startup,
+  so simulations must not start earlier)
+- writes and runs the sim-run.sh of every slot
+
+Hosts boot independently of each other, and screen sessions are polled for
+instead of waiting a fixed amount of time after starting them.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from typing import List, Tuple
+
+rootLogger = logging.getLogger()
+
+# seconds to wait for the shared memory regions of a host's switches and
+# pipes to be set up before giving up on booting its simulations
+SHM_READY_TIMEOUT = 300
+
+# how long to poll for a screen session to show up after starting it, in
+# polls of SCREEN_POLL_INTERVAL seconds. the session may also have exited
+# already, so this is not an error
+SCREEN_START_POLLS = 100
+SCREEN_POLL_INTERVAL = 0.05
+
+# terminates the heredocs that sim-run.sh scripts are written with
+SIM_RUN_EOF = "FIRESIM_SIM_RUN_EOF"
+
+
+def shm_path(name: str) -> str:
+    """The path of the POSIX shared memory region name (as passed to
+    shm_open) on the host.
+
+    >>> shm_path("/port_ntslink0_0")
+    '/dev/shm/port_ntslink0_0'
+    """
+    return "/dev/shm/" + name.lstrip("/")
+
+
+def wait_for_screen_command(screen_name: str) -> str:
+    """Shell command that returns once a screen session named screen_name
+    exists. `screen -d -m` can return before the session is set up, so this
+    follows it in place of a fixed sleep."""
+    return f"""for i in $(seq {SCREEN_START_POLLS}); do screen -ls | grep -q "\\.{screen_name}[[:space:]]" && break; sleep {SCREEN_POLL_INTERVAL}; done"""
+
+
+def wait_for_files_command(paths: List[str], timeout: int) -> str:
+    """Shell command that waits until every file in paths exists and is not
+    empty, and fails if that takes more than timeout seconds."""
+    tests = " && ".join(f"test -s {path}" for path in paths)
+    return f"""deadline=$(( $(date +%s) + {timeout} ))
+until {tests}; do
+    if [ "$(date +%s)" -ge "$deadline" ]; then
+        echo "Timed out waiting for {' '.join(paths)}" >&2
+        exit 1
+    fi
+    sleep {SCREEN_POLL_INTERVAL}
+done"""
+
+
+def build_sim_boot_script(
+    shm_files: List[str], slot_scripts: List[Tuple[str, str]]
+) -> str:
+    """The script that boots the simulations of a host: wait for shm_files
+    (paths under /dev/shm), then for each (remote sim dir, sim-run.sh
+    contents) in slot_scripts, write sim-run.sh to the sim dir and run it."""
+    lines = ["#!/usr/bin/env bash", "set -e"]
+    if shm_files:
+        lines.append(wait_for_files_command(sorted(set(shm_files)), SHM_READY_TIMEOUT))
+    for remote_sim_dir, script in slot_scripts:
+        assert SIM_RUN_EOF not in script
+        lines += [
+            f"cd {remote_sim_dir}",
+            f"cat > sim-run.sh <<'{SIM_RUN_EOF}'",
+            script.rstrip("\n"),
+            SIM_RUN_EOF,
+            "chmod +x sim-run.sh",
+            "./sim-run.sh",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
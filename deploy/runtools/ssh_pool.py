@@ -0,0 +1,141 @@
+""" Shared, multiplexed ssh connections to run farm hosts.
+
+Fabric's run()/put() keep a paramiko connection per host for the lifetime of
+a task, but everything that shells out to OpenSSH (rsync_project, the job
+event channels, etc.) would otherwise pay for a full ssh handshake on every
+call. This pool gives every such call the same ControlMaster socket for its
+host, so that only the first connection to a host performs a handshake and
+the rest are multiplexed over it. Masters are kept alive with ssh keep-alives
+and are evicted by ssh itself (ControlPersist) once they have been idle for a
+configurable amount of time, which also lets back-to-back manager commands
+(e.g. infrasetup then runworkload) share them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from fabric.api import env  # type: ignore
+from fabric.network import normalize  # type: ignore
+
+from typing import Dict, List, Optional, Tuple
+
+rootLogger = logging.getLogger()
+
+
+class SSHConnectionPool:
+    """Hand out ssh options that multiplex all OpenSSH connections to a host
+    over one ControlMaster connection, keyed by host.
+
+    Attributes:
+        control_dir: directory holding the control sockets.
+        keepalive_interval: seconds between ssh keep-alive messages.
+        idle_timeout: seconds an unused master connection is kept open.
+        usage_file: file that connection usage is recorded in. This is a file
+            (instead of an in-memory counter) since most connections are made
+            from the processes that fabric forks for @parallel tasks.
+    """
+
+    control_dir: str
+    keepalive_interval: int
+    idle_timeout: int
+    usage_file: str
+
+    def __init__(self, keepalive_interval: int = 15, idle_timeout: int = 600) -> None:
+        # keep socket paths short, they are limited to ~100 chars
+        self.control_dir = os.path.join(
+            tempfile.gettempdir(), f"firesim-ssh-{os.getuid()}"
+        )
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.usage_file = os.path.join(self.control_dir, f"usage-{os.getpid()}")
+
+    def configure(self, keepalive_interval: int, idle_timeout: int) -> None:
+        """Set the keep-alive interval and idle eviction timeout (in seconds)."""
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+
+    def control_path(self, host_string: str) -> str:
+        """Return the control socket used for host_string."""
+        user, host, port = normalize(host_string)
+        key = hashlib.sha256(f"{user}@{host}:{port}".encode()).hexdigest()[:16]
+        return os.path.join(self.control_dir, key)
+
+    def ssh_options(self, host_string: Optional[str] = None) -> List[str]:
+        """Return the ssh options needed to connect to host_string (defaults to
+        the current fabric host) through the pool."""
+        if host_string is None:
+            host_string = env.host_string
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+        control_path = self.control_path(host_string)
+        self._record_usage(host_string, os.path.exists(control_path))
+
+        return [
+            "-o",
+            "StrictHostKeyChecking=no",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={control_path}",
+            "-o",
+            f"ControlPersist={self.idle_timeout}",
+            "-o",
+            f"ServerAliveInterval={self.keepalive_interval}",
+        ]
+
+    def rsync_ssh_opts(self, host_string: Optional[str] = None) -> str:
+        """Same as ssh_options, formatted for rsync_project's ssh_opts."""
+        return " ".join(self.ssh_options(host_string))
+
+    def ssh_command(self, host_string: str) -> List[str]:
+        """Return an ssh invocation that connects to host_string the same way
+        fabric does (same user, port and keys), through the pool."""
+        user, host, port = normalize(host_string)
+        command = ["ssh", "-o", "BatchMode=yes", "-p", str(port)]
+        command += self.ssh_options(host_string)
+        key_filenames = env.key_filename
+        if isinstance(key_filenames, str):
+            key_filenames = [key_filenames]
+        for key_filename in key_filenames or []:
+            command += ["-i", key_filename]
+        command.append(f"{user}@{host}")
+        return command
+
+    def _record_usage(self, host_string: str, reused: bool) -> None:
+        # single short appends are atomic, so forked processes can share this
+        with open(self.usage_file, "a") as f:
+            f.write(f"{host_string} {int(reused)}\n")
+
+    def usage_stats(self) -> Dict[str, Tuple[int, int]]:
+        """Return a mapping of host to (connections opened, connections reused)
+        for this manager run."""
+        stats: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        if os.path.exists(self.usage_file):
+            with open(self.usage_file, "r") as f:
+                for line in f:
+                    host, reused = line.split()
+                    stats[host][int(reused)] += 1
+        return {host: (opened, reused) for host, (opened, reused) in stats.items()}
+
+    def log_usage_stats(self) -> None:
+        """Log connection reuse statistics for this manager run and clean up."""
+        stats = self.usage_stats()
+        if stats:
+            for host, (opened, reused) in sorted(stats.items()):
+                rootLogger.debug(
+                    f"[{host}] ssh connections opened: {opened}, reused: {reused}"
+                )
+            total_opened = sum(opened for opened, _ in stats.values())
+            total_reused = sum(reused for _, reused in stats.values())
+            rootLogger.info(
+                f"SSH connections: {total_opened} opened, {total_reused} reused across {len(stats)} host(s)."
+            )
+        if os.path.exists(self.usage_file):
+            os.remove(self.usage_file)
+
+
+ssh_connection_pool = SSHConnectionPool()
@@ -3,13 +3,16 @@ models that live in target-design/switch/ """
 
 from __future__ import annotations
 
-import subprocess
 import random
 import string
 import logging
-from fabric.api import local  # type: ignore
 
 from runtools.utils import is_on_aws
+from runtools.process_registry import registered_screen_command
+from runtools.model_build_cache import (
+    ModelSources,
+    install_model_binary,
+)
 
 from typing import TYPE_CHECKING
 
@@ -18,6 +21,8 @@ if TYPE_CHECKING:
 
 rootLogger = logging.getLogger()
 
+SWITCH_SOURCES = ModelSources("../target-design/switch/", "switch", "switchconfig.h")
+
 
 class AbstractSwitchToSwitchConfig:
     """This class is responsible for providing functions that take a FireSimSwitchNode
@@ -112,13 +117,8 @@ class AbstractSwitchToSwitchConfig:
         mac2port_pythonarray = self.fsimswitchnode.switch_table
         assert mac2port_pythonarray is not None
 
-        commaseparated = ""
-        for elem in mac2port_pythonarray:
-            commaseparated += str(elem) + ", "
-
-        # remove extraneous ", "
-        commaseparated = commaseparated[:-2]
-        commaseparated = "{" + commaseparated + "};"
+        # join in one go, repeated += is quadratic in the number of macs
+        commaseparated = "{" + ", ".join(map(str, mac2port_pythonarray)) + "};"
 
         retstr = """
     #ifdef MACPORTSCONFIG
@@ -182,40 +182,10 @@ class AbstractSwitchToSwitchConfig:
     def switch_binary_name(self) -> str:
         return "switch" + str(self.fsimswitchnode.switch_id_internal)
 
-    def buildswitch(self) -> None:
-        """Generate the config file, build the switch."""
-
-        configfile = self.emit_switch_configfile()
-        binaryname = self.switch_binary_name()
-
-        switchorigdir = self.switch_build_local_dir()
-        switchbuilddir = (
-            switchorigdir + binaryname + "-" + self.build_disambiguate + "-build/"
-        )
-
-        rootLogger.info(
-            "Building switch model binary for switch " + str(self.switch_binary_name())
-        )
-
-        rootLogger.debug(str(configfile))
-
-        def local_logged(command: str) -> None:
-            """Run local command with logging."""
-            localcap = local(command, capture=True)
-            rootLogger.debug(localcap)
-            rootLogger.debug(localcap.stderr)
-
-        # make a build dir for this switch
-        local_logged("mkdir -p " + switchbuilddir)
-        local_logged("cp " + switchorigdir + "*.h " + switchbuilddir)
-        local_logged("cp " + switchorigdir + "*.cc " + switchbuilddir)
-        local_logged("cp " + switchorigdir + "Makefile " + switchbuilddir)
-
-        text_file = open(switchbuilddir + "switchconfig.h", "w")
-        text_file.write(configfile)
-        text_file.close()
-        local_logged("cd " + switchbuilddir + " && make")
-        local_logged("mv " + switchbuilddir + "switch " + switchbuilddir + binaryname)
+    def install_switch_binary(self, binary_path: str) -> None:
+        """Make the built switch binary at binary_path available as this
+        switch's binary (see switch_binary_local_path)."""
+        install_model_binary(binary_path, self.switch_binary_local_path())
 
     def get_switch_simulation_command(self) -> str:
         """Return the command to boot the switch."""
@@ -223,12 +193,11 @@ class AbstractSwitchToSwitchConfig:
         linklatency = self.fsimswitchnode.switch_link_latency
         bandwidth = self.fsimswitchnode.switch_bandwidth
         # insert gdb -ex run --args in front of ./ below to start switches in gdb
-        return """screen -S {} -d -m bash -c "script -f -c './{} {} {} {}' switchlog"; sleep 1""".format(
-            self.switch_binary_name(),
+        return registered_screen_command(
             self.switch_binary_name(),
-            linklatency,
-            switchlatency,
-            bandwidth,
+            """script -f -c './{} {} {} {}' switchlog""".format(
+                self.switch_binary_name(), linklatency, switchlatency, bandwidth
+            ),
         )
 
     def kill_switch_simulation_command(self) -> str:
@@ -238,7 +207,7 @@ class AbstractSwitchToSwitchConfig:
 
     def switch_build_local_dir(self) -> str:
         """get local build dir of the switch."""
-        return "../target-design/switch/"
+        return SWITCH_SOURCES.origdir
 
     def switch_binary_local_path(self) -> str:
         """return the full local path where the switch binary lives."""
@@ -0,0 +1,225 @@
+""" Per-phase tracing of manager tasks.
+
+Records a span for each traced pass, deploy manager method and timed step,
+tagged with the run farm host (and sim slot) it ran for, and writes them out
+in the Chrome trace event format next to the run's log. Traces can be opened
+with chrome://tracing or https://ui.perfetto.dev.
+
+Most per-host work runs in forked processes (fabric @parallel tasks) and
+worker threads, so every process appends the spans it finishes to its own
+file in a temporary directory. The manager merges them at the end of the
+task.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from fabric.api import env  # type: ignore
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+rootLogger = logging.getLogger()
+
+# where processes write the spans they finish, while tracing is enabled
+_trace_dir: Optional[str] = None
+
+# host/slot of the innermost span on each thread, inherited by nested spans
+_current = threading.local()
+
+# host name used for work done by the manager itself
+MANAGER_HOST = "manager"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def start_tracing() -> None:
+    """Start recording spans (in this process and any processes it forks)."""
+    global _trace_dir
+    _trace_dir = tempfile.mkdtemp(prefix="firesim-trace-")
+
+
+@contextmanager
+def span(
+    name: str,
+    cat: str,
+    host: Optional[str] = None,
+    slot: Optional[int] = None,
+) -> Iterator[None]:
+    """Record a span named name around the body of the with statement. host
+    and slot default to those of the enclosing span (or the host fabric is
+    running on)."""
+    if _trace_dir is None:
+        yield
+        return
+
+    parent: Tuple[Optional[str], Optional[int]] = getattr(
+        _current, "where", (None, None)
+    )
+    if host is None:
+        host = parent[0] or env.host_string or MANAGER_HOST
+    if slot is None and host == parent[0]:
+        slot = parent[1]
+
+    _current.where = (host, slot)
+    start = time.time()
+    try:
+        yield
+    finally:
+        end = time.time()
+        _current.where = parent
+        record = {
+            "name": name,
+            "cat": cat,
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "host": host,
+            "slot": slot,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        try:
+            with open(os.path.join(_trace_dir, f"{os.getpid()}.jsonl"), "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            # the trace was already written out (e.g. a straggling process)
+            pass
+
+
+def traced(
+    cat: str, host_of: Optional[Callable[[Any], str]] = None
+) -> Callable[[F], F]:
+    """Decorator that records a span for every call of a function. If the
+    function has a slotno argument, the span is tagged with that slot. For
+    methods, host_of(self) gives the host to tag the span with."""
+
+    def decorator(func: F) -> F:
+        signature = inspect.signature(func)
+        has_slot = "slotno" in signature.parameters
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _trace_dir is None:
+                return func(*args, **kwargs)
+            host = host_of(args[0]) if host_of is not None else None
+            slot = None
+            if has_slot:
+                slot = signature.bind(*args, **kwargs).arguments.get("slotno")
+            with span(func.__qualname__, cat, host, slot):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def traced_methods(
+    cat: str,
+    host_of: Optional[Callable[[Any], str]] = None,
+    include: Optional[Callable[[str], bool]] = None,
+    exclude: Optional[Set[str]] = None,
+) -> Callable[[Any], Any]:
+    """Class decorator that applies traced to the public methods the class
+    defines (the ones include accepts, if given, and not in exclude)."""
+
+    def decorator(cls: Any) -> Any:
+        for attr, value in list(vars(cls).items()):
+            if (
+                attr.startswith("_")
+                or (exclude is not None and attr in exclude)
+                or not inspect.isfunction(value)
+                or (include is not None and not include(attr))
+            ):
+                continue
+            setattr(cls, attr, traced(cat, host_of)(value))
+        return cls
+
+    return decorator
+
+
+def write_trace(path: str) -> None:
+    """Merge the spans recorded so far into a Chrome trace at path and stop
+    tracing."""
+    global _trace_dir
+    if _trace_dir is None:
+        return
+    trace_dir, _trace_dir = _trace_dir, None
+
+    records: List[Dict[str, Any]] = []
+    for filename in os.listdir(trace_dir):
+        with open(os.path.join(trace_dir, filename)) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # partially written by a process that was killed
+                    pass
+    shutil.rmtree(trace_dir, ignore_errors=True)
+
+    # one trace "process" per host (the manager first) and one "thread" per
+    # sim slot, plus one per (process, thread) for the rest of the host's work
+    hosts = sorted({r["host"] for r in records}, key=lambda h: (h != MANAGER_HOST, h))
+    host_ids = {host: pid for pid, host in enumerate(hosts)}
+    lane_ids: Dict[Tuple[str, Any], int] = {}
+    events: List[Dict[str, Any]] = []
+    for host in hosts:
+        events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": host_ids[host],
+                "args": {"name": host},
+            }
+        )
+
+    for r in sorted(records, key=lambda r: r["ts"]):
+        if r["slot"] is not None:
+            lane: Tuple[str, Any] = (r["host"], ("slot", r["slot"]))
+            lane_name = f"slot {r['slot']}"
+        else:
+            lane = (r["host"], (r["pid"], r["tid"]))
+            lane_name = f"pid {r['pid']}"
+        if lane not in lane_ids:
+            lane_ids[lane] = len(lane_ids)
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": host_ids[r["host"]],
+                    "tid": lane_ids[lane],
+                    "args": {"name": lane_name},
+                }
+            )
+        events.append(
+            {
+                "name": r["name"],
+                "cat": r["cat"],
+                "ph": "X",
+                "ts": r["ts"],
+                "dur": r["dur"],
+                "pid": host_ids[r["host"]],
+                "tid": lane_ids[lane],
+                "args": {"host": r["host"], "slot": r["slot"], "pid": r["pid"]},
+            }
+        )
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
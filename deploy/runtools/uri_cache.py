@@ -0,0 +1,393 @@
+""" Persistent cache of files downloaded from URIs (e.g. bitstream tarballs).
+
+Each task used to download every URI it needs into a fresh temporary
+directory. Instead, downloads go to a cache in the manager's home directory
+that is shared by all runs (and all FireSim checkouts). Entries are keyed by
+the URI and the version of the remote object (its ETag/checksum/modification
+time, as reported by fsspec), so a changed object is downloaded again.
+
+- Downloads are written to a partial file that is resumed (with a byte range
+  request, where supported) if a download is interrupted, and are verified
+  against the remote size (and MD5 ETag, where there is one) before they
+  are used. Their sha256 is recorded so that it does not have to be
+  recomputed before they are deployed.
+- The cache is bounded in size: least recently used entries are evicted
+  once it grows past its limit. Entries in use by any run are never evicted:
+  every run holds a shared lock on the entries it uses until it exits, and
+  eviction only removes entries it can lock exclusively.
+- Values derived from cached files (e.g. the metadata in a bitstream
+  tarball) can be memoized next to them, so that later runs skip the work.
+- Local paths (file:// URIs) are used in place, not copied into the cache.
+
+The cache location and size limit can be changed with the
+FIRESIM_URI_CACHE_DIR and FIRESIM_URI_CACHE_SIZE_GB environment variables.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from os.path import expanduser, join as pjoin, realpath
+
+from runtools.utils import human_readable_size, remember_content_hash
+
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple
+
+rootLogger = logging.getLogger()
+
+DEFAULT_URI_CACHE_DIR = "~/.cache/firesim/uri-cache"
+DEFAULT_URI_CACHE_SIZE_GB = 50
+
+# at most this many configs' URIs are downloaded at once
+URI_DOWNLOAD_WORKERS = 4
+
+# download attempts per URI, with exponential backoff starting at 1s
+URI_DOWNLOAD_TRIES = 4
+
+# size of the reads used to stream downloads (and hash them as they arrive)
+DOWNLOAD_CHUNK_SIZE = 8 << 20
+
+# fields of fsspec's info() that identify a version of a remote object
+VERSION_INFO_KEYS = [
+    "ETag",
+    "etag",
+    "md5Hash",
+    "checksum",
+    "crc32c",
+    "LastModified",
+    "last_modified",
+    "updated",
+    "mtime",
+    "size",
+]
+
+
+def is_local_uri(uri: str) -> bool:
+    return uri.startswith("file://")
+
+
+def md5_from_etag(info: Dict[str, Any]) -> Optional[str]:
+    """The MD5 of an object, if its ETag is one (e.g. for objects not
+    uploaded in multiple parts to S3).
+
+    >>> md5_from_etag({"ETag": '"9e107d9d372bb6826bd81d3542a419d6"'})
+    '9e107d9d372bb6826bd81d3542a419d6'
+    >>> md5_from_etag({"ETag": '"9e107d9d372bb6826bd81d3542a419d6-3"'}) is None
+    True
+    """
+    etag = str(info.get("ETag", info.get("etag", ""))).strip('"').lower()
+    if len(etag) == 32 and all(c in "0123456789abcdef" for c in etag):
+        return etag
+    return None
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive lock on path (shared with other processes) for the
+    duration of the with statement. Yields whether the lock was taken, which
+    is always the case if blocking."""
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class URICache:
+    """Size-bounded, persistent cache of files downloaded from URIs."""
+
+    cache_dir: Optional[str]
+    max_bytes: int
+    held_entries: Dict[str, IO[str]]
+    lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.cache_dir = None
+        self.max_bytes = 0
+        # lock files of the entries in use by this process, see hold_entry
+        self.held_entries = {}
+        self.lock = threading.Lock()
+
+    def get_cache_dir(self) -> str:
+        """Where the cache lives, created on first use."""
+        if self.cache_dir is None:
+            self.cache_dir = expanduser(
+                os.environ.get("FIRESIM_URI_CACHE_DIR", DEFAULT_URI_CACHE_DIR)
+            )
+            self.max_bytes = int(
+                float(
+                    os.environ.get(
+                        "FIRESIM_URI_CACHE_SIZE_GB", DEFAULT_URI_CACHE_SIZE_GB
+                    )
+                )
+                * (1 << 30)
+            )
+            os.makedirs(pjoin(self.cache_dir, "entries"), exist_ok=True)
+            os.makedirs(pjoin(self.cache_dir, "memo"), exist_ok=True)
+        return self.cache_dir
+
+    def uri_dir(self, uri: str) -> str:
+        return pjoin(
+            self.get_cache_dir(),
+            "entries",
+            hashlib.sha256(uri.encode("utf-8")).hexdigest(),
+        )
+
+    def fetch(self, uri: str) -> Tuple[str, Optional[str]]:
+        """Return the local path to (a cached copy of) uri, downloading it if
+        needed, along with its sha256 (if known)."""
+        if is_local_uri(uri):
+            path = uri[len("file://") :]
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            return path, None
+
+        # fsspec is slow to import and only needed when something is downloaded
+        from fsspec.core import url_to_fs  # type: ignore
+
+        fs, rpath = url_to_fs(uri)
+        uri_dir = self.uri_dir(uri)
+        try:
+            info = fs.info(rpath)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            # e.g. offline. use the most recently cached version, if any
+            entry = self.latest_entry(uri_dir)
+            if entry is None:
+                raise
+            rootLogger.warning(
+                f"Could not check '{uri}' for changes ({e}), using the cached copy."
+            )
+            return self.use_entry(entry)
+
+        version = json.dumps(
+            {k: str(info[k]) for k in VERSION_INFO_KEYS if k in info}, sort_keys=True
+        )
+        entry = pjoin(uri_dir, hashlib.sha256(version.encode("utf-8")).hexdigest())
+        self.hold_entry(entry)
+
+        with file_lock(pjoin(entry, "download.lock")):
+            meta_path = pjoin(entry, "meta.json")
+            data_path = pjoin(entry, "data")
+            if os.path.exists(meta_path) and os.path.exists(data_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if os.path.getsize(data_path) == meta["size"]:
+                    rootLogger.debug(f"Using cached download of '{uri}'")
+                    return self.use_entry(entry)
+
+            size, sha256 = self.download(fs, rpath, info, data_path + ".partial")
+            os.replace(data_path + ".partial", data_path)
+            with open(meta_path, "w") as f:
+                json.dump(
+                    {"uri": uri, "version": version, "size": size, "sha256": sha256},
+                    f,
+                )
+            rootLogger.info(f"Downloaded {human_readable_size(size)} from '{uri}'")
+
+        self.evict()
+        return self.use_entry(entry)
+
+    def download(
+        self, fs: Any, rpath: str, info: Dict[str, Any], partial_path: str
+    ) -> Tuple[int, str]:
+        """Download rpath to partial_path, resuming a previous partial download
+        if there is one. Returns the size and sha256 of the download."""
+        expected_size = info.get("size")
+        expected_md5 = md5_from_etag(info)
+        for attempt in range(URI_DOWNLOAD_TRIES):
+            sha256 = hashlib.sha256()
+            md5 = hashlib.md5()
+            offset = 0
+            if os.path.exists(partial_path):
+                # hash what we already have, so that we can pick up from there
+                with open(partial_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                        sha256.update(chunk)
+                        md5.update(chunk)
+                        offset += len(chunk)
+                if expected_size is not None and offset > expected_size:
+                    os.remove(partial_path)
+                    continue
+            try:
+                with fs.open(rpath, "rb") as remote:
+                    if offset > 0:
+                        try:
+                            remote.seek(offset)
+                            rootLogger.debug(
+                                f"Resuming download of '{rpath}' at {human_readable_size(offset)}"
+                            )
+                        except Exception:
+                            # no byte range support. start over
+                            os.remove(partial_path)
+                            sha256, md5, offset = hashlib.sha256(), hashlib.md5(), 0
+                    with open(partial_path, "ab") as local_file:
+                        for chunk in iter(
+                            lambda: remote.read(DOWNLOAD_CHUNK_SIZE), b""
+                        ):
+                            local_file.write(chunk)
+                            sha256.update(chunk)
+                            md5.update(chunk)
+                            offset += len(chunk)
+            except Exception as e:
+                if attempt == URI_DOWNLOAD_TRIES - 1:
+                    raise
+                rootLogger.debug(
+                    f"Download attempt {attempt + 1} of {URI_DOWNLOAD_TRIES} of '{rpath}' failed: {e}"
+                )
+                time.sleep(2**attempt)
+                continue
+
+            if (expected_size is not None and offset != expected_size) or (
+                expected_md5 is not None and md5.hexdigest() != expected_md5
+            ):
+                # corrupt. don't resume from it
+                os.remove(partial_path)
+                if attempt == URI_DOWNLOAD_TRIES - 1:
+                    raise Exception(
+                        f"Download of '{rpath}' does not match its size/checksum."
+                    )
+                continue
+            return offset, sha256.hexdigest()
+        raise Exception(f"Could not download '{rpath}'.")
+
+    def latest_entry(self, uri_dir: str) -> Optional[str]:
+        """The most recently used complete entry for a URI."""
+        if not os.path.isdir(uri_dir):
+            return None
+        entries = [
+            pjoin(uri_dir, x)
+            for x in os.listdir(uri_dir)
+            if os.path.exists(pjoin(uri_dir, x, "meta.json"))
+        ]
+        if not entries:
+            return None
+        return max(entries, key=lambda x: os.path.getmtime(pjoin(x, "meta.json")))
+
+    def hold_entry(self, entry: str) -> None:
+        """Create entry if needed and hold a shared lock on it until this
+        process exits, so that no run evicts it while it is in use (see
+        evict). Files are only ever used through symlinks into the cache after
+        they are fetched, so the lock has to outlive the fetch."""
+        with self.lock:
+            if entry in self.held_entries:
+                return
+        lock_path = pjoin(entry, "lock")
+        while True:
+            os.makedirs(entry, exist_ok=True)
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_SH)
+            # the entry may have been evicted between opening its lock file
+            # and locking it, in which case the lock protects nothing
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        with self.lock:
+            if entry in self.held_entries:
+                lock_file.close()
+            else:
+                self.held_entries[entry] = lock_file
+
+    def use_entry(self, entry: str) -> Tuple[str, Optional[str]]:
+        """Mark entry as used (by this run, and most recently, for eviction)
+        and return the path to its data and its sha256."""
+        self.hold_entry(entry)
+        meta_path = pjoin(entry, "meta.json")
+        os.utime(meta_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return pjoin(entry, "data"), meta["sha256"]
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache is within its
+        size limit."""
+        entries = []
+        total = 0
+        entries_dir = pjoin(self.get_cache_dir(), "entries")
+        for uri_hash in os.listdir(entries_dir):
+            for version_hash in os.listdir(pjoin(entries_dir, uri_hash)):
+                entry = pjoin(entries_dir, uri_hash, version_hash)
+                try:
+                    last_used = os.path.getmtime(pjoin(entry, "meta.json"))
+                    size = os.path.getsize(pjoin(entry, "data"))
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry))
+                total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with self.lock:
+                if entry in self.held_entries:
+                    continue
+            # skip entries that another run holds (see hold_entry)
+            with file_lock(pjoin(entry, "lock"), blocking=False) as locked:
+                if not locked:
+                    continue
+                rootLogger.debug(f"Evicting {entry} from the URI cache")
+                os.remove(pjoin(entry, "meta.json"))
+                shutil.rmtree(entry, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(entry))
+            except OSError:
+                # other versions of the URI are still cached
+                pass
+            total -= size
+
+    def memoize(
+        self, path: str, name: str, compute: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Return compute() for the file at path, memoized (as JSON) across
+        runs for as long as the file is unchanged."""
+        st = os.stat(path)
+        key = hashlib.sha256(
+            f"{realpath(path)}:{st.st_size}:{st.st_mtime_ns}:{name}".encode("utf-8")
+        ).hexdigest()
+        memo_path = pjoin(self.get_cache_dir(), "memo", key + ".json")
+        try:
+            with open(memo_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        value = compute()
+        with open(memo_path + f".{os.getpid()}", "w") as f:
+            json.dump(value, f)
+        os.replace(memo_path + f".{os.getpid()}", memo_path)
+        return value
+
+
+def link_to_cached(uri: str, destination: str) -> None:
+    """Fetch uri (through the cache) and make destination a symlink to it."""
+    path, sha256 = uri_cache.fetch(uri)
+    tmp_destination = f"{destination}.{os.getpid()}.{threading.get_ident()}"
+    os.symlink(path, tmp_destination)
+    os.replace(tmp_destination, destination)
+    if sha256 is not None:
+        remember_content_hash(path, sha256)
+
+
+# one cache shared by the whole manager process
+uri_cache = URICache()
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
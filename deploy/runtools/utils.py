@@ -3,19 +3,26 @@
 from __future__ import annotations
 
 import sys
+import os
+import glob
+import json
+import threading
 import lddwrap
 import logging
+import multiprocessing
 from os import fspath
-from os.path import realpath
+from os.path import expanduser, realpath
 from pathlib import Path
 from fabric.api import run, warn_only, hide, get, local, settings  # type: ignore
+from fabric.network import disconnect_all  # type: ignore
+from fabric.state import connections  # type: ignore
 import hashlib
 from tempfile import TemporaryDirectory
 
 from awstools.awstools import get_localhost_instance_id
 from buildtools.bitbuilder import get_deploy_dir
 
-from typing import List, Tuple, Type, Optional
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple, Type, Optional
 
 rootLogger = logging.getLogger()
 
@@ -25,6 +32,105 @@ def has_sudo() -> bool:
         return run("sudo -ln true").return_code == 0
 
 
+# glibc's shared libraries are resolved through the package manager once and
+# remembered here (across runs of the manager too, while glibc is unchanged)
+GLIBC_SHARED_LIBS_CACHE_FILE = "~/.cache/firesim/glibc-shared-libraries.json"
+
+_glibc_shared_libs: Optional[FrozenSet[str]] = None
+_glibc_shared_libs_lock = threading.Lock()
+
+# results of get_local_shared_libraries, keyed by (real path, size, mtime)
+_shared_libraries_cache: Dict[Tuple[str, int, int], List[Tuple[str, str]]] = {}
+
+
+def get_os_flavor() -> str:
+    """The ID of the manager's OS, from /etc/os-release."""
+    with open("/etc/os-release") as f:
+        for line in f:
+            if line.startswith("ID="):
+                return line[len("ID=") :].strip().strip('"')
+    return ""
+
+
+def get_glibc_shared_libraries() -> FrozenSet[str]:
+    """Paths of the shared libraries that belong to the manager's glibc
+    packages. Computed once per manager process, and persisted (keyed by the
+    OS and the libc.so files) so later runs skip the package queries."""
+    global _glibc_shared_libs
+    with _glibc_shared_libs_lock:
+        if _glibc_shared_libs is not None:
+            return _glibc_shared_libs
+
+        os_flavor = get_os_flavor()
+        rootLogger.debug(f"Running on OS: {os_flavor}")
+
+        if os_flavor not in ["ubuntu", "centos", "amzn", "debian", "rhel"]:
+            raise ValueError(f"Unknown OS: {os_flavor}")
+
+        libc_glob = (
+            "/usr/lib/x86_64-linux-gnu/libc.so*"
+            if os_flavor in ["ubuntu", "debian"]
+            else "/lib64/libc.so*"
+        )
+        key = json.dumps(
+            [os_flavor]
+            + [
+                [p, os.stat(p).st_size, os.stat(p).st_mtime_ns]
+                for p in sorted(glob.glob(libc_glob))
+            ]
+        )
+        cache_file = expanduser(GLIBC_SHARED_LIBS_CACHE_FILE)
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached["key"] == key:
+                _glibc_shared_libs = frozenset(cached["libs"])
+                rootLogger.debug(f"Using glibc shared libraries from {cache_file}")
+                return _glibc_shared_libs
+        except (OSError, ValueError, KeyError):
+            pass
+
+        glibc_shared_libs = []
+        if os_flavor in ["ubuntu", "debian"]:
+            with settings(warn_only=True):
+                dpkg_output = local(f"dpkg -S {libc_glob}", capture=True)
+                if dpkg_output.return_code == 1:
+                    print(f"Warning got:\n{dpkg_output.stderr}")
+                lines = dpkg_output.split("\n")
+                pkgs = sorted({":".join(l.split(":")[:1]) for l in lines})
+
+            rootLogger.debug(pkgs)
+
+            for pkg in pkgs:
+                dpkg_output_paths = local(
+                    f"dpkg -L {pkg} | grep -P '\.so(\.|\s*$)'", capture=True
+                )
+                glibc_shared_libs.extend(dpkg_output_paths.stdout.split("\n"))
+        elif os_flavor in ["centos", "amzn", "rhel"]:
+            with settings(warn_only=True):
+                rpm_output = local(
+                    f"rpm -q -f {libc_glob} --filesbypkg | grep -P '\.so(\.|\s*$)'",
+                    capture=True,
+                )
+                if rpm_output.return_code == 1:
+                    print(f"Warning got:\n{rpm_output.stderr}")
+                # lines are "<package> <path>"
+                glibc_shared_libs.extend(
+                    l.split()[-1] for l in rpm_output.split("\n") if l.strip()
+                )
+
+        rootLogger.debug(glibc_shared_libs)
+        _glibc_shared_libs = frozenset(glibc_shared_libs)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file + ".tmp", "w") as f:
+                json.dump({"key": key, "libs": sorted(_glibc_shared_libs)}, f)
+            os.replace(cache_file + ".tmp", cache_file)
+        except OSError as e:
+            rootLogger.debug(f"Could not persist glibc shared libraries: {e}")
+        return _glibc_shared_libs
+
+
 def get_local_shared_libraries(elf: str) -> List[Tuple[str, str]]:
     """Given path to executable `exe`, returns a list of path tuples, (A, B), where:
     A is the local file path on the manager instance to the library
@@ -42,46 +148,16 @@ def get_local_shared_libraries(elf: str) -> List[Tuple[str, str]]:
        if you're building a driver for AWS, it doesn't magically work
        on a different platform just because you have libraries that will
        link and load)
-    """
-
-    os_flavor = local(
-        "grep '^ID=' /etc/os-release | awk -F= '{print $2}' | tr -d '\"'", capture=True
-    )
-    rootLogger.debug(f"Running on OS: {os_flavor}")
-
-    if os_flavor not in ["ubuntu", "centos", "amzn", "debian", "rhel"]:
-        raise ValueError(f"Unknown OS: {os_flavor}")
-
-    glibc_shared_libs = []
-    if os_flavor in ["ubuntu", "debian"]:
-        lines = []
-        with settings(warn_only=True):
-            dpkg_output = local(
-                "dpkg -S /usr/lib/x86_64-linux-gnu/libc.so*", capture=True
-            )
-            if dpkg_output.return_code == 1:
-                print(f"Warning got:\n{dpkg_output.stderr}")
-            lines = dpkg_output.split("\n")
-            pkgs = [":".join(l.split(":")[:1]) for l in lines]
 
-        rootLogger.debug(pkgs)
-
-        for pkg in pkgs:
-            dpkg_output_paths = local(
-                f"dpkg -L {pkg} | grep -P '\.so(\.|\s*$)'", capture=True
-            )
-            lines = dpkg_output.split("\n")
-            glibc_shared_libs.extend(dpkg_output_paths.stdout.split("\n"))
+    Results are cached until the executable's size or modification time
+    changes.
+    """
+    st = os.stat(elf)
+    key = (realpath(elf), st.st_size, st.st_mtime_ns)
+    if key in _shared_libraries_cache:
+        return list(_shared_libraries_cache[key])
 
-        rootLogger.debug(glibc_shared_libs)
-    elif os_flavor in ["centos", "amzn", "rhel"]:
-        with settings(warn_only=True):
-            rpm_output = local(
-                "rpm -q -f /lib64/libc.so* --filesbypkg | grep -P '\.so(\.|\s*$)'"
-            )
-            if rpm_output.return_code == 1:
-                print(f"Warning got:\n{rpm_output.stderr}")
-            glibc_shared_libs.extend(rpm_output.split("\n"))
+    glibc_shared_libs = get_glibc_shared_libraries()
 
     libs = []
     rootLogger.debug(f"Identifying ldd dependencies for: {elf}")
@@ -112,7 +188,8 @@ def get_local_shared_libraries(elf: str) -> List[Tuple[str, str]]:
 
     rootLogger.debug(libs)
 
-    return libs
+    _shared_libraries_cache[key] = libs
+    return list(libs)
 
 
 class MacAddress:
@@ -192,6 +269,83 @@ def get_md5(file):
     return hashlib.md5(open(file, "rb").read()).hexdigest()
 
 
+def human_readable_size(num_bytes: float) -> str:
+    """Format a number of bytes for logging.
+
+    >>> human_readable_size(512)
+    '512.0 B'
+    >>> human_readable_size(3 * 1024 * 1024 * 1024)
+    '3.0 GiB'
+    """
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TiB"
+
+
+# content hashes of local files, keyed by (real path, size, mtime)
+_content_hash_cache: Dict[Tuple[str, int, int], str] = {}
+
+
+def get_content_hash(file: str) -> str:
+    """For a local file, get the sha256 hash of its contents as a string.
+    Results are cached until the file's size or modification time changes."""
+    st = os.stat(file)
+    key = (realpath(file), st.st_size, st.st_mtime_ns)
+    if key not in _content_hash_cache:
+        m = hashlib.sha256()
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                m.update(chunk)
+        _content_hash_cache[key] = m.hexdigest()
+    return _content_hash_cache[key]
+
+
+def remember_content_hash(file: str, content_hash: str) -> None:
+    """Record the sha256 of a local file's contents that is already known
+    (e.g. computed while downloading it), so that get_content_hash does not
+    have to recompute it."""
+    st = os.stat(file)
+    _content_hash_cache[(realpath(file), st.st_size, st.st_mtime_ns)] = content_hash
+
+
+def run_in_forked_process(name: str, func: Callable[..., Any], *args: Any) -> int:
+    """Run func(*args) in a forked process named name and return its exit
+    code: 0 if func returned and 1 if it raised (or exited). fabric's state is
+    global, so this is how worker threads of the manager run fabric operations
+    alongside each other (like tasks run with @parallel)."""
+
+    def body() -> None:
+        # connections inherited from the manager can't be shared
+        connections.clear()
+        failed = False
+        try:
+            func(*args)
+        except SystemExit as e:
+            # e.g. from handle_failure, which already logged why
+            failed = e.code not in [0, None]
+        except BaseException:
+            rootLogger.exception(f"{name} failed.")
+            failed = True
+        finally:
+            disconnect_all()
+        # skip the usual interpreter shutdown, which would try to join the
+        # manager's threads (e.g. the worker running this) that only exist in
+        # the parent
+        for handler in rootLogger.handlers:
+            handler.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1 if failed else 0)
+
+    proc = multiprocessing.get_context("fork").Process(target=body, name=name)
+    proc.start()
+    proc.join()
+    assert proc.exitcode is not None
+    return proc.exitcode
+
+
 # firesim scripts that require sudo access are stored here
 # must be updated at the same time as the documentation/installation instructions
 script_path = Path("/usr/local/bin")
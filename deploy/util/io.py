@@ -1,6 +1,5 @@
 import logging
 from os import PathLike, fspath
-from fsspec.core import url_to_fs, open_local  # type: ignore
 from pathlib import Path
 from fabric.api import local  # type: ignore
 from typing import Optional
@@ -39,6 +38,8 @@ def downloadURI(uri: str, local_dest_path: str, tries: int = 4) -> None:
         local_dest_path: path on the local file system to store the uri object
         tries: The number of times to try the download. A 1 second sleep will occur after each failure.
     """
+    # fsspec is slow to import and only needed when something is downloaded
+    from fsspec.core import url_to_fs  # type: ignore
 
     # TODO consider using fsspec
     # filecache https://filesystem-spec.readthedocs.io/en/latest/features.html#caching-files-locally
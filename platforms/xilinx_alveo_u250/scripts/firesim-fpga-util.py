@@ -6,6 +6,7 @@ import subprocess
 import sys
 import shutil
 import json
+import hashlib
 from pathlib import Path
 import pcielib
 import util
@@ -46,6 +47,42 @@ def get_fpga_db() -> Dict[Any, Any]:
         print(f":ERROR: Unable to open {dbPath}. Does it exist? Did you run 'firesim enumeratefpgas'?", file=sys.stderr)
     sys.exit(f":ERROR: Unable to create FPGA database from {dbPath}")
 
+def write_fpga_db(db: List[Dict[Any, Any]]) -> None:
+    global dbPath
+    with open(dbPath, 'w') as f:
+        json.dump(db, f, indent=2)
+
+# programmed bitstream tracking
+#
+# each db entry records the hash of the bitstream last programmed onto it along
+# with the boot it was programmed during, so that a power cycle (which loses
+# the bitstream) invalidates the record
+
+def get_boot_id() -> str:
+    with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+        return f.read().strip()
+
+def get_bitstream_hash(bitstream: Path) -> str:
+    h = hashlib.sha256()
+    with open(bitstream, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def is_programmed_with(serial: str, bitstream_hash: str) -> bool:
+    for e in get_fpga_db():
+        if e['uid'] == serial:
+            return e.get('bitstream_sha256') == bitstream_hash and e.get('boot_id') == get_boot_id()
+    return False
+
+def record_programmed_bitstream(serial: str, bitstream_hash: str) -> None:
+    db = get_fpga_db()
+    for e in db:
+        if e['uid'] == serial:
+            e['bitstream_sha256'] = bitstream_hash
+            e['boot_id'] = get_boot_id()
+    write_fpga_db(db)
+
 def get_serial_from_bus_id(id: str) -> str:
     deviceBDF = pcielib.get_bdf_from_extended_bdf(pcielib.get_singular_device_extended_bdf(id))
     for e in get_fpga_db():
@@ -79,6 +116,7 @@ def main(args: List[str]) -> int:
     parser.add_argument("--vivado-bin", help="Explicit path to 'vivado'", type=Path)
     parser.add_argument("--hw-server-bin", help="Explicit path to 'hw_server'", type=Path)
     parser.add_argument("--fpga-db", help="Explicit path to FPGA DB file (used to resolve BDFs to serial numbers or obtain all serial numbers of FPGAs)", type=Path, required=True)
+    parser.add_argument("--skip-if-loaded", help="Skip FPGA(s) that the FPGA DB records as already programmed with --bitstream (since the last boot)", action="store_true")
     megroup2 = parser.add_mutually_exclusive_group(required=True)
     megroup2.add_argument("--bitstream", help="The bitstream to flash onto FPGA(s)", type=Path)
     megroup2.add_argument("--disconnect-bdf", help="Disconnect BDF(s)", action="store_true")
@@ -149,6 +187,7 @@ def main(args: List[str]) -> int:
             sys.exit(f":ERROR: Invalid bitstream: {parsed_args.bitstream}")
         else:
             parsed_args.bitstream = parsed_args.bitstream.absolute()
+        bitstreamHash = get_bitstream_hash(parsed_args.bitstream)
 
         if is_bdf_arg(parsed_args):
             bus_ids = get_bus_ids_from_args(parsed_args)
@@ -158,6 +197,13 @@ def main(args: List[str]) -> int:
             for bus_id in bus_ids:
                 serialNums.append(get_serial_from_bus_id(bus_id))
 
+            if parsed_args.skip_if_loaded:
+                for bus_id, serialNumber in list(zip(bus_ids, serialNums)):
+                    if is_programmed_with(serialNumber, bitstreamHash):
+                        print(f":INFO: FPGA {bus_id} already programmed with {parsed_args.bitstream}, skipping")
+                        bus_ids.remove(bus_id)
+                        serialNums.remove(serialNumber)
+
             for bus_id in bus_ids:
                 disconnect_bus_id(bus_id)
 
@@ -165,6 +211,7 @@ def main(args: List[str]) -> int:
             for i, bus_id in enumerate(bus_ids):
                 serialNumber = serialNums[i]
                 program_fpga(parsed_args.vivado_bin, serialNumber, parsed_args.bitstream)
+                record_programmed_bitstream(serialNumber, bitstreamHash)
                 print(f":INFO: Successfully programmed FPGA {bus_id} with {parsed_args.bitstream}")
 
             for bus_id in bus_ids:
@@ -178,7 +225,11 @@ def main(args: List[str]) -> int:
                 serials.extend(get_serials())
 
             for serial in serials:
+                if parsed_args.skip_if_loaded and is_programmed_with(serial, bitstreamHash):
+                    print(f":INFO: FPGA {serial} already programmed with {parsed_args.bitstream}, skipping")
+                    continue
                 program_fpga(parsed_args.vivado_bin, serial, parsed_args.bitstream)
+                record_programmed_bitstream(serial, bitstreamHash)
                 print(f":INFO: Successfully programmed FPGA {serial} with {parsed_args.bitstream}")
             print(":WARNING: Please warm reboot the machine")
 
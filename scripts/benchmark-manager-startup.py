@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Benchmark manager startup for every task in TASKS: the time to import the
+# manager, construct the task's config object and build the target topology if
+# the task needs it (everything firesim does before it starts working on
+# hosts), each in a fresh python process.
+# Requires the manager's python environment (i.e. 'sourceme-manager.sh') and
+# config files in deploy/ (i.e. 'firesim managerinit').
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+deploy_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "deploy")
+
+desc = """Benchmark manager startup time for every task. Arguments after '--' are passed
+to the manager for every task (e.g. -- -c my_config_runtime.yaml)."""
+parser = argparse.ArgumentParser(description=desc)
+parser.add_argument('--repeat', type=int, default=3, help='runs per task, the fastest is reported (default: 3)')
+parser.add_argument('--tasks', type=str, nargs='+', help='only benchmark these tasks (default: all)')
+parser.add_argument('manager_args', nargs='*', help='extra manager arguments')
+args = parser.parse_args()
+
+# run in a fresh interpreter per measurement, so that no imports are shared
+STARTUP_CHECK = """
+import argparse, importlib.machinery, importlib.util, json, os, sys, time
+start = time.perf_counter()
+loader = importlib.machinery.SourceFileLoader("firesim_manager", os.path.abspath("firesim"))
+spec = importlib.util.spec_from_loader("firesim_manager", loader)
+firesim = importlib.util.module_from_spec(spec)
+loader.exec_module(firesim)
+imported = time.perf_counter()
+if len(sys.argv) == 1:
+    print(json.dumps(list(firesim.TASKS)))
+    sys.exit(0)
+task_args = firesim.construct_firesim_argparser().parse_args(sys.argv[1:])
+task = firesim.TASKS[task_args.task]
+config = None
+if task["config"] and task["config"] is not argparse.Namespace:
+    config = task["config"](task_args)
+configured = time.perf_counter()
+# the workload and topology are built on first use by the tasks that need them
+if task_args.task not in ["launchrunfarm", "terminaterunfarm"] and hasattr(config, "firesim_topology_with_passes"):
+    config.firesim_topology_with_passes
+    topology = time.perf_counter() - configured
+else:
+    topology = None
+print(json.dumps([imported - start, configured - imported, topology]))
+"""
+
+def run_check(check_args) -> str:
+    proc = subprocess.run([sys.executable, "-c", STARTUP_CHECK] + check_args, cwd=deploy_dir,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise Exception(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}")
+    return proc.stdout.strip().splitlines()[-1]
+
+tasks = args.tasks if args.tasks else json.loads(run_check([]))
+
+print(f"{'task':<18} {'import':>8} {'config':>8} {'topology':>9} {'total':>8}")
+for task in tasks:
+    best = None
+    try:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            imported, configured, topology = json.loads(run_check([task] + args.manager_args))
+            total = time.perf_counter() - start
+            if best is None or total < best[3]:
+                best = (imported, configured, topology, total)
+    except Exception as e:
+        print(f"{task:<18} failed: {e}")
+        continue
+    assert best is not None
+    topology_str = "-" if best[2] is None else f"{best[2]:.3f}s"
+    print(f"{task:<18} {best[0]:7.3f}s {best[1]:7.3f}s {topology_str:>9} {best[3]:7.3f}s")
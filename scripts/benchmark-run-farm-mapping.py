@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Benchmark mapping a non-networked topology onto an externally provisioned run
+# farm of mock hosts (one host handle per host), and the host lookups every
+# @parallel fan-out does (one per host), for run farms of increasing size,
+# compared against the previous, linear-scan allocator and lookup.
+# Nothing is run on the (made up) hosts.
+# Requires the manager's python environment (i.e. 'sourceme-manager.sh').
+
+import argparse
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "deploy"))
+
+from runtools.firesim_topology_core import FireSimTopology
+from runtools.firesim_topology_elements import FireSimServerNode
+from runtools.firesim_topology_with_passes import FireSimTopologyWithPasses
+from runtools.run_farm import RunFarm, ExternallyProvisioned, Inst
+
+from typing import Tuple
+
+parser = argparse.ArgumentParser(description="Benchmark run farm host mapping and lookup.")
+parser.add_argument('--hosts', type=int, nargs='+', default=[100, 1000], help='run farm sizes in hosts (default: 100 1000)')
+parser.add_argument('--slots', type=int, default=8, help='sim slots per host (default: 8)')
+parser.add_argument('--skip-legacy', action='store_true', help='only time the current implementation')
+args = parser.parse_args()
+
+rootLogger = logging.getLogger()
+
+class CountingHandler(logging.Handler):
+    """ counts the bytes that would be logged to the console (INFO and up) """
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.bytes = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.bytes += len(record.getMessage()) + 1
+
+def legacy_get_smallest_sim_host_handle(self, num_sims: int) -> str:
+    """ the previous implementation of RunFarm.get_smallest_sim_host_handle """
+    if self.metasimulation_enabled:
+        sorted_slots = self.SORTED_SIM_HOST_HANDLE_TO_MAX_METASIM_SLOTS
+    else:
+        sorted_slots = self.SORTED_SIM_HOST_HANDLE_TO_MAX_FPGA_SLOTS
+    for max_simcount, sim_host_handle in sorted_slots:
+        if max_simcount < num_sims:
+            continue
+        if self.mapper_consumed[sim_host_handle] >= len(self.run_farm_hosts_dict[sim_host_handle]):
+            continue
+        return sim_host_handle
+    raise Exception
+
+def legacy_allocate_sim_host(self, sim_host_handle: str) -> Inst:
+    """ the previous implementation of RunFarm.allocate_sim_host """
+    rootLogger.info(f"run_farm_hosts_dict {self.run_farm_hosts_dict}")
+    inst_tup = self.run_farm_hosts_dict[sim_host_handle][self.mapper_consumed[sim_host_handle]]
+    self.mapper_consumed[sim_host_handle] += 1
+    return inst_tup[0]
+
+def legacy_lookup_by_host(self, host: str) -> Inst:
+    """ the previous implementation of ExternallyProvisioned.lookup_by_host """
+    for host_node in self.get_all_bound_host_nodes():
+        if host_node.get_host() == host:
+            return host_node
+    assert False, f"Unable to find host node by {host} host name"
+
+LEGACY_METHODS = {
+    "get_smallest_sim_host_handle": legacy_get_smallest_sim_host_handle,
+    "allocate_sim_host": legacy_allocate_sim_host,
+    "lookup_by_host": legacy_lookup_by_host,
+}
+
+def build_run_farm(num_hosts: int, slots: int) -> ExternallyProvisioned:
+    """ an externally provisioned run farm of num_hosts mock hosts """
+    farm_args = {
+        "default_platform": "EC2InstanceDeployManager",
+        "default_simulation_dir": "/tmp/firesim-benchmark",
+        "run_farm_host_specs": [
+            {"mock_spec": {"num_fpgas": slots, "num_metasims": 0, "use_for_switch_only": False}},
+        ],
+        "run_farm_hosts_to_use": [
+            {f"10.{i // 65536}.{i // 256 % 256}.{i % 256}": "mock_spec"} for i in range(num_hosts)
+        ],
+    }
+    return ExternallyProvisioned(farm_args, metasimulation_enabled=False)
+
+def run_benchmark(num_hosts: int, slots: int) -> Tuple[float, float, int]:
+    """ time mapping num_hosts * slots servers onto a fresh run farm, and one
+    host lookup per host. return both times and the bytes logged """
+    run_farm = build_run_farm(num_hosts, slots)
+    topol = FireSimTopology.__new__(FireSimTopology)
+    topol.roots = [FireSimServerNode() for _ in range(num_hosts * slots)]
+    passes = SimpleNamespace(firesimtopol=topol, run_farm=run_farm)
+
+    handler = CountingHandler()
+    rootLogger.addHandler(handler)
+    try:
+        start = time.perf_counter()
+        FireSimTopologyWithPasses.pass_no_net_host_mapping(passes)  # type: ignore
+        mapping = time.perf_counter() - start
+    finally:
+        rootLogger.removeHandler(handler)
+
+    hosts = [inst.get_host() for inst in run_farm.get_all_bound_host_nodes()]
+    start = time.perf_counter()
+    for host in hosts:
+        assert run_farm.lookup_by_host(host).get_host() == host
+    fanout = time.perf_counter() - start
+    return mapping, fanout, handler.bytes
+
+os.environ.setdefault("USER", "firesim")
+rootLogger.setLevel(logging.INFO)
+
+print(f"{'hosts':>6} {'servers':>8} {'mapping':>10} {'fan-out':>10} {'log':>10} {'legacy mapping':>15} {'legacy fan-out':>15} {'legacy log':>12}")
+for num_hosts in args.hosts:
+    mapping, fanout, logged = run_benchmark(num_hosts, args.slots)
+    legacy = ["-", "-", "-"]
+    if not args.skip_legacy:
+        saved = {name: getattr(RunFarm, name) for name in LEGACY_METHODS}
+        saved_lookup = ExternallyProvisioned.__dict__.get("lookup_by_host")
+        for name, method in LEGACY_METHODS.items():
+            setattr(RunFarm, name, method)
+        ExternallyProvisioned.lookup_by_host = legacy_lookup_by_host  # type: ignore
+        try:
+            legacy_mapping, legacy_fanout, legacy_logged = run_benchmark(num_hosts, args.slots)
+            legacy = [f"{legacy_mapping:14.3f}s", f"{legacy_fanout:14.3f}s", f"{legacy_logged:>12}"]
+        finally:
+            for name, method in saved.items():
+                setattr(RunFarm, name, method)
+            if saved_lookup is None:
+                del ExternallyProvisioned.lookup_by_host
+            else:
+                ExternallyProvisioned.lookup_by_host = saved_lookup  # type: ignore
+    print(f"{num_hosts:>6} {num_hosts * args.slots:>8} {mapping:9.3f}s {fanout:9.3f}s {logged:>10} {legacy[0]:>15} {legacy[1]:>15} {legacy[2]:>12}")
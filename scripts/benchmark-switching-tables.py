@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# Benchmark computing and emitting switch MAC -> port tables for a large
+# networked topology, compared against the previous list-based implementation.
+# Requires the manager's python environment (i.e. 'sourceme-manager.sh').
+
+import argparse
+import os
+import sys
+import time
+from functools import reduce
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "deploy"))
+
+from runtools.firesim_topology_core import FireSimTopology
+from runtools.firesim_topology_elements import FireSimSwitchNode, FireSimServerNode
+from runtools.firesim_topology_with_passes import FireSimTopologyWithPasses
+from runtools.utils import MacAddress
+
+from typing import List
+
+parser = argparse.ArgumentParser(description="Benchmark switching table computation/emission.")
+parser.add_argument('--nodes', type=int, default=4096, help='number of simulated servers (default: 4096)')
+parser.add_argument('--fanout', type=int, default=16, help='switch downlinks per switch (default: 16)')
+parser.add_argument('--skip-legacy', action='store_true', help='only time the current implementation')
+args = parser.parse_args()
+
+def build_tree(num_nodes: int, fanout: int) -> SimpleNamespace:
+    """ a tree of switches with fanout downlinks each, num_nodes servers at the leaves """
+    level: List = [FireSimServerNode() for _ in range(num_nodes)]
+    while len(level) > 1:
+        switches = []
+        for i in range(0, len(level), fanout):
+            switch = FireSimSwitchNode()
+            switch.add_downlinks(level[i:i + fanout])
+            switches.append(switch)
+        level = switches
+    topol = FireSimTopology.__new__(FireSimTopology)
+    topol.roots = level
+    return SimpleNamespace(firesimtopol=topol, passes_used=[])
+
+def legacy_compute_switching_tables(passes: SimpleNamespace) -> None:
+    """ the previous implementation of pass_compute_switching_tables """
+    for node in passes.firesimtopol.get_dfs_order():
+        if isinstance(node, FireSimServerNode):
+            node.downlinkmacs = [node.get_mac_address()]
+        else:
+            node.downlinkmacs = reduce(lambda x, y: x + y, [x.get_downlink_side().downlinkmacs for x in node.downlinks])
+    for switch in passes.firesimtopol.get_dfs_order_switches():
+        uplinkportno = len(switch.downlinks)
+        switchtab = [uplinkportno for x in range(MacAddress.next_mac_to_allocate())]
+        for port_no in range(len(switch.downlinks)):
+            for mac in switch.downlinks[port_no].get_downlink_side().downlinkmacs:
+                switchtab[mac.as_int_no_prefix()] = port_no
+        switch.switch_table = switchtab
+
+def legacy_get_mac2port(switch: FireSimSwitchNode) -> str:
+    """ the previous implementation of AbstractSwitchToSwitchConfig.get_mac2port """
+    commaseparated = ""
+    for elem in switch.switch_table:
+        commaseparated += str(elem) + ", "
+    commaseparated = commaseparated[:-2]
+    commaseparated = "{" + commaseparated + "};"
+    return """
+    #ifdef MACPORTSCONFIG
+    uint16_t mac2port[{}]  {}
+    #endif
+    """.format(len(switch.switch_table), commaseparated)
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s")
+    return elapsed
+
+passes = build_tree(args.nodes, args.fanout)
+FireSimTopologyWithPasses.pass_assign_mac_addresses(passes)  # type: ignore
+switches = passes.firesimtopol.get_dfs_order_switches()
+print(f"{args.nodes} servers, {len(switches)} switches, {MacAddress.next_mac_to_allocate()} table entries per switch")
+
+emitted = []
+timed("compute tables", lambda: FireSimTopologyWithPasses.pass_compute_switching_tables(passes))  # type: ignore
+timed("emit mac2port", lambda: emitted.extend(s.switch_builder.get_mac2port() for s in switches))
+table_bytes = sum(s.switch_table.itemsize * len(s.switch_table) for s in switches)
+print(f"{'table storage':<40} {table_bytes / 1024:8.1f}KiB")
+
+if not args.skip_legacy:
+    legacy_emitted = []
+    timed("compute tables (legacy)", lambda: legacy_compute_switching_tables(passes))
+    timed("emit mac2port (legacy)", lambda: legacy_emitted.extend(legacy_get_mac2port(s) for s in switches))
+    table_bytes = sum(sys.getsizeof(s.switch_table) for s in switches)
+    print(f"{'table storage (legacy)':<40} {table_bytes / 1024:8.1f}KiB")
+    assert emitted == legacy_emitted, "emitted mac2port tables differ from the legacy implementation"
+    print("emitted tables match the legacy implementation")
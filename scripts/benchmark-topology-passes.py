@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Benchmark the topology-only phase one passes (the ones that do not need a run
+# farm) on generated tree topologies of increasing size, compared against the
+# previous, un-memoized dfs traversal.
+# Requires the manager's python environment (i.e. 'sourceme-manager.sh').
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "deploy"))
+
+from runtools.firesim_topology_core import FireSimTopology
+from runtools.firesim_topology_elements import FireSimSwitchNode, FireSimServerNode, FireSimPipeNode
+from runtools.firesim_topology_with_passes import FireSimTopologyWithPasses
+
+from typing import List
+
+parser = argparse.ArgumentParser(description="Benchmark phase one topology passes.")
+parser.add_argument('--nodes', type=int, nargs='+', default=[1024, 4096, 16384], help='topology sizes in simulated servers (default: 1024 4096 16384)')
+parser.add_argument('--fanout', type=int, default=16, help='switch downlinks per switch (default: 16)')
+parser.add_argument('--skip-legacy', action='store_true', help='only time the current implementation')
+args = parser.parse_args()
+
+def legacy_get_dfs_order(self) -> List:
+    """ the previous implementation of FireSimTopology.get_dfs_order """
+    stack = list(self.roots)
+    retlist: List = []
+    visitedonce = set()
+    while stack:
+        nextup = stack[0]
+        if nextup in visitedonce:
+            if nextup not in retlist:
+                retlist.append(stack.pop(0))
+            else:
+                stack.pop(0)
+        else:
+            visitedonce.add(nextup)
+            stack = list(map(lambda x: x.get_downlink_side(), nextup.downlinks)) + stack
+    return retlist
+
+LEGACY_METHODS = {
+    "get_dfs_order": legacy_get_dfs_order,
+    "get_dfs_order_switches": lambda self: [x for x in self.get_dfs_order() if isinstance(x, FireSimSwitchNode)],
+    "get_dfs_order_servers": lambda self: [x for x in self.get_dfs_order() if isinstance(x, FireSimServerNode)],
+    "get_dfs_order_pipes": lambda self: [x for x in self.get_dfs_order() if isinstance(x, FireSimPipeNode)],
+}
+
+def build_tree(num_nodes: int, fanout: int) -> FireSimTopology:
+    """ a tree of switches with fanout downlinks each, num_nodes servers at the leaves """
+    level: List = [FireSimServerNode() for _ in range(num_nodes)]
+    while len(level) > 1:
+        switches = []
+        for i in range(0, len(level), fanout):
+            switch = FireSimSwitchNode()
+            switch.add_downlinks(level[i:i + fanout])
+            switches.append(switch)
+        level = switches
+    topol = FireSimTopology.__new__(FireSimTopology)
+    topol.roots = level
+    return topol
+
+def run_phase_one(topol: FireSimTopology) -> float:
+    """ run the phase one passes that only touch the topology, plus the
+    traversals the run-farm-dependent phase one passes make """
+    passes = SimpleNamespace(
+        firesimtopol=topol,
+        passes_used=[],
+        defaultlinklatency=6405,
+        defaultswitchinglatency=10,
+        defaultnetbandwidth=200,
+        defaultprofileinterval=-1,
+        defaulttracervconfig=None,
+        defaultautocounterconfig=None,
+        defaulthostdebugconfig=None,
+        defaultsynthprintconfig=None,
+        default_plusarg_passthrough="",
+        defaultpartitionconfig=None,
+    )
+    start = time.perf_counter()
+    FireSimTopologyWithPasses.pass_assign_mac_addresses(passes)  # type: ignore
+    FireSimTopologyWithPasses.pass_compute_switching_tables(passes)  # type: ignore
+    # host mapping, hwconfig, job and nbd passes
+    topol.get_dfs_order_switches()
+    for _ in range(4):
+        topol.get_dfs_order_servers()
+    FireSimTopologyWithPasses.pass_apply_default_params(passes)  # type: ignore
+    return time.perf_counter() - start
+
+print(f"{'servers':>8} {'nodes':>8} {'phase one':>12} {'legacy':>12}")
+for num_nodes in args.nodes:
+    topol = build_tree(num_nodes, args.fanout)
+    elapsed = run_phase_one(topol)
+    total_nodes = len(topol.get_dfs_order())
+    legacy = "-"
+    if not args.skip_legacy:
+        order = topol.get_dfs_order()
+        saved = {name: FireSimTopology.__dict__[name] for name in LEGACY_METHODS}
+        for name, method in LEGACY_METHODS.items():
+            setattr(FireSimTopology, name, method)
+        try:
+            assert topol.get_dfs_order() == order, "dfs order differs from the legacy implementation"
+            legacy = f"{run_phase_one(topol):11.3f}s"
+        finally:
+            for name, method in saved.items():
+                setattr(FireSimTopology, name, method)
+    print(f"{num_nodes:>8} {total_nodes:>8} {elapsed:11.3f}s {legacy:>12}")